@@ -0,0 +1,251 @@
+#include <irods/irods_exception.hpp>
+#include <irods/rodsErrorTable.h>
+
+#include <sys/file.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <fcntl.h>
+#include <unistd.h>
+
+#include <fmt/format.h>
+
+#include <algorithm>
+#include <cmath>
+#include <cstdint>
+#include <cstring>
+#include <ctime>
+#include <limits>
+#include <optional>
+#include <string>
+#include <vector>
+
+namespace irods
+{
+	struct sketch_dimensions
+	{
+		std::uint32_t width{4096};
+		std::uint32_t depth{4};
+	};
+
+	// fnv-1a, seeded per row of the sketch so that each row hashes independently
+	inline auto sketch_hash(const std::string& _key, const std::uint32_t _row) -> std::uint64_t
+	{
+		std::uint64_t hash = 0xcbf29ce484222325ULL ^ (0x9e3779b97f4a7c15ULL * (_row + 1));
+		for (const auto c : _key) {
+			hash ^= static_cast<unsigned char>(c);
+			hash *= 0x100000001b3ULL;
+		}
+
+		return hash;
+
+	} // sketch_hash
+
+	// a count-min sketch of accesses kept in memory by each agent
+	class count_min_sketch
+	{
+	  public:
+		explicit count_min_sketch(const sketch_dimensions& _dimensions)
+			: dimensions_{_dimensions}
+			, counters_(_dimensions.width * _dimensions.depth)
+		{
+		}
+
+		void add(const std::string& _key, const float _count = 1)
+		{
+			for (std::uint32_t row = 0; row < dimensions_.depth; ++row) {
+				counters_[index(_key, row)] += _count;
+			}
+
+			empty_ = false;
+
+		} // add
+
+		auto empty() const -> bool
+		{
+			return empty_;
+
+		} // empty
+
+		void clear()
+		{
+			std::fill(counters_.begin(), counters_.end(), 0.0f);
+			empty_ = true;
+
+		} // clear
+
+		auto dimensions() const -> const sketch_dimensions&
+		{
+			return dimensions_;
+
+		} // dimensions
+
+		auto counters() const -> const std::vector<float>&
+		{
+			return counters_;
+
+		} // counters
+
+	  private:
+		auto index(const std::string& _key, const std::uint32_t _row) const -> std::size_t
+		{
+			return _row * dimensions_.width + sketch_hash(_key, _row) % dimensions_.width;
+
+		} // index
+
+		const sketch_dimensions dimensions_;
+		std::vector<float> counters_;
+		bool empty_{true};
+
+	}; // class count_min_sketch
+
+	// the sketch shared by all agents on a server, memory mapped from a local file which is
+	// locked for the lifetime of the object.  counters decay by half every half life so that
+	// the estimate reflects recent access rather than all access
+	class shared_sketch
+	{
+	  public:
+		// a writer provides the dimensions, and the file is reset should they differ.  a reader
+		// adopts the dimensions of an existing file
+		shared_sketch(
+			const std::string& _path,
+			const std::optional<sketch_dimensions>& _dimensions,
+			const std::int64_t _half_life_in_seconds = 3600)
+		{
+			fd_ = open(_path.c_str(), O_RDWR | O_CREAT, 0600);
+			if (fd_ < 0) {
+				THROW(UNIX_FILE_OPEN_ERR - errno, fmt::format("failed to open access sketch [{}]", _path));
+			}
+
+			if (flock(fd_, LOCK_EX) < 0) {
+				close(fd_);
+				THROW(SYS_INTERNAL_ERR, fmt::format("failed to lock access sketch [{}] errno [{}]", _path, errno));
+			}
+
+			struct stat st{};
+			fstat(fd_, &st);
+
+			header existing{};
+			const auto has_header = static_cast<std::size_t>(st.st_size) >= sizeof(header) &&
+			                        sizeof(header) == pread(fd_, &existing, sizeof(header), 0) &&
+			                        magic == existing.magic;
+
+			auto dimensions = _dimensions.value_or(sketch_dimensions{existing.width, existing.depth});
+			if (!_dimensions && !has_header) {
+				dimensions = sketch_dimensions{};
+			}
+
+			size_ = sizeof(header) + sizeof(float) * dimensions.width * dimensions.depth;
+
+			const auto initialize = !has_header || existing.width != dimensions.width ||
+			                        existing.depth != dimensions.depth || static_cast<std::size_t>(st.st_size) != size_;
+
+			if (initialize && ftruncate(fd_, size_) < 0) {
+				flock(fd_, LOCK_UN);
+				close(fd_);
+				THROW(SYS_INTERNAL_ERR, fmt::format("failed to size access sketch [{}] errno [{}]", _path, errno));
+			}
+
+			auto* base = mmap(nullptr, size_, PROT_READ | PROT_WRITE, MAP_SHARED, fd_, 0);
+			if (MAP_FAILED == base) {
+				flock(fd_, LOCK_UN);
+				close(fd_);
+				THROW(SYS_INTERNAL_ERR, fmt::format("failed to map access sketch [{}] errno [{}]", _path, errno));
+			}
+
+			header_ = static_cast<header*>(base);
+			counters_ = reinterpret_cast<float*>(header_ + 1);
+
+			if (initialize) {
+				std::memset(base, 0, size_);
+				header_->magic = magic;
+				header_->width = dimensions.width;
+				header_->depth = dimensions.depth;
+				header_->last_decay = static_cast<std::int64_t>(std::time(nullptr));
+			}
+
+			if (_dimensions) {
+				header_->half_life_in_seconds = _half_life_in_seconds;
+			}
+
+		} // ctor
+
+		shared_sketch(const shared_sketch&) = delete;
+		shared_sketch& operator=(const shared_sketch&) = delete;
+
+		~shared_sketch()
+		{
+			munmap(header_, size_);
+			flock(fd_, LOCK_UN);
+			close(fd_);
+
+		} // dtor
+
+		void merge(const count_min_sketch& _sketch)
+		{
+			decay();
+
+			const auto& d = _sketch.dimensions();
+			if (d.width != header_->width || d.depth != header_->depth) {
+				THROW(SYS_INVALID_INPUT_PARAM, "access sketch dimensions do not match");
+			}
+
+			const auto& counters = _sketch.counters();
+			for (std::size_t i = 0; i < counters.size(); ++i) {
+				counters_[i] += counters[i];
+			}
+
+		} // merge
+
+		auto estimate(const std::string& _key) -> double
+		{
+			decay();
+
+			auto value = std::numeric_limits<float>::max();
+			for (std::uint32_t row = 0; row < header_->depth; ++row) {
+				value = std::min(value, counters_[row * header_->width + sketch_hash(_key, row) % header_->width]);
+			}
+
+			return value;
+
+		} // estimate
+
+	  private:
+		void decay()
+		{
+			const auto now = static_cast<std::int64_t>(std::time(nullptr));
+			const auto elapsed = now - header_->last_decay;
+			if (header_->half_life_in_seconds <= 0 || elapsed <= 0) {
+				return;
+			}
+
+			const auto factor = static_cast<float>(
+				std::pow(0.5, static_cast<double>(elapsed) / static_cast<double>(header_->half_life_in_seconds)));
+
+			const auto count = static_cast<std::size_t>(header_->width) * header_->depth;
+			for (std::size_t i = 0; i < count; ++i) {
+				counters_[i] *= factor;
+			}
+
+			header_->last_decay = now;
+
+		} // decay
+
+		static constexpr std::uint64_t magic{0x6972636d736b7431}; // "ircmskt1"
+
+		struct header
+		{
+			std::uint64_t magic;
+			std::uint32_t width;
+			std::uint32_t depth;
+			std::int64_t half_life_in_seconds;
+			std::int64_t last_decay;
+		};
+
+		int fd_{-1};
+		std::size_t size_{};
+		header* header_{};
+		float* counters_{};
+
+	}; // class shared_sketch
+
+} // namespace irods
@@ -6,9 +6,35 @@
 #include <irods/apiNumber.h>
 #include <irods/filesystem.hpp>
 #include <irods/rsFileStat.hpp>
+#include <irods/rsFileOpen.hpp>
+#include <irods/rsFileLseek.hpp>
+#include <irods/rsFileRead.hpp>
+#include <irods/rsFileClose.hpp>
+#include <irods/rsFileChksum.hpp>
+#include <irods/rsModAVUMetadata.hpp>
+#include <irods/irods_resource_backport.hpp>
+#include <irods/policy_composition_framework_utilities.hpp>
 
 #include <boost/lexical_cast.hpp>
 #include <fmt/format.h>
+#include <openssl/evp.h>
+
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <fcntl.h>
+#include <unistd.h>
+
+#include <algorithm>
+#include <array>
+#include <atomic>
+#include <cmath>
+#include <ctime>
+#include <filesystem>
+#include <mutex>
+#include <numeric>
+#include <thread>
+#include <unordered_map>
+#include <vector>
 
 #include "data_verification_utilities.hpp"
 
@@ -29,8 +55,37 @@ namespace
 		static const std::string catalog{"catalog"};
 		static const std::string checksum{"checksum"};
 		static const std::string filesystem{"filesystem"};
+		static const std::string sampled{"sampled"};
 	}; //namespace verification_type
 
+	using sha256_digest_type = std::array<unsigned char, 32>;
+
+	auto to_hex_string(const unsigned char* _bytes, const std::size_t _size) -> std::string
+	{
+		static const char digits[] = "0123456789abcdef";
+
+		std::string hex(_size * 2, '0');
+		for (std::size_t i = 0; i < _size; ++i) {
+			hex[2 * i] = digits[_bytes[i] >> 4];
+			hex[2 * i + 1] = digits[_bytes[i] & 0x0f];
+		}
+
+		return hex;
+
+	} // to_hex_string
+
+	auto sha256(const unsigned char* _data, const std::size_t _size) -> sha256_digest_type
+	{
+		sha256_digest_type digest{};
+		unsigned int length{};
+		if (!EVP_Digest(_data, _size, digest.data(), &length, EVP_sha256(), nullptr)) {
+			THROW(SYS_INTERNAL_ERR, "EVP_Digest failed to compute sha256");
+		}
+
+		return digest;
+
+	} // sha256
+
 	rodsLong_t get_file_size_from_filesystem(
 		rsComm_t* _comm,
 		const std::string& _logical_path,
@@ -135,6 +190,281 @@ namespace
 
 	} // capture_replica_attributes
 
+	const std::string sampled_digests_attribute{"irods::verification::sampled_digests"};
+
+	// truncated sha256 digests keep the recorded digests within a single avu value
+	constexpr std::size_t sampled_digest_size{8};
+	constexpr std::uint32_t maximum_number_of_sampled_ranges{160};
+	constexpr std::uint64_t sampled_read_size{4 * 1024 * 1024};
+
+	auto fnv1a(const std::string& _value) -> std::uint64_t
+	{
+		std::uint64_t hash{14695981039346656037ull};
+		for (const auto c : _value) {
+			hash ^= static_cast<unsigned char>(c);
+			hash *= 1099511628211ull;
+		}
+
+		return hash;
+
+	} // fnv1a
+
+	auto splitmix64(std::uint64_t& _state) -> std::uint64_t
+	{
+		auto z = (_state += 0x9e3779b97f4a7c15ull);
+		z = (z ^ (z >> 30)) * 0xbf58476d1ce4e5b9ull;
+		z = (z ^ (z >> 27)) * 0x94d049bb133111ebull;
+		return z ^ (z >> 31);
+
+	} // splitmix64
+
+	auto select_sampled_ranges(
+		const std::string& _seed,
+		const std::uint64_t _number_of_ranges,
+		const std::uint64_t _number_to_sample,
+		const std::uint64_t _cycle) -> std::vector<std::uint64_t>
+	{
+		// a fixed permutation per replica, each cycle takes the next slice of it
+		// so that every range is covered after number_of_ranges / number_to_sample cycles
+		std::vector<std::uint64_t> permutation(_number_of_ranges);
+		std::iota(permutation.begin(), permutation.end(), 0);
+
+		auto state = fnv1a(_seed);
+		for (auto i = _number_of_ranges; i > 1; --i) {
+			std::swap(permutation[i - 1], permutation[splitmix64(state) % i]);
+		}
+
+		std::vector<std::uint64_t> selected;
+		const auto start = (_cycle * _number_to_sample) % _number_of_ranges;
+		for (std::uint64_t i = 0; i < _number_to_sample; ++i) {
+			selected.push_back(permutation[(start + i) % _number_of_ranges]);
+		}
+
+		return selected;
+
+	} // select_sampled_ranges
+
+	auto compute_range_digest(
+		rsComm_t* _comm,
+		const int _file_index,
+		const std::uint64_t _offset,
+		const std::uint64_t _length) -> std::string
+	{
+		fileLseekInp_t seek_inp{};
+		seek_inp.fileInx = _file_index;
+		seek_inp.offset = _offset;
+		seek_inp.whence = SEEK_SET;
+
+		fileLseekOut_t* seek_out{};
+		const auto seek_err = rsFileLseek(_comm, &seek_inp, &seek_out);
+		free(seek_out);
+		if (seek_err < 0) {
+			THROW(seek_err, fmt::format("failed to seek to offset [{}]", _offset));
+		}
+
+		auto* md_ctx = EVP_MD_CTX_new();
+		irods::at_scope_exit free_md_ctx{[md_ctx] { EVP_MD_CTX_free(md_ctx); }};
+		if (!md_ctx || !EVP_DigestInit_ex(md_ctx, EVP_sha256(), nullptr)) {
+			THROW(SYS_INTERNAL_ERR, "failed to initialize sha256 digest");
+		}
+
+		std::vector<unsigned char> buffer(std::min(_length, sampled_read_size));
+
+		for (std::uint64_t remaining = _length; remaining > 0;) {
+			fileReadInp_t read_inp{};
+			read_inp.fileInx = _file_index;
+			read_inp.len = static_cast<int>(std::min<std::uint64_t>(remaining, buffer.size()));
+
+			bytesBuf_t read_buf{};
+			read_buf.len = read_inp.len;
+			read_buf.buf = buffer.data();
+
+			const auto bytes_read = rsFileRead(_comm, &read_inp, &read_buf);
+			if (bytes_read <= 0) {
+				THROW(
+					bytes_read < 0 ? bytes_read : SYS_COPY_LEN_ERR,
+					fmt::format(
+						"failed to read [{}] bytes at offset [{}]", read_inp.len, _offset + _length - remaining));
+			}
+
+			EVP_DigestUpdate(md_ctx, buffer.data(), bytes_read);
+			remaining -= bytes_read;
+		}
+
+		sha256_digest_type digest{};
+		unsigned int length{};
+		if (!EVP_DigestFinal_ex(md_ctx, digest.data(), &length)) {
+			THROW(SYS_INTERNAL_ERR, "failed to finalize sha256 digest");
+		}
+
+		return to_hex_string(digest.data(), sampled_digest_size);
+
+	} // compute_range_digest
+
+	auto get_sampled_digests(
+		rsComm_t* _comm,
+		const std::string& _coll_name,
+		const std::string& _data_name,
+		const std::string& _resource_name) -> std::string
+	{
+		const auto query_str = fmt::format(
+			"SELECT META_DATA_ATTR_VALUE WHERE COLL_NAME = '{}' AND DATA_NAME = '{}'"
+			" AND META_DATA_ATTR_NAME = '{}' AND META_DATA_ATTR_UNITS = '{}'",
+			_coll_name,
+			_data_name,
+			sampled_digests_attribute,
+			_resource_name);
+
+		irods::query<rsComm_t> qobj{_comm, query_str, 1};
+
+		return qobj.size() > 0 ? qobj.front()[0] : std::string{};
+
+	} // get_sampled_digests
+
+	void record_sampled_digests(
+		rsComm_t* _comm,
+		const std::string& _logical_path,
+		const std::string& _resource_name,
+		const std::string& _previous_digests,
+		const std::string& _digests)
+	{
+		// digests are unique per replica, the resource name is held in the units
+		auto mod_avu = [&](const char* _op, const std::string& _value) {
+			modAVUMetadataInp_t inp{};
+			inp.arg0 = const_cast<char*>(_op);
+			inp.arg1 = const_cast<char*>("-d");
+			inp.arg2 = const_cast<char*>(_logical_path.c_str());
+			inp.arg3 = const_cast<char*>(sampled_digests_attribute.c_str());
+			inp.arg4 = const_cast<char*>(_value.c_str());
+			inp.arg5 = const_cast<char*>(_resource_name.c_str());
+			if (const auto ec = rsModAVUMetadata(_comm, &inp); ec < 0) {
+				THROW(
+					ec,
+					fmt::format("failed to record sampled digests for [{}] on [{}]", _logical_path, _resource_name));
+			}
+		};
+
+		if (!_previous_digests.empty()) {
+			mod_avu("rm", _previous_digests);
+		}
+
+		mod_avu("add", _digests);
+
+	} // record_sampled_digests
+
+
+	bool verify_checksum_at_rest(
+		rsComm_t* _comm,
+		const std::string& _logical_path,
+		const std::string& _resource_name,
+		const std::string& _hierarchy,
+		const std::string& _file_path,
+		const std::string& _data_size,
+		const std::string& _catalog_checksum)
+	{
+		// without a catalog checksum there is nothing to compare, one is not registered on the
+		// replica's behalf as it would record whatever is now at rest as correct
+		if (_catalog_checksum.empty()) {
+			THROW(
+				CAT_NO_CHECKSUM_FOR_REPLICA,
+				fmt::format("no checksum is registered for [{}] on [{}]", _logical_path, _resource_name));
+		}
+
+		std::string location{};
+		if (const auto err = irods::get_loc_for_hier_string(_hierarchy, location); !err.ok()) {
+			THROW(err.code(), err.result());
+		}
+
+		fileChksumInp_t inp{};
+		inp.dataSize = boost::lexical_cast<rodsLong_t>(_data_size);
+		rstrcpy(inp.addr.hostAddr, location.c_str(), NAME_LEN);
+		rstrcpy(inp.fileName, _file_path.c_str(), MAX_NAME_LEN);
+		rstrcpy(inp.rescHier, _hierarchy.c_str(), MAX_NAME_LEN);
+		rstrcpy(inp.objPath, _logical_path.c_str(), MAX_NAME_LEN);
+
+		char* computed_checksum{};
+		irods::at_scope_exit free_computed_checksum{[&computed_checksum] { free(computed_checksum); }};
+		if (const auto ec = rsFileChksum(_comm, &inp, &computed_checksum); ec < 0) {
+			THROW(ec, fmt::format("rsFileChksum failed for [{}] on [{}]", _logical_path, _resource_name));
+		}
+
+		return computed_checksum && _catalog_checksum == computed_checksum;
+
+	} // verify_checksum_at_rest
+
+	using vault_listing = std::unordered_map<std::string, rodsLong_t>;
+
+	auto list_vault(const std::string& _vault_path, const std::uint32_t _number_of_threads) -> vault_listing
+	{
+		namespace sfs = std::filesystem;
+
+		vault_listing files{};
+		std::vector<sfs::path> subdirectories{};
+
+		std::error_code ec{};
+		for (const auto& entry : sfs::directory_iterator{_vault_path, ec}) {
+			if (entry.is_directory(ec)) {
+				subdirectories.push_back(entry.path());
+			}
+			else if (entry.is_regular_file(ec)) {
+				files.emplace(entry.path().string(), entry.file_size(ec));
+			}
+		}
+
+		if (ec) {
+			THROW(SYS_INVALID_FILE_PATH, fmt::format("failed to list vault [{}] [{}]", _vault_path, ec.message()));
+		}
+
+		// the top level subdirectories of the vault are walked in parallel
+		std::atomic<std::size_t> next{0};
+		std::mutex files_mutex{};
+
+		auto walk = [&] {
+			vault_listing local{};
+
+			for (auto i = next++; i < subdirectories.size(); i = next++) {
+				std::error_code walk_ec{};
+				sfs::recursive_directory_iterator it{
+					subdirectories[i], sfs::directory_options::skip_permission_denied, walk_ec};
+
+				for (; !walk_ec && it != sfs::recursive_directory_iterator{}; it.increment(walk_ec)) {
+					std::error_code entry_ec{};
+					if (it->is_regular_file(entry_ec)) {
+						local.emplace(it->path().string(), it->file_size(entry_ec));
+					}
+				}
+
+				if (walk_ec) {
+					rodsLog(
+						LOG_ERROR,
+						"list_vault - failed to walk [%s] [%s]",
+						subdirectories[i].c_str(),
+						walk_ec.message().c_str());
+				}
+			}
+
+			std::lock_guard lock{files_mutex};
+			files.merge(local);
+		};
+
+		const auto number_of_threads =
+			std::max<std::size_t>(1, std::min<std::size_t>(_number_of_threads, subdirectories.size()));
+
+		std::vector<std::thread> workers;
+		for (std::size_t i = 1; i < number_of_threads; ++i) {
+			workers.emplace_back(walk);
+		}
+
+		walk();
+
+		for (auto& w : workers) {
+			w.join();
+		}
+
+		return files;
+
+	} // list_vault
+
 } // namespace
 
 namespace irods
@@ -198,12 +528,390 @@ namespace irods
 
 	} // compute_checksum_for_resource
 
+	bool resource_is_local_unixfilesystem(const std::string& _resource_hierarchy)
+	{
+		rodsLong_t resc_id{};
+		if (const auto err = resc_mgr.hier_to_leaf_id(_resource_hierarchy, resc_id); !err.ok()) {
+			return false;
+		}
+
+		std::string type{};
+		if (const auto err = irods::get_resource_property<std::string>(resc_id, irods::RESOURCE_TYPE, type);
+		    !err.ok() || "unixfilesystem" != type)
+		{
+			return false;
+		}
+
+		std::string location{};
+		if (const auto err = irods::get_resource_property<std::string>(resc_id, irods::RESOURCE_LOCATION, location);
+		    !err.ok())
+		{
+			return false;
+		}
+
+		return irods::policy_composition::host_is_local(location);
+
+	} // resource_is_local_unixfilesystem
+
+	std::string compute_sha256_manifest(
+		const std::string& _file_path,
+		const std::uint64_t _chunk_size,
+		const std::uint32_t _number_of_threads,
+		std::string* _file_checksum)
+	{
+		if (0 == _chunk_size) {
+			THROW(SYS_INVALID_INPUT_PARAM, "chunk size must be greater than zero");
+		}
+
+		const auto fd = open(_file_path.c_str(), O_RDONLY);
+		if (fd < 0) {
+			THROW(UNIX_FILE_OPEN_ERR - errno, fmt::format("failed to open [{}]", _file_path));
+		}
+
+		irods::at_scope_exit close_fd{[fd] { close(fd); }};
+
+		struct stat st{};
+		if (fstat(fd, &st) < 0) {
+			THROW(UNIX_FILE_STAT_ERR - errno, fmt::format("failed to stat [{}]", _file_path));
+		}
+
+		const auto file_size = static_cast<std::uint64_t>(st.st_size);
+		const auto number_of_chunks = (file_size + _chunk_size - 1) / _chunk_size;
+
+		std::vector<sha256_digest_type> chunk_digests(number_of_chunks);
+
+		// the checksum of the whole file is computed by the calling thread from the same mapping,
+		// following the workers through the file so that it is read from storage only once
+		auto* file_digest = _file_checksum ? EVP_MD_CTX_new() : nullptr;
+		irods::at_scope_exit free_file_digest{[file_digest] { EVP_MD_CTX_free(file_digest); }};
+		if (_file_checksum && !EVP_DigestInit_ex(file_digest, EVP_sha256(), nullptr)) {
+			THROW(SYS_INTERNAL_ERR, "EVP_DigestInit_ex failed to initialize sha256");
+		}
+
+		if (number_of_chunks > 0) {
+			auto* base = mmap(nullptr, file_size, PROT_READ, MAP_SHARED, fd, 0);
+			if (MAP_FAILED == base) {
+				THROW(SYS_INTERNAL_ERR, fmt::format("failed to mmap [{}] errno [{}]", _file_path, errno));
+			}
+
+			irods::at_scope_exit unmap{[base, file_size] { munmap(base, file_size); }};
+
+			const auto* bytes = static_cast<const unsigned char*>(base);
+
+			// each worker claims the next unhashed chunk until all chunks are consumed
+			std::atomic<std::uint64_t> next_chunk{0};
+			std::atomic<bool> failed{false};
+
+			auto hash_chunks = [&] {
+				try {
+					for (auto i = next_chunk++; i < number_of_chunks && !failed; i = next_chunk++) {
+						const auto offset = i * _chunk_size;
+						const auto length = std::min(_chunk_size, file_size - offset);
+						madvise(const_cast<unsigned char*>(bytes) + offset, length, MADV_SEQUENTIAL);
+						chunk_digests[i] = sha256(bytes + offset, length);
+						if (!_file_checksum) {
+							madvise(const_cast<unsigned char*>(bytes) + offset, length, MADV_DONTNEED);
+						}
+					}
+				}
+				catch (...) {
+					failed = true;
+				}
+			};
+
+			const auto number_of_threads =
+				std::max<std::uint64_t>(1, std::min<std::uint64_t>(_number_of_threads, number_of_chunks));
+
+			std::vector<std::thread> workers;
+			for (std::uint64_t i = _file_checksum ? 0 : 1; i < number_of_threads; ++i) {
+				workers.emplace_back(hash_chunks);
+			}
+
+			if (_file_checksum) {
+				for (std::uint64_t offset = 0; offset < file_size && !failed; offset += _chunk_size) {
+					if (!EVP_DigestUpdate(file_digest, bytes + offset, std::min(_chunk_size, file_size - offset))) {
+						failed = true;
+					}
+				}
+			}
+			else {
+				hash_chunks();
+			}
+
+			for (auto& w : workers) {
+				w.join();
+			}
+
+			if (failed) {
+				THROW(SYS_INTERNAL_ERR, fmt::format("failed to compute chunk digests for [{}]", _file_path));
+			}
+		}
+
+		// the manifest digest is the sha256 of the concatenated chunk digests
+		std::vector<unsigned char> concatenated{};
+		concatenated.reserve(number_of_chunks * std::tuple_size_v<sha256_digest_type>);
+		for (const auto& d : chunk_digests) {
+			concatenated.insert(concatenated.end(), d.begin(), d.end());
+		}
+
+		const auto root = sha256(concatenated.data(), concatenated.size());
+
+		if (_file_checksum) {
+			// the checksum takes the form of those in the catalog, sha2:<base64 digest>
+			sha256_digest_type digest{};
+			unsigned int length{};
+			if (!EVP_DigestFinal_ex(file_digest, digest.data(), &length)) {
+				THROW(SYS_INTERNAL_ERR, "EVP_DigestFinal_ex failed to compute sha256");
+			}
+
+			std::array<unsigned char, 4 * ((std::tuple_size_v<sha256_digest_type> + 2) / 3) + 1> encoded{};
+			const auto size = EVP_EncodeBlock(encoded.data(), digest.data(), digest.size());
+			*_file_checksum = "sha2:" + std::string(reinterpret_cast<const char*>(encoded.data()), size);
+		}
+
+		return to_hex_string(root.data(), root.size());
+
+	} // compute_sha256_manifest
+
+	bool verify_sampled_ranges_for_resource(
+		rsComm_t* _comm,
+		const std::string& _logical_path,
+		const std::string& _resource_name,
+		const sampling_configuration& _configuration,
+		const std::function<bool()>& _verify_entire_replica)
+	{
+		throw_if_empty("logical path", _logical_path);
+		throw_if_empty("resource name", _resource_name);
+
+		std::string coll_name, obj_name;
+		get_object_and_collection_from_path(_logical_path, coll_name, obj_name);
+
+		const auto leaf_str = get_leaf_resources_string(_resource_name);
+		const auto query_str = fmt::format(
+			"SELECT DATA_PATH, DATA_RESC_HIER, DATA_SIZE, DATA_MODIFY_TIME, DATA_RESC_ID"
+			" WHERE DATA_NAME = '{}' AND COLL_NAME = '{}' AND DATA_RESC_ID IN ({})",
+			obj_name,
+			coll_name,
+			leaf_str);
+
+		irods::query<rsComm_t> qobj{_comm, query_str, 1};
+		if (qobj.size() == 0) {
+			THROW(
+				SYS_REPLICA_DOES_NOT_EXIST,
+				fmt::format("replica for [{}] does not exist on resource [{}]", _logical_path, _resource_name));
+		}
+
+		const auto result = qobj.front();
+		const auto& file_path = result[0];
+		const auto& hierarchy = result[1];
+		const auto data_size = boost::lexical_cast<std::uint64_t>(result[2]);
+		const auto& modify_time = result[3];
+		const auto resc_id = boost::lexical_cast<rodsLong_t>(result[4]);
+
+		// the size at rest is always verified in full
+		const auto fs_size = get_file_size_from_filesystem(_comm, _logical_path, hierarchy, file_path);
+		if (static_cast<std::uint64_t>(fs_size) != data_size) {
+			return false;
+		}
+
+		if (0 == data_size) {
+			return true;
+		}
+
+		// the replica is divided into a fixed grid of ranges, no larger than the replica itself
+		const auto requested_ranges = std::min<std::uint64_t>(
+			data_size, std::clamp<std::uint64_t>(_configuration.number_of_ranges, 1, maximum_number_of_sampled_ranges));
+		const auto range_size = (data_size + requested_ranges - 1) / requested_ranges;
+		const auto number_of_ranges = (data_size + range_size - 1) / range_size;
+
+		std::string location{};
+		if (const auto err = irods::get_resource_property<std::string>(resc_id, irods::RESOURCE_LOCATION, location);
+		    !err.ok())
+		{
+			THROW(err.code(), err.result());
+		}
+
+		fileOpenInp_t open_inp{};
+		rstrcpy(open_inp.addr.hostAddr, location.c_str(), sizeof(open_inp.addr.hostAddr));
+		rstrcpy(open_inp.resc_hier_, hierarchy.c_str(), sizeof(open_inp.resc_hier_));
+		rstrcpy(open_inp.objPath, _logical_path.c_str(), sizeof(open_inp.objPath));
+		rstrcpy(open_inp.fileName, file_path.c_str(), sizeof(open_inp.fileName));
+		open_inp.flags = O_RDONLY;
+
+		const auto file_index = rsFileOpen(_comm, &open_inp);
+		if (file_index < 0) {
+			THROW(file_index, fmt::format("failed to open [{}] on [{}]", file_path, hierarchy));
+		}
+
+		irods::at_scope_exit close_file{[_comm, file_index] {
+			fileCloseInp_t close_inp{};
+			close_inp.fileInx = file_index;
+			rsFileClose(_comm, &close_inp);
+		}};
+
+		auto range_digest = [&](const std::uint64_t _index) {
+			const auto offset = _index * range_size;
+			return compute_range_digest(_comm, file_index, offset, std::min(range_size, data_size - offset));
+		};
+
+		// recorded digests take the form <modify time>:<range size>:<digests>
+		const auto prefix = fmt::format("{}:{}:", modify_time, range_size);
+		const auto recorded = get_sampled_digests(_comm, coll_name, obj_name, _resource_name);
+
+		if (0 == recorded.compare(0, prefix.size(), prefix) &&
+		    recorded.size() - prefix.size() == number_of_ranges * sampled_digest_size * 2)
+		{
+			const auto number_to_sample = std::clamp<std::uint64_t>(
+				static_cast<std::uint64_t>(std::ceil(_configuration.sample_fraction * number_of_ranges)),
+				1,
+				number_of_ranges);
+			const auto cycle = static_cast<std::uint64_t>(std::time(nullptr)) /
+			                   std::max<std::uint64_t>(1, _configuration.cycle_duration_in_seconds);
+
+			const auto selected = select_sampled_ranges(
+				fmt::format("{}:{}", _logical_path, _resource_name), number_of_ranges, number_to_sample, cycle);
+
+			for (const auto i : selected) {
+				const auto expected =
+					recorded.substr(prefix.size() + i * sampled_digest_size * 2, sampled_digest_size * 2);
+				if (range_digest(i) != expected) {
+					return false;
+				}
+			}
+
+			return true;
+		}
+
+		// no digests exist for the current state of the replica, it must be
+		// verified in full once before its range digests may be trusted
+		if (!_verify_entire_replica()) {
+			return false;
+		}
+
+		std::string digests{prefix};
+		for (std::uint64_t i = 0; i < number_of_ranges; ++i) {
+			digests += range_digest(i);
+		}
+
+		record_sampled_digests(_comm, _logical_path, _resource_name, recorded, digests);
+
+		return true;
+
+	} // verify_sampled_ranges_for_resource
+
+	bool verify_replica_at_rest(
+		rsComm_t* _comm,
+		const std::string& _verification_type,
+		const std::string& _logical_path,
+		const std::string& _resource_name,
+		const sampling_configuration& _sampling)
+	{
+		throw_if_empty("logical path", _logical_path);
+		throw_if_empty("resource name", _resource_name);
+
+		std::string file_path;
+		std::string data_size;
+		std::string data_hierarchy;
+		std::string data_checksum;
+
+		capture_replica_attributes(
+			_comm, _logical_path, _resource_name, file_path, data_size, data_hierarchy, data_checksum);
+
+		if (_verification_type.empty() || verification_type::catalog == _verification_type) {
+			// the replica is registered in the catalog
+			return true;
+		}
+		else if (verification_type::filesystem == _verification_type) {
+			const auto fs_size = get_file_size_from_filesystem(_comm, _logical_path, data_hierarchy, file_path);
+
+			return (fs_size == boost::lexical_cast<rodsLong_t>(data_size));
+		}
+		else if (verification_type::checksum == _verification_type) {
+			return verify_checksum_at_rest(
+				_comm, _logical_path, _resource_name, data_hierarchy, file_path, data_size, data_checksum);
+		}
+		else if (verification_type::sampled == _verification_type) {
+			return verify_sampled_ranges_for_resource(_comm, _logical_path, _resource_name, _sampling, [&] {
+				return verify_checksum_at_rest(
+					_comm, _logical_path, _resource_name, data_hierarchy, file_path, data_size, data_checksum);
+			});
+		}
+
+		THROW(SYS_INVALID_INPUT_PARAM, fmt::format("invalid verification type [{}]", _verification_type));
+
+	} // verify_replica_at_rest
+
+	vault_scan_report
+	scan_resource_vault(rsComm_t* _comm, const std::string& _resource_name, const std::uint32_t _number_of_threads)
+	{
+		throw_if_empty("resource name", _resource_name);
+
+		if (!resource_is_local_unixfilesystem(_resource_name)) {
+			THROW(
+				SYS_NOT_SUPPORTED,
+				fmt::format("resource [{}] is not a unixfilesystem local to this server", _resource_name));
+		}
+
+		rodsLong_t resc_id{};
+		if (const auto err = resc_mgr.hier_to_leaf_id(_resource_name, resc_id); !err.ok()) {
+			THROW(err.code(), err.result());
+		}
+
+		std::string vault_path{};
+		if (const auto err = irods::get_resource_property<std::string>(resc_id, irods::RESOURCE_PATH, vault_path);
+		    !err.ok())
+		{
+			THROW(err.code(), err.result());
+		}
+
+		while (vault_path.size() > 1 && '/' == vault_path.back()) {
+			vault_path.pop_back();
+		}
+
+		// a single pass of the vault, joined in memory against the catalog as it is streamed
+		auto files = list_vault(vault_path, _number_of_threads);
+
+		vault_scan_report report{};
+		report.files_scanned = files.size();
+
+		const auto query_str =
+			fmt::format("SELECT DATA_PATH, DATA_SIZE, COLL_NAME, DATA_NAME WHERE DATA_RESC_ID = '{}'", resc_id);
+
+		for (const auto& row : irods::query<rsComm_t>{_comm, query_str}) {
+			++report.replicas_scanned;
+
+			const auto logical_path = fmt::format("{}/{}", row[2], row[3]);
+			const auto catalog_size = boost::lexical_cast<rodsLong_t>(row[1]);
+
+			const auto file = files.find(row[0]);
+			if (files.end() == file) {
+				report.missing.push_back({logical_path, row[0], catalog_size, -1});
+				continue;
+			}
+
+			if (file->second != catalog_size) {
+				report.size_mismatch.push_back({logical_path, row[0], catalog_size, file->second});
+			}
+
+			files.erase(file);
+		}
+
+		// files remaining in the listing are not registered in the catalog
+		for (const auto& [physical_path, size] : files) {
+			report.orphaned.push_back({std::string{}, physical_path, -1, size});
+		}
+
+		return report;
+
+	} // scan_resource_vault
+
 	bool verify_replica_for_destination_resource(
 		rsComm_t* _comm,
 		const std::string& _verification_type,
 		const std::string& _logical_path,
 		const std::string& _source_resource,
-		const std::string& _destination_resource)
+		const std::string& _destination_resource,
+		const sampling_configuration& _sampling)
 	{
 		throw_if_empty("verification type", _verification_type);
 		throw_if_empty("logical path", _logical_path);
@@ -265,6 +973,25 @@ namespace irods
 
 			return (source_data_checksum == destination_data_checksum);
 		}
+		else if (verification_type::sampled == _verification_type) {
+			if (source_data_size != destination_data_size) {
+				return false;
+			}
+
+			return verify_sampled_ranges_for_resource(_comm, _logical_path, _destination_resource, _sampling, [&] {
+				// the destination must match the source in full before its ranges are recorded
+				if (source_data_checksum.size() == 0) {
+					source_data_checksum = compute_checksum_for_resource(_comm, _logical_path, _source_resource);
+				}
+
+				if (destination_data_checksum.size() == 0) {
+					destination_data_checksum =
+						compute_checksum_for_resource(_comm, _logical_path, _destination_resource);
+				}
+
+				return (source_data_checksum == destination_data_checksum);
+			});
+		}
 		else {
 			THROW(SYS_INVALID_INPUT_PARAM, fmt::format("invalid verification type [()]", _verification_type));
 		}
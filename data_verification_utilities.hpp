@@ -1,20 +1,68 @@
 
 #include <irods/rcConnect.h>
+#include <cstdint>
+#include <functional>
 #include <string>
+#include <vector>
 
 namespace irods
 {
+	struct sampling_configuration
+	{
+		double sample_fraction{0.1};
+		std::uint32_t number_of_ranges{64};
+		std::uint64_t cycle_duration_in_seconds{86400};
+	};
+
+	struct vault_scan_entry
+	{
+		std::string logical_path;
+		std::string physical_path;
+		rodsLong_t catalog_size{-1};
+		rodsLong_t filesystem_size{-1};
+	};
+
+	struct vault_scan_report
+	{
+		std::uint64_t files_scanned{};
+		std::uint64_t replicas_scanned{};
+		std::vector<vault_scan_entry> missing;
+		std::vector<vault_scan_entry> size_mismatch;
+		std::vector<vault_scan_entry> orphaned;
+	};
+
 	bool verify_replica_for_destination_resource(
 		rsComm_t* _comm,
 		const std::string& _verification_type,
 		const std::string& _logical_path,
 		const std::string& _source_resource,
-		const std::string& _destination_resource);
+		const std::string& _destination_resource,
+		const sampling_configuration& _sampling = {});
 	void get_object_and_collection_from_path(
 		const std::string& _logical_path,
 		std::string& _collection_name,
 		std::string& _object_name);
 	std::string
 	compute_checksum_for_resource(rsComm_t* _comm, const std::string& _logical_path, const std::string& _resource_name);
+	bool resource_is_local_unixfilesystem(const std::string& _resource_hierarchy);
+	std::string compute_sha256_manifest(
+		const std::string& _file_path,
+		const std::uint64_t _chunk_size,
+		const std::uint32_t _number_of_threads,
+		std::string* _file_checksum = nullptr);
+	bool verify_sampled_ranges_for_resource(
+		rsComm_t* _comm,
+		const std::string& _logical_path,
+		const std::string& _resource_name,
+		const sampling_configuration& _configuration,
+		const std::function<bool()>& _verify_entire_replica);
+	bool verify_replica_at_rest(
+		rsComm_t* _comm,
+		const std::string& _verification_type,
+		const std::string& _logical_path,
+		const std::string& _resource_name,
+		const sampling_configuration& _sampling = {});
+	vault_scan_report
+	scan_resource_vault(rsComm_t* _comm, const std::string& _resource_name, const std::uint32_t _number_of_threads);
 
 } // namespace irods
@@ -0,0 +1,812 @@
+#ifndef IRODS_POLICY_COMPOSITION_FRAMEWORK_DISPATCH_QUEUE_HPP
+#define IRODS_POLICY_COMPOSITION_FRAMEWORK_DISPATCH_QUEUE_HPP
+
+#include "policy_composition_framework_utilities.hpp"
+#include "policy_composition_framework_keywords.hpp"
+
+#include <irods/client_connection.hpp>
+#include <irods/execMyRule.h>
+#include <irods/irods_configuration_keywords.hpp>
+#include <irods/msParam.h>
+#include <irods/rcMisc.h>
+#include <irods/rodsErrorTable.h>
+
+#include <fmt/format.h>
+
+#include <sys/file.h>
+#include <fcntl.h>
+#include <signal.h>
+#include <unistd.h>
+
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <condition_variable>
+#include <deque>
+#include <filesystem>
+#include <fstream>
+#include <functional>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <thread>
+#include <vector>
+
+namespace irods::policy_composition::event_handler
+{
+
+	// clang-format off
+    namespace ipc = irods::policy_composition;
+    namespace kw  = irods::policy_composition::keywords;
+	// clang-format on
+
+	// policies of the post and finally clauses may be dispatched by background workers rather
+	// than within the api call of the client.  events are sharded across the workers by logical
+	// path, so events for a given data object are dispatched in the order they occurred.  each
+	// worker invokes policies through its own connection to the local server
+	class dispatch_queue
+	{
+	  public:
+		// clang-format off
+        using json       = nlohmann::json;
+        using clock_type = std::chrono::steady_clock;
+		// clang-format on
+
+		explicit dispatch_queue(const json& _configuration)
+			: configuration_{_configuration}
+		{
+			// clang-format off
+            const auto workers  = ipc::get(_configuration, "number_of_workers",           std::uint32_t{4});
+            const auto capacity = ipc::get(_configuration, "queue_capacity",              std::uint32_t{1024});
+            const auto drain    = ipc::get(_configuration, "drain_timeout_in_seconds",    std::int64_t{5});
+            const auto interval = ipc::get(_configuration, "metrics_interval_in_seconds", std::int64_t{60});
+            overflow_           = ipc::get(_configuration, "overflow",                    std::string{"block"});
+            instance_           = ipc::get(_configuration, "rule_engine_instance",        std::string{"irods_rule_engine_plugin-cpp_default_policy-instance"});
+			// clang-format on
+
+			if ("block" != overflow_ && "drop" != overflow_ && "spill" != overflow_) {
+				THROW(SYS_INVALID_INPUT_PARAM, fmt::format("unknown overflow behavior [{}]", overflow_));
+			}
+
+			number_of_workers_ = std::max<std::uint32_t>(1, workers);
+			shard_capacity_ = std::max<std::size_t>(1, capacity / number_of_workers_);
+			drain_timeout_ = std::chrono::seconds(drain);
+			metrics_interval_ = std::chrono::seconds(interval);
+
+		} // ctor
+
+		dispatch_queue(const dispatch_queue&) = delete;
+		dispatch_queue& operator=(const dispatch_queue&) = delete;
+
+		~dispatch_queue()
+		{
+			stop();
+
+		} // dtor
+
+		// returns false should the event be invoked synchronously by the caller instead
+		auto enqueue(const json& _policy, const json& _parameters, const json& _configuration) -> bool
+		{
+			// a batch of objects for a policy which is not batch capable is expanded by the worker
+			event e{
+				_policy.at(kw::policy_to_invoke).get<std::string>(),
+				compact(_parameters),
+				_configuration,
+				now_in_milliseconds(),
+				_parameters.contains(kw::objects) && !_policy.value("batch_capable", false)};
+
+			// clang-format off
+            const auto window  = ipc::get(_policy, "coalesce_window_in_milliseconds",        std::int64_t{0});
+            const auto maximum = ipc::get(_policy, "coalesce_maximum_delay_in_milliseconds", window * 10);
+			// clang-format on
+
+			const auto coalescable = window > 0 && !e.parameters.contains(kw::objects);
+
+			// the rule text sent to the server is bounded in size, including the names of any coalesced events
+			const auto size =
+				coalescable ? rule_size(coalesced({e, {e.parameters.value(kw::event, std::string{})}})) : rule_size(e);
+			if (size >= META_STR_LEN) {
+				++metrics_.synchronous;
+				return false;
+			}
+
+			if (stopping_) {
+				++metrics_.synchronous;
+				return false;
+			}
+
+			std::call_once(started_, [this] { start(); });
+
+			auto& s = *shards_[std::hash<std::string>{}(logical_path(_parameters)) % shards_.size()];
+
+			std::unique_lock lock{s.mutex};
+
+			const auto spilling = "spill" == overflow_ && s.spilled;
+			const auto coalescing = coalescable && !spilling;
+
+			if (coalescing && coalesce(s, e, window)) {
+				return true;
+			}
+
+			// once a shard has spilled, its events are spilled until the worker reads them
+			// back so that the order of events is preserved
+			if (depth(s) >= shard_capacity_ || spilling) {
+				if ("drop" == overflow_) {
+					++metrics_.dropped;
+					return true;
+				}
+
+				if ("spill" == overflow_) {
+					spill(s, e);
+					s.ready.notify_one();
+					return true;
+				}
+
+				s.not_full.wait(lock, [&] { return depth(s) < shard_capacity_ || stopping_; });
+			}
+
+			if (coalescing) {
+				const auto now = clock_type::now();
+				const auto key = coalesce_key(e);
+				auto name = e.parameters.value(kw::event, std::string{});
+
+				s.pending.emplace(
+					key,
+					pending_event{
+						std::move(e),
+						{std::move(name)},
+						now + std::chrono::milliseconds(maximum),
+						now + std::chrono::milliseconds(window)});
+				++metrics_.enqueued;
+				s.ready.notify_one();
+
+				return true;
+			}
+
+			metrics_.enqueued += e.expand ? e.parameters.at(kw::objects).size() : 1;
+			s.events.push_back(std::move(e));
+			s.ready.notify_one();
+
+			return true;
+
+		} // enqueue
+
+		// workers drain their queues until the timeout, after which events which remain are
+		// spilled to local storage or dropped as configured
+		void stop()
+		{
+			if (shards_.empty()) {
+				return;
+			}
+
+			drain_deadline_ = clock_type::now() + drain_timeout_;
+			stopping_ = true;
+
+			for (auto& s : shards_) {
+				std::lock_guard lock{s->mutex};
+				s->ready.notify_all();
+				s->not_full.notify_all();
+			}
+
+			for (auto& w : workers_) {
+				if (w.joinable()) {
+					w.join();
+				}
+			}
+
+			for (auto& s : shards_) {
+				promote_due(*s, true);
+
+				for (const auto& e : s->events) {
+					if ("spill" == overflow_) {
+						spill(*s, e);
+					}
+					else {
+						++metrics_.dropped;
+					}
+				}
+
+				s->events.clear();
+			}
+
+			fold_metrics();
+
+			if (metrics_.dropped > 0) {
+				rodsLog(LOG_NOTICE, "asynchronous dispatch dropped [%lu] events", metrics_.dropped.load());
+			}
+
+			shards_.clear();
+			workers_.clear();
+
+		} // stop
+
+		// only the identity of the client is kept from the connection, which keeps the rule text
+		// within bounds and keeps authentication material out of local storage
+		static auto compact(const json& _parameters) -> json
+		{
+			auto parameters = _parameters;
+			if (!parameters.contains(kw::comm)) {
+				return parameters;
+			}
+
+			auto comm = json::object();
+			for (const auto* key : {"user_user_name", "user_rods_zone", "proxy_user_name", "proxy_rods_zone"}) {
+				if (parameters.at(kw::comm).contains(key)) {
+					comm[key] = parameters.at(kw::comm).at(key);
+				}
+			}
+
+			parameters[kw::comm] = comm;
+
+			return parameters;
+
+		} // compact
+
+	  private:
+		struct event
+		{
+			std::string policy_to_invoke;
+			json parameters;
+			json configuration;
+			std::int64_t enqueued_at{};
+			bool expand{};
+		};
+
+		// events for the same policy and logical path which arrive within the window of the last
+		// are merged into a single invocation, which is held for at most the maximum delay
+		struct pending_event
+		{
+			event latest;
+			std::vector<std::string> events;
+			clock_type::time_point deadline;
+			clock_type::time_point due;
+		};
+
+		struct shard
+		{
+			std::mutex mutex;
+			std::condition_variable ready;
+			std::condition_variable not_full;
+			std::deque<event> events;
+			std::map<std::string, pending_event> pending;
+			std::string spill_path;
+			bool spilled{};
+		};
+
+		struct metrics
+		{
+			std::atomic<std::uint64_t> enqueued{};
+			std::atomic<std::uint64_t> dispatched{};
+			std::atomic<std::uint64_t> failed{};
+			std::atomic<std::uint64_t> dropped{};
+			std::atomic<std::uint64_t> spilled{};
+			std::atomic<std::uint64_t> coalesced{};
+			std::atomic<std::uint64_t> synchronous{};
+			std::atomic<std::int64_t> total_latency{};
+			std::atomic<std::int64_t> maximum_latency{};
+		};
+
+		static auto now_in_milliseconds() -> std::int64_t
+		{
+			using namespace std::chrono;
+			return duration_cast<milliseconds>(system_clock::now().time_since_epoch()).count();
+
+		} // now_in_milliseconds
+
+		static auto logical_path(const json& _parameters) -> std::string
+		{
+			for (const auto* key : {"obj_path", "logical_path"}) {
+				if (_parameters.contains(key)) {
+					return _parameters.at(key).get<std::string>();
+				}
+			}
+
+			return {};
+
+		} // logical_path
+
+		// called with the lock of the shard held
+		static auto depth(const shard& _shard) -> std::size_t
+		{
+			return _shard.events.size() + _shard.pending.size();
+
+		} // depth
+
+		static auto coalesce_key(const event& _event) -> std::string
+		{
+			return fmt::format(
+				"{}\n{}\n{}", _event.policy_to_invoke, logical_path(_event.parameters), _event.configuration.dump());
+
+		} // coalesce_key
+
+		// the event which is invoked for a pending event
+		static auto coalesced(pending_event _pending) -> event
+		{
+			_pending.latest.parameters["coalesced_events"] = std::move(_pending.events);
+			return std::move(_pending.latest);
+
+		} // coalesced
+
+		// merges the event into one already pending, returns false should there be none.  should the
+		// merged rule text not fit, the pending event is queued as it stands and false is returned, so
+		// that the event begins another.  called with the lock of the shard held
+		auto coalesce(shard& _shard, const event& _event, const std::int64_t _window) -> bool
+		{
+			auto it = _shard.pending.find(coalesce_key(_event));
+			if (_shard.pending.end() == it) {
+				return false;
+			}
+
+			auto merged = it->second;
+
+			const auto name = _event.parameters.value(kw::event, std::string{});
+			if (std::find(merged.events.begin(), merged.events.end(), name) == merged.events.end()) {
+				merged.events.push_back(name);
+			}
+
+			// the latest parameters are invoked, the latency is measured from the first event
+			merged.latest.parameters = _event.parameters;
+
+			if (rule_size(coalesced(merged)) >= META_STR_LEN) {
+				_shard.events.push_back(coalesced(std::move(it->second)));
+				_shard.pending.erase(it);
+				return false;
+			}
+
+			auto& p = it->second;
+			p = std::move(merged);
+			p.due = std::min(p.deadline, clock_type::now() + std::chrono::milliseconds(_window));
+
+			++metrics_.coalesced;
+
+			return true;
+
+		} // coalesce
+
+		// moves pending events which are due to the queue, in the order in which they fell due,
+		// called with the lock of the shard held
+		void promote_due(shard& _shard, const bool _all)
+		{
+			const auto now = clock_type::now();
+
+			std::vector<std::map<std::string, pending_event>::iterator> due{};
+			for (auto it = _shard.pending.begin(); it != _shard.pending.end(); ++it) {
+				if (_all || it->second.due <= now) {
+					due.push_back(it);
+				}
+			}
+
+			std::sort(
+				due.begin(), due.end(), [](const auto& _a, const auto& _b) { return _a->second.due < _b->second.due; });
+
+			for (auto& it : due) {
+				_shard.events.push_back(coalesced(std::move(it->second)));
+				_shard.pending.erase(it);
+			}
+
+		} // promote_due
+
+		static auto rule_text(const event& _event) -> std::string
+		{
+			const json rule{
+				{kw::policy_to_invoke, _event.policy_to_invoke},
+				{kw::parameters, _event.parameters},
+				{kw::configuration, _event.configuration}};
+
+			return fmt::format("@external rule {{ {} }}", rule.dump());
+
+		} // rule_text
+
+		// the size of the largest rule text which will be sent for the event
+		static auto rule_size(const event& _event) -> std::size_t
+		{
+			if (!_event.expand) {
+				return rule_text(_event).size();
+			}
+
+			auto base = _event;
+			base.parameters.erase(kw::objects);
+
+			std::size_t largest{};
+			for (const auto& object : _event.parameters.at(kw::objects)) {
+				largest = std::max(largest, object.dump().size());
+			}
+
+			return rule_text(base).size() + largest;
+
+		} // rule_size
+
+		static auto to_json(const event& _event) -> json
+		{
+			return {
+				{kw::policy_to_invoke, _event.policy_to_invoke},
+				{kw::parameters, _event.parameters},
+				{kw::configuration, _event.configuration},
+				{"enqueued_at", _event.enqueued_at},
+				{"expand", _event.expand}};
+
+		} // to_json
+
+		static auto from_json(const json& _event) -> event
+		{
+			return {
+				_event.at(kw::policy_to_invoke).get<std::string>(),
+				_event.at(kw::parameters),
+				_event.at(kw::configuration),
+				_event.at("enqueued_at").get<std::int64_t>(),
+				_event.value("expand", false)};
+
+		} // from_json
+
+		void start()
+		{
+			directory_ = ipc::get_local_state_directory(configuration_, "asynchronous_dispatch");
+
+			for (std::uint32_t i = 0; i < number_of_workers_; ++i) {
+				auto s = std::make_unique<shard>();
+				s->spill_path = fmt::format("{}/{}.{}.spill", directory_, getpid(), i);
+				shards_.push_back(std::move(s));
+			}
+
+			for (std::uint32_t i = 0; i < number_of_workers_; ++i) {
+				workers_.emplace_back([this, i] { run(*shards_[i]); });
+			}
+
+			adopt_orphaned_spills();
+
+		} // start
+
+		// events spilled by agents which have since exited are taken up by this agent, a file
+		// is claimed by renaming it so that it is adopted only once
+		void adopt_orphaned_spills()
+		{
+			std::error_code ec{};
+			for (const auto& entry : std::filesystem::directory_iterator{directory_, ec}) {
+				const auto name = entry.path().filename().string();
+				if (entry.path().extension() != ".spill") {
+					continue;
+				}
+
+				const auto pid = std::atoi(name.c_str());
+				if (pid <= 0 || pid == getpid() || 0 == kill(pid, 0) || ESRCH != errno) {
+					continue;
+				}
+
+				const auto claimed = fmt::format("{}.{}.adopted", entry.path().string(), getpid());
+				if (0 != std::rename(entry.path().c_str(), claimed.c_str())) {
+					continue;
+				}
+
+				for (auto& e : read_spill(claimed)) {
+					reenqueue(std::move(e));
+				}
+
+				std::filesystem::remove(claimed, ec);
+			}
+
+		} // adopt_orphaned_spills
+
+		void reenqueue(event&& _event)
+		{
+			auto& s = *shards_[std::hash<std::string>{}(logical_path(_event.parameters)) % shards_.size()];
+
+			std::lock_guard lock{s.mutex};
+			spill(s, _event);
+			s.ready.notify_one();
+
+		} // reenqueue
+
+		// called with the lock of the shard held
+		void spill(shard& _shard, const event& _event)
+		{
+			std::ofstream out{_shard.spill_path, std::ios::app};
+			out << to_json(_event).dump() << '\n';
+
+			_shard.spilled = true;
+			++metrics_.spilled;
+
+		} // spill
+
+		auto read_spill(const std::string& _path) -> std::vector<event>
+		{
+			std::vector<event> events{};
+
+			std::ifstream in{_path};
+			for (std::string line; std::getline(in, line);) {
+				try {
+					events.push_back(from_json(json::parse(line)));
+				}
+				catch (const json::exception& _e) {
+					rodsLog(LOG_ERROR, "failed to parse spilled event in [%s] [%s]", _path.c_str(), _e.what());
+				}
+			}
+
+			return events;
+
+		} // read_spill
+
+		void run(shard& _shard)
+		{
+			std::unique_ptr<irods::experimental::client_connection> connection{};
+
+			while (true) {
+				std::vector<event> batch{};
+
+				{
+					std::unique_lock lock{_shard.mutex};
+
+					while (true) {
+						promote_due(_shard, stopping_);
+
+						if (stopping_ || !_shard.events.empty() || _shard.spilled) {
+							break;
+						}
+
+						if (_shard.pending.empty()) {
+							_shard.ready.wait(lock);
+						}
+						else {
+							const auto next = std::min_element(
+								_shard.pending.begin(), _shard.pending.end(), [](const auto& _a, const auto& _b) {
+									return _a.second.due < _b.second.due;
+								});
+							_shard.ready.wait_until(lock, next->second.due);
+						}
+					}
+
+					if (stopping_ && (clock_type::now() >= drain_deadline_ || _shard.events.empty())) {
+						return;
+					}
+
+					// events in memory precede those which were spilled
+					if (!_shard.events.empty()) {
+						batch.push_back(std::move(_shard.events.front()));
+						_shard.events.pop_front();
+					}
+					else {
+						batch = read_spill(_shard.spill_path);
+						std::filesystem::remove(_shard.spill_path);
+						_shard.spilled = false;
+					}
+				}
+
+				_shard.not_full.notify_one();
+
+				for (const auto& e : batch) {
+					if (!e.expand) {
+						dispatch(connection, e);
+						continue;
+					}
+
+					auto base = e;
+					base.parameters.erase(kw::objects);
+					base.expand = false;
+
+					for (const auto& object : e.parameters.at(kw::objects)) {
+						auto single = base;
+						single.parameters.update(object);
+						dispatch(connection, single);
+					}
+				}
+
+				if (clock_type::now() - last_metrics_.load() >= metrics_interval_) {
+					last_metrics_ = clock_type::now();
+					write_metrics();
+				}
+			}
+
+		} // run
+
+		void dispatch(std::unique_ptr<irods::experimental::client_connection>& _connection, const event& _event)
+		{
+			const auto latency = now_in_milliseconds() - _event.enqueued_at;
+			metrics_.total_latency += latency;
+
+			auto maximum = metrics_.maximum_latency.load();
+			while (latency > maximum && !metrics_.maximum_latency.compare_exchange_weak(maximum, latency)) {}
+
+			try {
+				if (!_connection) {
+					_connection = std::make_unique<irods::experimental::client_connection>();
+				}
+
+				const auto text = rule_text(_event);
+				if (text.size() >= META_STR_LEN) {
+					THROW(
+						SYS_INVALID_INPUT_PARAM,
+						fmt::format("rule text for [{}] is too long", _event.policy_to_invoke));
+				}
+
+				execMyRuleInp_t inp{};
+				rstrcpy(inp.myRule, text.c_str(), sizeof(inp.myRule));
+				rstrcpy(inp.outParamDesc, "ruleExecOut", sizeof(inp.outParamDesc));
+				addKeyVal(&inp.condInput, irods::KW_CFG_INSTANCE_NAME.c_str(), instance_.c_str());
+
+				msParamArray_t* out{};
+				rcComm_t& comm = *_connection;
+				const auto status = rcExecMyRule(&comm, &inp, &out);
+
+				clearKeyVal(&inp.condInput);
+				if (out) {
+					clearMsParamArray(out, 1);
+					free(out);
+				}
+
+				if (status < 0) {
+					// the connection may no longer be usable
+					_connection.reset();
+					THROW(status, fmt::format("failed to invoke [{}]", _event.policy_to_invoke));
+				}
+
+				++metrics_.dispatched;
+			}
+			catch (const irods::exception& _e) {
+				++metrics_.failed;
+				rodsLog(
+					LOG_ERROR,
+					"asynchronous dispatch of [%s] failed [%d] [%s]",
+					_event.policy_to_invoke.c_str(),
+					_e.code(),
+					_e.what());
+			}
+
+		} // dispatch
+
+		auto metrics_path(const pid_t _pid) const -> std::string
+		{
+			return fmt::format("{}/metrics.{}.json", directory_, _pid);
+
+		} // metrics_path
+
+		auto snapshot() -> json
+		{
+			std::uint64_t queued{};
+			for (auto& s : shards_) {
+				std::lock_guard lock{s->mutex};
+				queued += depth(*s);
+			}
+
+			const auto dispatched = metrics_.dispatched + metrics_.failed;
+
+			const json m{
+				{"enqueued", metrics_.enqueued.load()},
+				{"dispatched", metrics_.dispatched.load()},
+				{"failed", metrics_.failed.load()},
+				{"dropped", metrics_.dropped.load()},
+				{"spilled", metrics_.spilled.load()},
+				{"coalesced", metrics_.coalesced.load()},
+				{"synchronous", metrics_.synchronous.load()},
+				{"queue_depth", queued},
+				{"average_queue_latency_in_milliseconds",
+				 dispatched > 0 ? metrics_.total_latency.load() / static_cast<std::int64_t>(dispatched) : 0},
+				{"maximum_queue_latency_in_milliseconds", metrics_.maximum_latency.load()},
+				{"total_queue_latency_in_milliseconds", metrics_.total_latency.load()}};
+
+			return m;
+
+		} // snapshot
+
+		static void write_json(const std::string& _path, const json& _json)
+		{
+			const auto temporary = _path + ".tmp";
+
+			{
+				std::ofstream out{temporary, std::ios::trunc};
+				out << _json.dump(4) << '\n';
+			}
+
+			std::rename(temporary.c_str(), _path.c_str());
+
+		} // write_json
+
+		void write_metrics()
+		{
+			std::lock_guard metrics_lock{metrics_mutex_};
+			write_json(metrics_path(getpid()), snapshot());
+
+		} // write_metrics
+
+		// adds the counts of an agent to those of the agents before it
+		static void accumulate(json& _total, const json& _metrics)
+		{
+			for (const auto* key :
+			     {"enqueued", "dispatched", "failed", "dropped", "spilled", "coalesced", "synchronous"})
+			{
+				_total[key] = _total.value(key, std::uint64_t{0}) + _metrics.value(key, std::uint64_t{0});
+			}
+
+			_total["total_queue_latency_in_milliseconds"] =
+				_total.value("total_queue_latency_in_milliseconds", std::int64_t{0}) +
+				_metrics.value("total_queue_latency_in_milliseconds", std::int64_t{0});
+
+			_total["maximum_queue_latency_in_milliseconds"] = std::max(
+				_total.value("maximum_queue_latency_in_milliseconds", std::int64_t{0}),
+				_metrics.value("maximum_queue_latency_in_milliseconds", std::int64_t{0}));
+
+			const auto dispatched =
+				_total.at("dispatched").get<std::int64_t>() + _total.at("failed").get<std::int64_t>();
+			const auto total_latency = _total.at("total_queue_latency_in_milliseconds").get<std::int64_t>();
+			_total["average_queue_latency_in_milliseconds"] = dispatched > 0 ? total_latency / dispatched : 0;
+
+		} // accumulate
+
+		// as an agent stops its counts are added to metrics.json, which is shared by the agents of the
+		// server, and its own file is removed along with those of agents which exited without stopping,
+		// so that the directory holds a file only for each running agent
+		void fold_metrics()
+		{
+			std::lock_guard metrics_lock{metrics_mutex_};
+
+			const auto lock_path = directory_ + "/metrics.lock";
+			const auto fd = open(lock_path.c_str(), O_RDWR | O_CREAT, 0600);
+			if (fd < 0) {
+				rodsLog(LOG_ERROR, "failed to open [%s]", lock_path.c_str());
+				return;
+			}
+
+			flock(fd, LOCK_EX);
+
+			const auto total_path = directory_ + "/metrics.json";
+
+			json total = json::object();
+			if (std::ifstream in{total_path}; in) {
+				total = json::parse(in, nullptr, false);
+				if (total.is_discarded() || !total.is_object()) {
+					total = json::object();
+				}
+			}
+
+			accumulate(total, snapshot());
+			std::filesystem::remove(metrics_path(getpid()));
+
+			for (const auto& f : std::filesystem::directory_iterator{directory_}) {
+				const auto name = f.path().filename().string();
+				if (0 != name.rfind("metrics.", 0) || ".json" != f.path().extension() || "metrics.json" == name) {
+					continue;
+				}
+
+				const auto pid = static_cast<pid_t>(std::atol(f.path().stem().extension().string().substr(1).c_str()));
+				if (pid <= 0 || 0 == kill(pid, 0) || ESRCH != errno) {
+					continue;
+				}
+
+				std::ifstream in{f.path()};
+				if (const auto m = json::parse(in, nullptr, false); !m.is_discarded() && m.is_object()) {
+					accumulate(total, m);
+				}
+
+				std::filesystem::remove(f.path());
+			}
+
+			write_json(total_path, total);
+
+			flock(fd, LOCK_UN);
+			close(fd);
+
+		} // fold_metrics
+
+		const json configuration_;
+
+		std::uint32_t number_of_workers_{};
+		std::size_t shard_capacity_{};
+		std::string overflow_{};
+		std::string instance_{};
+		std::string directory_{};
+		std::chrono::seconds drain_timeout_{};
+		std::chrono::seconds metrics_interval_{};
+
+		std::once_flag started_{};
+		std::atomic<bool> stopping_{};
+		std::mutex metrics_mutex_{};
+		clock_type::time_point drain_deadline_{};
+		std::atomic<clock_type::time_point> last_metrics_{clock_type::now()};
+
+		std::vector<std::unique_ptr<shard>> shards_{};
+		std::vector<std::thread> workers_{};
+		metrics metrics_{};
+
+	}; // class dispatch_queue
+
+} // namespace irods::policy_composition::event_handler
+
+#endif // IRODS_POLICY_COMPOSITION_FRAMEWORK_DISPATCH_QUEUE_HPP
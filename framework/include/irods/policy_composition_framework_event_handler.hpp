@@ -5,8 +5,17 @@
 #include <irods/irods_re_ruleexistshelper.hpp>
 
 #include "policy_composition_framework_utilities.hpp"
+#include "policy_composition_framework_dispatch_queue.hpp"
+#include "policy_composition_framework_event_journal.hpp"
 #include "policy_composition_framework_plugin_configuration_json.hpp"
 
+#include <algorithm>
+#include <array>
+#include <bitset>
+#include <chrono>
+#include <ctime>
+#include <optional>
+
 #include "boost/any.hpp"
 #include "boost/lexical_cast.hpp"
 
@@ -15,21 +24,41 @@ namespace irods::policy_composition::event_handler
 
 	// clang-format off
     namespace ipc = irods::policy_composition;
-
-    using json                = nlohmann::json;
-    using handler_return_type = std::tuple<std::string, json>;
-    using handler_type        = handler_return_type (*)(const std::string&, const ipc::arguments_type&, ruleExecInfo_t*);
-    using handler_map_type    = std::map<std::string, handler_type>;
-    using configuration_type  = std::unique_ptr<irods::plugin_configuration_json>;
-    using consumed_pep_type   = std::set<std::string>;
-    using plugin_type         = pluggable_rule_engine<irods::default_re_ctx>;
-    using plugin_pointer_type = plugin_type*;
+    namespace kw  = irods::policy_composition::keywords;
+
+    using json                 = nlohmann::json;
+    using handler_return_type  = std::tuple<std::string, json>;
+    using handler_type         = handler_return_type (*)(const std::string&, const ipc::arguments_type&, ruleExecInfo_t*);
+    using handler_map_type     = std::map<std::string, handler_type>;
+    using configuration_type   = std::unique_ptr<irods::plugin_configuration_json>;
+    using consumed_pep_type    = std::set<std::string>;
+    using stop_hook_type       = std::function<void()>;
+    using clause_set_type      = std::set<std::string>;
+    using clause_selector_type = std::function<clause_set_type(const json&)>;
+    using plugin_type          = pluggable_rule_engine<irods::default_re_ctx>;
+    using plugin_pointer_type  = plugin_type*;
 	// clang-format on
 
 	handler_map_type handlers{};
 	configuration_type configuration{};
 	consumed_pep_type consumed_policy_enforcement_points{};
+	std::vector<stop_hook_type> stop_hooks{};
+	std::map<std::string, clause_selector_type> handler_stems{};
+	std::unique_ptr<dispatch_queue> dispatcher{};
+	std::unique_ptr<ipc::event_journal> journal{};
+	std::unique_ptr<ipc::load_monitor> monitor{};
+	std::map<std::string, std::chrono::steady_clock::time_point> api_started{};
+
+	// only api calls bound by the catalog are timed, as the duration of an api call which transfers
+	// data reflects the size of the transfer rather than the load upon the catalog
+	const std::set<std::string> catalog_bound_apis{
+		"pep_api_mod_avu_metadata",
+		"pep_api_coll_create",
+		"pep_api_phy_path_reg",
+		"pep_api_data_obj_rename",
+		"pep_api_general_admin"};
 	std::string plugin_instance_name{};
+	std::vector<std::string> comm_fields{};
 
 	const std::string SKIP_POLICY_INVOCATION{"skip_policy_invocation"};
 
@@ -50,43 +79,361 @@ namespace irods::policy_composition::event_handler
 		const std::string resource{"resource"};
 	} // namespace interfaces
 
-	auto register_handler(const std::string& _operation, const std::string& _interface, handler_type _handler) -> void
+	// the clauses in which the configured policies subscribe to an event, and the union of the fields
+	// they require, including those read by their conditionals.  a policy which does not declare
+	// "required_fields" requires all fields
+	struct subscription
+	{
+		std::bitset<4> clauses;
+		bool all_fields{};
+		std::set<std::string> fields;
+	};
+
+	std::map<std::string, subscription> subscriptions{};
+
+	auto clause_index(const std::string& _clause) -> std::optional<std::size_t>
+	{
+		static const std::array<std::string, 4> clauses{
+			policy_clauses::pre, policy_clauses::post, policy_clauses::except, policy_clauses::finally};
+
+		const auto it = std::find(clauses.begin(), clauses.end(), _clause);
+		if (clauses.end() == it) {
+			return std::nullopt;
+		}
+
+		return std::distance(clauses.begin(), it);
+
+	} // clause_index
+
+	// the fields from which the parameters named by a conditional are captured
+	auto conditional_fields(const json& _conditional) -> std::set<std::string>
+	{
+		// clang-format off
+        const std::set<std::string> path_fields    {"obj_path", kw::logical_path, kw::query_results};
+        const std::set<std::string> resource_fields{kw::source_resource, kw::destination_resource, "cond_input", kw::query_results};
+        const std::set<std::string> user_fields    {kw::user_name, kw::comm, kw::query_results};
+		// clang-format on
+
+		std::set<std::string> fields{};
+
+		if (_conditional.contains(kw::logical_path)) {
+			fields.insert(path_fields.begin(), path_fields.end());
+		}
+
+		if (_conditional.contains(kw::source_resource) || _conditional.contains(kw::destination_resource)) {
+			fields.insert(resource_fields.begin(), resource_fields.end());
+		}
+
+		if (_conditional.contains(kw::user_name)) {
+			fields.insert(user_fields.begin(), user_fields.end());
+		}
+
+		if (_conditional.contains(kw::metadata_applied)) {
+			fields.insert(kw::metadata);
+		}
+
+		if (_conditional.contains(kw::metadata_exists)) {
+			const auto entity_type = _conditional.at(kw::metadata_exists).value(kw::entity_type, std::string{});
+			if (kw::data_object == entity_type || kw::collection == entity_type) {
+				fields.insert(path_fields.begin(), path_fields.end());
+			}
+			else if (kw::resource == entity_type) {
+				fields.insert(resource_fields.begin(), resource_fields.end());
+			}
+			else if (kw::user == entity_type) {
+				fields.insert(user_fields.begin(), user_fields.end());
+			}
+		}
+
+		return fields;
+
+	} // conditional_fields
+
+	auto build_subscriptions(const json& _policies_to_invoke) -> void
+	{
+		subscriptions.clear();
+
+		for (const auto& policy : _policies_to_invoke) {
+			if (!policy.contains(kw::policy_to_invoke) || !policy.contains(kw::events) ||
+			    !policy.contains(kw::active_policy_clauses))
+			{
+				continue;
+			}
+
+			for (const auto& e : policy.at(kw::events)) {
+				auto event = e.get<std::string>();
+				std::transform(event.begin(), event.end(), event.begin(), [](unsigned char _letter) {
+					return ::toupper(_letter);
+				});
+
+				auto& s = subscriptions[event];
+
+				for (const auto& c : policy.at(kw::active_policy_clauses)) {
+					if (const auto index = clause_index(c.get<std::string>()); index) {
+						s.clauses.set(*index);
+					}
+				}
+
+				if (policy.contains("required_fields")) {
+					for (const auto& f : policy.at("required_fields")) {
+						s.fields.insert(f.get<std::string>());
+					}
+
+					if (policy.contains(kw::conditional)) {
+						s.fields.merge(conditional_fields(policy.at(kw::conditional)));
+					}
+				}
+				else {
+					s.all_fields = true;
+				}
+			}
+		}
+
+	} // build_subscriptions
+
+	// handlers may return before serializing an event to which no policy subscribes
+	auto is_subscribed(const std::string& _rule_name, const std::string& _event) -> bool
+	{
+		const auto it = subscriptions.find(_event);
+		if (subscriptions.end() == it) {
+			return false;
+		}
+
+		const auto index = clause_index(_rule_name.substr(_rule_name.find_last_of('_') + 1));
+
+		return index && it->second.clauses.test(*index);
+
+	} // is_subscribed
+
+	// handlers serialize only the fields which are selected for an event, an empty selector selects
+	// every field.  the event and policy enforcement point are always selected, as the framework
+	// relies upon them
+	auto select_fields(const std::string& _event) -> ipc::field_selector
+	{
+		const auto it = subscriptions.find(_event);
+		if (subscriptions.end() == it || it->second.all_fields) {
+			return {};
+		}
+
+		return [&s = it->second](const std::string& _field) {
+			return kw::event == _field || kw::policy_enforcement_point == _field || s.fields.count(_field) > 0;
+		};
+
+	} // select_fields
+
+	auto is_selected(const ipc::field_selector& _selector, const std::string& _field) -> bool
+	{
+		return !_selector || _selector(_field);
+
+	} // is_selected
+
+	// fields which a handler serializes without consulting the selector are removed
+	auto select_required_fields(const std::string& _event, json& _parameters) -> void
+	{
+		const auto selector = select_fields(_event);
+		if (!selector || !_parameters.is_object()) {
+			return;
+		}
+
+		for (auto p = _parameters.begin(); p != _parameters.end();) {
+			if (selector(p.key())) {
+				++p;
+			}
+			else {
+				p = _parameters.erase(p);
+			}
+		}
+
+	} // select_required_fields
+
+	// a handler which keeps state across the clauses of an operation provides the clauses it must
+	// observe whether or not a policy is configured for them
+	auto register_handler(
+		const std::string& _operation,
+		const std::string& _interface,
+		handler_type _handler,
+		clause_selector_type _stateful_clauses = {}) -> void
 	{
 		const std::string prefix{"pep"}, sep{"_"};
 		const std::string stem{prefix + sep + _interface + sep + _operation + sep};
 
 		auto k0 = stem + policy_clauses::pre;
-		consumed_policy_enforcement_points.insert(k0);
 		handlers[k0] = _handler;
 
 		auto k1 = stem + policy_clauses::post;
-		consumed_policy_enforcement_points.insert(k1);
 		handlers[k1] = _handler;
 
 		auto k2 = stem + policy_clauses::except;
-		consumed_policy_enforcement_points.insert(k2);
 		handlers[k2] = _handler;
 
 		auto k3 = stem + policy_clauses::finally;
-		consumed_policy_enforcement_points.insert(k3);
 		handlers[k3] = _handler;
 
+		handler_stems[stem] = std::move(_stateful_clauses);
+
 	} // register handler
 
+	// only the clauses used by the configured policies, and those observed by stateful handlers, are
+	// consumed.  the server then routes no other policy enforcement point to this instance
+	auto consume_policy_enforcement_points(const json& _plugin_configuration) -> std::string
+	{
+		clause_set_type configured_clauses{};
+		for (const auto& [event, s] : subscriptions) {
+			for (const auto& c :
+			     {policy_clauses::pre, policy_clauses::post, policy_clauses::except, policy_clauses::finally})
+			{
+				if (s.clauses.test(*clause_index(c))) {
+					configured_clauses.insert(c);
+				}
+			}
+		}
+
+		// the names are grouped by their clauses and registered as a regex factored by prefix, which
+		// rejects a name within its first few characters rather than after trying every alternative
+		const std::string prefix{"pep_"};
+		std::map<clause_set_type, std::vector<std::string>> operations_by_clauses{};
+
+		consumed_policy_enforcement_points.clear();
+		for (const auto& [stem, stateful_clauses] : handler_stems) {
+			auto clauses = configured_clauses;
+			if (stateful_clauses) {
+				clauses.merge(stateful_clauses(_plugin_configuration));
+			}
+
+			// the latency of an api call is observed from its pre to its post clause
+			if (_plugin_configuration.contains("load_shedding") &&
+			    catalog_bound_apis.count(stem.substr(0, stem.size() - 1)) > 0)
+			{
+				clauses.insert(policy_clauses::pre);
+				clauses.insert(policy_clauses::post);
+			}
+
+			for (const auto& c : clauses) {
+				consumed_policy_enforcement_points.insert(stem + c);
+			}
+
+			if (!clauses.empty()) {
+				operations_by_clauses[clauses].push_back(stem.substr(prefix.size(), stem.size() - prefix.size() - 1));
+			}
+		}
+
+		const auto join = [](const auto& _names) {
+			std::string joined{};
+			for (const auto& n : _names) {
+				joined += (joined.empty() ? "" : "|") + n;
+			}
+
+			return joined;
+		};
+
+		std::string regex{};
+		for (const auto& [clauses, operations] : operations_by_clauses) {
+			regex += (regex.empty() ? "" : "|") + fmt::format("(?:{})_(?:{})", join(operations), join(clauses));
+		}
+
+		return regex.empty() ? regex : fmt::format("^{}(?:{})$", prefix, regex);
+
+	} // consume_policy_enforcement_points
+
+	// hooks are invoked as the plugin is stopped, when no connection is available, in
+	// order to preserve any state the event handler has yet to write to the catalog
+	auto register_stop_hook(stop_hook_type _hook) -> void
+	{
+		stop_hooks.push_back(std::move(_hook));
+
+	} // register_stop_hook
+
+	// the serialized connection is reused across policy enforcement points, optionally trimmed to the
+	// fields which are read by the configured policies
+	auto serialize_comm(rsComm_t* _comm) -> const json&
+	{
+		return ipc::serialize_rsComm_to_json_cached(_comm, comm_fields);
+
+	} // serialize_comm
+
+	auto make_journal(const json& _configuration) -> std::unique_ptr<ipc::event_journal>
+	{
+		// clang-format off
+        const auto segment_size = ipc::get(_configuration, "segment_size_in_bytes", std::uint64_t{16 * 1024 * 1024});
+        const auto synchronous  = ipc::get(_configuration, "synchronous_writes",    false);
+		// clang-format on
+
+		return std::make_unique<ipc::event_journal>(
+			ipc::get_local_state_directory(_configuration, "event_journal"), segment_size, synchronous);
+
+	} // make_journal
+
+	// returns false should the policy be invoked synchronously by the caller instead
+	auto dispatch(const json& _policy, const json& _parameters, const json& _configuration) -> bool
+	{
+		if ("journal" != _policy.value("dispatch", std::string{})) {
+			return dispatcher && dispatcher->enqueue(_policy, _parameters, _configuration);
+		}
+
+		if (!journal) {
+			return false;
+		}
+
+		// a batch of objects for a policy which is not batch capable is expanded by the consumer
+		try {
+			journal->append(
+				{{kw::policy_to_invoke, _policy.at(kw::policy_to_invoke)},
+			     {kw::parameters, dispatch_queue::compact(_parameters)},
+			     {kw::configuration, _configuration},
+			     {"expand", _parameters.contains(kw::objects) && !_policy.value("batch_capable", false)},
+			     {"time", std::time(nullptr)}});
+		}
+		catch (const irods::exception& _e) {
+			rodsLog(LOG_ERROR, "[%s] failed to journal event [%s]", plugin_instance_name.c_str(), _e.what());
+			return false;
+		}
+
+		return true;
+
+	} // dispatch
+
 	auto rule_name_is_supported(const std::string& _rule_name)
 	{
 		return (consumed_policy_enforcement_points.find(_rule_name) != consumed_policy_enforcement_points.end());
 	} // rule_name_is_supported
 
+	void observe_api_latency(const std::string& _pep)
+	{
+		const auto split = _pep.find_last_of('_');
+		const auto stem = _pep.substr(0, split);
+		const auto clause = _pep.substr(split + 1);
+
+		if (catalog_bound_apis.count(stem) == 0) {
+			return;
+		}
+
+		if (policy_clauses::pre == clause) {
+			api_started[stem] = std::chrono::steady_clock::now();
+			return;
+		}
+
+		if (const auto it = api_started.find(stem); policy_clauses::post == clause && it != api_started.end()) {
+			ipc::record_latency(ipc::latency_signal::api, std::chrono::steady_clock::now() - it->second);
+			api_started.erase(it);
+		}
+
+	} // observe_api_latency
+
 	void
 	process_policy_enforcement_point(const std::string& _pep, ruleExecInfo_t* _rei, const std::list<boost::any>& _args)
 	{
+		if (monitor && 0 == _pep.rfind("pep_api_", 0)) {
+			observe_api_latency(_pep);
+		}
+
 		if (handlers.find(_pep) != handlers.end()) {
 			auto hdlr = handlers.at(_pep);
 
 			auto [event, obj] = hdlr(_pep, _args, _rei);
 
-			if (!event.empty() && !obj.empty()) {
+			if (!event.empty() && !obj.empty() && is_subscribed(_pep, event)) {
+				select_required_fields(event, obj);
+
 				auto p2i = configuration->plugin_configuration.at("policies_to_invoke");
 				auto stop = configuration->plugin_configuration.contains("stop_on_error");
 				ipc::invoke_policies_for_event(_rei, stop, event, _pep, p2i, obj);
@@ -105,26 +452,70 @@ namespace irods::policy_composition::event_handler
 			// load the plugin specific configuration for this instance
 			configuration = std::make_unique<irods::plugin_configuration_json>(plugin_instance_name);
 
-#if 0
-            // build a list of pep strings for the regexp
-            std::string regex{};
-            for( auto& s : consumed_policy_enforcement_points) {
-                regex += s + " || ";
-            }
+			comm_fields = ipc::get(configuration->plugin_configuration, "comm_fields", std::vector<std::string>{});
 
-            // trim trailing " || "
-            regex = regex.substr(0, regex.size()-4);
+			if (configuration->plugin_configuration.contains(kw::policies_to_invoke)) {
+				build_subscriptions(configuration->plugin_configuration.at(kw::policies_to_invoke));
+			}
 
-            // register the event handler's peps as implemented by this plugin
-            RuleExistsHelper::Instance()->registerRuleRegex(regex);
-#endif
-			RuleExistsHelper::Instance()->registerRuleRegex("pep_.*");
+			// post and finally clauses of policies may be dispatched by background workers, or
+			// written to the local event journal for later delivery
+			if (configuration->plugin_configuration.contains("asynchronous_dispatch")) {
+				dispatcher =
+					std::make_unique<dispatch_queue>(configuration->plugin_configuration.at("asynchronous_dispatch"));
+			}
+
+			if (configuration->plugin_configuration.contains("event_journal")) {
+				journal = make_journal(configuration->plugin_configuration.at("event_journal"));
+			}
+
+			if (dispatcher || journal) {
+				ipc::register_asynchronous_dispatch(dispatch);
+			}
+
+			// policies which declare a priority are shed while the catalog is under pressure
+			if (configuration->plugin_configuration.contains("load_shedding")) {
+				const auto& cfg = configuration->plugin_configuration.at("load_shedding");
+				monitor =
+					std::make_unique<ipc::load_monitor>(ipc::get_local_state_directory(cfg, "load_shedding"), cfg);
+				ipc::register_load_monitor(monitor.get());
+			}
+
+			// register the event handler's peps as implemented by this plugin
+			const auto regex = consume_policy_enforcement_points(configuration->plugin_configuration);
+			if (!regex.empty()) {
+				RuleExistsHelper::Instance()->registerRuleRegex(regex);
+			}
 
 			return SUCCESS();
 		}
 
 		irods::error stop(irods::default_re_ctx&, const std::string&)
 		{
+			if (dispatcher || journal) {
+				ipc::register_asynchronous_dispatch({});
+			}
+
+			if (dispatcher) {
+				dispatcher->stop();
+			}
+
+			journal.reset();
+
+			if (monitor) {
+				ipc::register_load_monitor(nullptr);
+				monitor.reset();
+			}
+
+			for (auto& hook : stop_hooks) {
+				try {
+					hook();
+				}
+				catch (const std::exception& _e) {
+					rodsLog(LOG_ERROR, "[%s] stop hook failed [%s]", plugin_instance_name.c_str(), _e.what());
+				}
+			}
+
 			return SUCCESS();
 		}
 
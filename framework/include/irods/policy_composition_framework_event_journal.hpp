@@ -0,0 +1,518 @@
+#ifndef IRODS_POLICY_COMPOSITION_FRAMEWORK_EVENT_JOURNAL_HPP
+#define IRODS_POLICY_COMPOSITION_FRAMEWORK_EVENT_JOURNAL_HPP
+
+#include <irods/irods_exception.hpp>
+#include <irods/rodsErrorTable.h>
+#include <irods/rodsLog.h>
+
+#include <fmt/format.h>
+#include <nlohmann/json.hpp>
+
+#include <sys/file.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <fcntl.h>
+#include <unistd.h>
+
+#include <algorithm>
+#include <cstdint>
+#include <cstring>
+#include <filesystem>
+#include <fstream>
+#include <limits>
+#include <optional>
+#include <string>
+#include <vector>
+
+namespace irods::policy_composition
+{
+	// an append only journal of events kept on local disk, shared by all agents of a server.  events
+	// are appended to memory mapped segments of fixed size, a new segment is begun once the current
+	// segment is full.  each named consumer keeps a cursor, the position following the last event it
+	// has acknowledged, so events are delivered at least once and replayed after a crash.  segments
+	// which every consumer has passed are removed by compaction
+	class event_journal
+	{
+	  public:
+		// clang-format off
+        using json = nlohmann::json;
+		// clang-format on
+
+		// a position is the index of a segment and the offset of an event within it
+		struct entry
+		{
+			std::uint64_t position;
+			std::uint64_t next;
+			json record;
+		};
+
+		event_journal(const std::string& _directory, const std::uint64_t _segment_size, const bool _synchronous)
+			: directory_{_directory}
+			, segment_size_{std::clamp<std::uint64_t>(_segment_size, 4096, std::numeric_limits<std::uint32_t>::max())}
+			, synchronous_{_synchronous}
+		{
+			std::error_code ec{};
+			std::filesystem::create_directories(directory_, ec);
+			if (ec) {
+				THROW(
+					SYS_INVALID_FILE_PATH,
+					fmt::format("failed to create event journal [{}] [{}]", directory_, ec.message()));
+			}
+
+			const auto path = directory_ + "/journal.lock";
+			lock_fd_ = open(path.c_str(), O_RDWR | O_CREAT, 0600);
+			if (lock_fd_ < 0) {
+				THROW(UNIX_FILE_OPEN_ERR - errno, fmt::format("failed to open event journal lock [{}]", path));
+			}
+
+		} // ctor
+
+		event_journal(const event_journal&) = delete;
+		event_journal& operator=(const event_journal&) = delete;
+
+		~event_journal()
+		{
+			current_.reset();
+			close(lock_fd_);
+
+		} // dtor
+
+		void append(const json& _record)
+		{
+			const auto payload = _record.dump();
+			const auto needed = align(sizeof(record_header) + payload.size());
+			if (needed > segment_size_ - sizeof(segment_header)) {
+				THROW(
+					SYS_INVALID_INPUT_PARAM,
+					fmt::format("event of [{}] bytes exceeds the journal segment size", payload.size()));
+			}
+
+			file_lock lock{lock_fd_, LOCK_EX};
+
+			// another agent may have begun a new segment since this one last appended
+			if (!current_ || current_->header->sealed) {
+				const auto last = last_segment();
+				current_.emplace(segment_path(last.value_or(0)), segment_size_, last.value_or(0));
+			}
+
+			if (current_->header->end + needed > current_->size) {
+				const auto index = current_->header->index + 1;
+				current_->header->sealed = 1;
+				sync(*current_, 0, sizeof(segment_header));
+				current_.emplace(segment_path(index), segment_size_, index);
+			}
+
+			auto* base = static_cast<char*>(current_->base);
+			const auto offset = current_->header->end;
+
+			record_header header{static_cast<std::uint32_t>(payload.size()), checksum(payload)};
+			std::memcpy(base + offset, &header, sizeof(header));
+			std::memcpy(base + offset + sizeof(header), payload.data(), payload.size());
+
+			// the end is advanced only once the event is written, so a reader never sees part of it
+			sync(*current_, offset, needed);
+			current_->header->end = offset + needed;
+			sync(*current_, 0, sizeof(segment_header));
+
+		} // append
+
+		// events following the cursor of the consumer, which are not removed until acknowledged
+		auto read(const std::string& _consumer, const std::size_t _maximum) -> std::vector<entry>
+		{
+			std::vector<entry> entries{};
+
+			file_lock lock{lock_fd_, LOCK_SH};
+
+			auto position = cursor(_consumer);
+
+			// a consumer which has fallen behind compaction, or is new, begins at the first segment
+			const auto first = first_segment();
+			if (!first) {
+				return entries;
+			}
+
+			if (index_of(position) < *first) {
+				position = make_position(*first, sizeof(segment_header));
+			}
+
+			while (entries.size() < _maximum) {
+				const auto index = index_of(position);
+				if (!std::filesystem::exists(segment_path(index))) {
+					break;
+				}
+
+				segment s{segment_path(index), segment_size_, index, PROT_READ};
+
+				auto offset = std::max<std::uint64_t>(offset_of(position), sizeof(segment_header));
+				const auto* base = static_cast<const char*>(s.base);
+
+				while (offset < s.header->end && entries.size() < _maximum) {
+					record_header header{};
+					std::memcpy(&header, base + offset, sizeof(header));
+
+					if (offset + sizeof(header) + header.length > s.header->end) {
+						rodsLog(
+							LOG_ERROR,
+							"event journal [%s] damaged segment [%lu] at offset [%lu]",
+							directory_.c_str(),
+							index,
+							offset);
+						offset = s.header->end;
+						break;
+					}
+
+					const std::string payload{base + offset + sizeof(header), header.length};
+					const auto next = offset + align(sizeof(header) + header.length);
+
+					// a damaged event is skipped rather than blocking every event which follows it
+					if (checksum(payload) != header.checksum) {
+						rodsLog(
+							LOG_ERROR,
+							"event journal [%s] damaged event at segment [%lu] offset [%lu]",
+							directory_.c_str(),
+							index,
+							offset);
+					}
+					else {
+						entries.push_back(
+							{make_position(index, offset), make_position(index, next), json::parse(payload)});
+					}
+
+					offset = next;
+				}
+
+				position = make_position(index, offset);
+
+				if (offset < s.header->end || !s.header->sealed) {
+					break;
+				}
+
+				position = make_position(index + 1, sizeof(segment_header));
+			}
+
+			return entries;
+
+		} // read
+
+		// the cursor is replaced by a rename, so a crash leaves either the previous or the new cursor
+		void acknowledge(const std::string& _consumer, const std::uint64_t _position)
+		{
+			const auto path = cursor_path(_consumer);
+			const auto tmp = fmt::format("{}.{}", path, getpid());
+
+			{
+				std::ofstream out{tmp, std::ios::trunc};
+				out << _position << '\n';
+			}
+
+			std::filesystem::rename(tmp, path);
+
+		} // acknowledge
+
+		auto cursor(const std::string& _consumer) const -> std::uint64_t
+		{
+			std::ifstream in{cursor_path(_consumer)};
+
+			std::uint64_t position{};
+			if (!(in >> position)) {
+				return make_position(0, sizeof(segment_header));
+			}
+
+			return position;
+
+		} // cursor
+
+		// removes the segments which every consumer has passed, returning the number removed
+		auto compact() -> std::uint64_t
+		{
+			file_lock lock{lock_fd_, LOCK_EX};
+
+			std::optional<std::uint64_t> minimum{};
+			for (const auto& e : std::filesystem::directory_iterator{directory_}) {
+				if (".cursor" == e.path().extension()) {
+					const auto index = index_of(cursor(e.path().stem().string()));
+					minimum = std::min(minimum.value_or(index), index);
+				}
+			}
+
+			const auto last = last_segment();
+			if (!minimum || !last) {
+				return 0;
+			}
+
+			std::uint64_t removed{};
+			for (const auto index : segments()) {
+				if (index < *minimum && index < *last) {
+					std::filesystem::remove(segment_path(index));
+					++removed;
+				}
+			}
+
+			return removed;
+
+		} // compact
+
+		// the number of bytes of events which follow the cursor of the consumer
+		auto pending_bytes(const std::string& _consumer) -> std::uint64_t
+		{
+			file_lock lock{lock_fd_, LOCK_SH};
+
+			const auto position = cursor(_consumer);
+
+			std::uint64_t bytes{};
+			for (const auto index : segments()) {
+				if (index < index_of(position)) {
+					continue;
+				}
+
+				segment s{segment_path(index), segment_size_, index, PROT_READ};
+				const auto from = index == index_of(position) ? offset_of(position) : sizeof(segment_header);
+				bytes += s.header->end > from ? s.header->end - from : 0;
+			}
+
+			return bytes;
+
+		} // pending_bytes
+
+		// the number of events which follow the cursor of the consumer, counted from the record
+		// headers without parsing the events
+		auto pending(const std::string& _consumer) -> std::uint64_t
+		{
+			file_lock lock{lock_fd_, LOCK_SH};
+
+			const auto position = cursor(_consumer);
+
+			std::uint64_t count{};
+			for (const auto index : segments()) {
+				if (index < index_of(position)) {
+					continue;
+				}
+
+				segment s{segment_path(index), segment_size_, index, PROT_READ};
+				const auto* base = static_cast<const char*>(s.base);
+
+				auto offset = index == index_of(position)
+				                  ? std::max<std::uint64_t>(offset_of(position), sizeof(segment_header))
+				                  : sizeof(segment_header);
+				while (offset + sizeof(record_header) <= s.header->end) {
+					record_header header{};
+					std::memcpy(&header, base + offset, sizeof(header));
+					offset += align(sizeof(header) + header.length);
+					++count;
+				}
+			}
+
+			return count;
+
+		} // pending
+
+	  private:
+		static constexpr std::uint64_t magic{0x69726a726e6c7631}; // "irjrnlv1"
+
+		struct segment_header
+		{
+			std::uint64_t magic;
+			std::uint64_t index;
+			std::uint64_t end;
+			std::uint64_t sealed;
+		};
+
+		struct record_header
+		{
+			std::uint32_t length;
+			std::uint32_t checksum;
+		};
+
+		class file_lock
+		{
+		  public:
+			file_lock(const int _fd, const int _operation)
+				: fd_{_fd}
+			{
+				if (flock(fd_, _operation) < 0) {
+					THROW(SYS_INTERNAL_ERR, fmt::format("failed to lock event journal errno [{}]", errno));
+				}
+			}
+
+			~file_lock()
+			{
+				flock(fd_, LOCK_UN);
+			}
+
+			file_lock(const file_lock&) = delete;
+			file_lock& operator=(const file_lock&) = delete;
+
+		  private:
+			const int fd_;
+
+		}; // class file_lock
+
+		// a segment is created at its full size, the file is sparse until written
+		class segment
+		{
+		  public:
+			segment(
+				const std::string& _path,
+				const std::uint64_t _size,
+				const std::uint64_t _index,
+				const int _protection = PROT_READ | PROT_WRITE)
+			{
+				const auto writable = _protection & PROT_WRITE;
+
+				fd_ = open(_path.c_str(), writable ? O_RDWR | O_CREAT : O_RDONLY, 0600);
+				if (fd_ < 0) {
+					THROW(UNIX_FILE_OPEN_ERR - errno, fmt::format("failed to open journal segment [{}]", _path));
+				}
+
+				struct stat st{};
+				fstat(fd_, &st);
+
+				const auto initialize = 0 == st.st_size;
+				if (initialize && (!writable || ftruncate(fd_, _size) < 0)) {
+					close(fd_);
+					THROW(
+						SYS_INTERNAL_ERR, fmt::format("failed to size journal segment [{}] errno [{}]", _path, errno));
+				}
+
+				size = initialize ? _size : static_cast<std::uint64_t>(st.st_size);
+
+				base = mmap(nullptr, size, _protection, MAP_SHARED, fd_, 0);
+				if (MAP_FAILED == base) {
+					close(fd_);
+					THROW(SYS_INTERNAL_ERR, fmt::format("failed to map journal segment [{}] errno [{}]", _path, errno));
+				}
+
+				header = static_cast<segment_header*>(base);
+
+				if (initialize) {
+					*header = segment_header{magic, _index, sizeof(segment_header), 0};
+				}
+				else if (magic != header->magic) {
+					munmap(base, size);
+					close(fd_);
+					THROW(SYS_INTERNAL_ERR, fmt::format("invalid journal segment [{}]", _path));
+				}
+
+			} // ctor
+
+			segment(const segment&) = delete;
+			segment& operator=(const segment&) = delete;
+
+			~segment()
+			{
+				munmap(base, size);
+				close(fd_);
+
+			} // dtor
+
+			void* base{};
+			segment_header* header{};
+			std::uint64_t size{};
+
+		  private:
+			int fd_{-1};
+
+		}; // class segment
+
+		static auto align(const std::uint64_t _size) -> std::uint64_t
+		{
+			return (_size + 7) & ~std::uint64_t{7};
+
+		} // align
+
+		// fnv-1a, folded to 32 bits
+		static auto checksum(const std::string& _payload) -> std::uint32_t
+		{
+			std::uint64_t hash = 0xcbf29ce484222325ULL;
+			for (const auto c : _payload) {
+				hash ^= static_cast<unsigned char>(c);
+				hash *= 0x100000001b3ULL;
+			}
+
+			return static_cast<std::uint32_t>(hash ^ (hash >> 32));
+
+		} // checksum
+
+		static auto make_position(const std::uint64_t _index, const std::uint64_t _offset) -> std::uint64_t
+		{
+			return (_index << 32) | _offset;
+
+		} // make_position
+
+		static auto index_of(const std::uint64_t _position) -> std::uint64_t
+		{
+			return _position >> 32;
+
+		} // index_of
+
+		static auto offset_of(const std::uint64_t _position) -> std::uint64_t
+		{
+			return _position & 0xffffffff;
+
+		} // offset_of
+
+		void sync(segment& _segment, const std::uint64_t _offset, const std::uint64_t _length) const
+		{
+			if (!synchronous_) {
+				return;
+			}
+
+			// msync requires an address aligned to a page
+			const auto page = static_cast<std::uint64_t>(sysconf(_SC_PAGESIZE));
+			const auto begin = _offset - _offset % page;
+			msync(static_cast<char*>(_segment.base) + begin, _offset + _length - begin, MS_SYNC);
+
+		} // sync
+
+		auto segment_path(const std::uint64_t _index) const -> std::string
+		{
+			return fmt::format("{}/{:020}.segment", directory_, _index);
+
+		} // segment_path
+
+		auto cursor_path(const std::string& _consumer) const -> std::string
+		{
+			return fmt::format("{}/{}.cursor", directory_, _consumer);
+
+		} // cursor_path
+
+		auto segments() const -> std::vector<std::uint64_t>
+		{
+			std::vector<std::uint64_t> indices{};
+			for (const auto& e : std::filesystem::directory_iterator{directory_}) {
+				if (".segment" == e.path().extension()) {
+					indices.push_back(std::stoull(e.path().stem().string()));
+				}
+			}
+
+			std::sort(indices.begin(), indices.end());
+
+			return indices;
+
+		} // segments
+
+		auto first_segment() const -> std::optional<std::uint64_t>
+		{
+			const auto indices = segments();
+			return indices.empty() ? std::nullopt : std::optional{indices.front()};
+
+		} // first_segment
+
+		auto last_segment() const -> std::optional<std::uint64_t>
+		{
+			const auto indices = segments();
+			return indices.empty() ? std::nullopt : std::optional{indices.back()};
+
+		} // last_segment
+
+		const std::string directory_;
+		const std::uint64_t segment_size_;
+		const bool synchronous_;
+		int lock_fd_{-1};
+		std::optional<segment> current_{};
+
+	}; // class event_journal
+
+} // namespace irods::policy_composition
+
+#endif // IRODS_POLICY_COMPOSITION_FRAMEWORK_EVENT_JOURNAL_HPP
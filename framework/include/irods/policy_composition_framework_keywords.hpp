@@ -36,6 +36,7 @@ namespace irods::policy_composition::keywords
 	const std::string events{"events"};
 	const std::string user_name{"user_name"};
 	const std::string entity_types{"entity_types"};
+	const std::string objects{"objects"};
 	const std::string logical_path{"logical_path"};
 	const std::string source_resource{"source_resource"};
 	const std::string destination_resource{"destination_resource"};
@@ -0,0 +1,306 @@
+#ifndef IRODS_POLICY_COMPOSITION_FRAMEWORK_LOAD_MONITOR_HPP
+#define IRODS_POLICY_COMPOSITION_FRAMEWORK_LOAD_MONITOR_HPP
+
+#include <irods/irods_exception.hpp>
+#include <irods/rodsErrorTable.h>
+#include <irods/rodsLog.h>
+
+#include <fmt/format.h>
+#include <nlohmann/json.hpp>
+
+#include <sys/file.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <fcntl.h>
+#include <unistd.h>
+
+#include <algorithm>
+#include <array>
+#include <atomic>
+#include <chrono>
+#include <cstdint>
+#include <ctime>
+#include <filesystem>
+#include <fstream>
+#include <new>
+#include <string>
+
+namespace irods::policy_composition
+{
+	enum class latency_signal : std::size_t
+	{
+		query,
+		api
+	};
+
+	// the latency of catalog queries and api calls as observed by the framework, smoothed with an
+	// exponentially weighted moving average.  the averages, the shedding level and its counters are
+	// shared by all agents of a server through a small memory mapped file, so that a new agent
+	// begins with the view of the agents before it.  the level rises as either average crosses its
+	// threshold and falls only once both are below a fraction of it, so policies are not shed and
+	// resumed on every sample near the threshold
+	class load_monitor
+	{
+	  public:
+		// clang-format off
+        using json       = nlohmann::json;
+        using clock_type = std::chrono::steady_clock;
+		// clang-format on
+
+		enum level : std::uint32_t
+		{
+			normal,
+			elevated,
+			severe
+		};
+
+		load_monitor(const std::string& _directory, const json& _configuration)
+			: directory_{_directory}
+		{
+			// clang-format off
+            thresholds_[index(latency_signal::query)] = 1000 * _configuration.value("query_threshold_in_milliseconds", std::int64_t{100});
+            thresholds_[index(latency_signal::api)]   = 1000 * _configuration.value("api_threshold_in_milliseconds",   std::int64_t{500});
+            severe_multiplier_ = _configuration.value("severe_multiplier",           2.0);
+            resume_ratio_      = _configuration.value("resume_ratio",                0.8);
+            smoothing_         = _configuration.value("smoothing",                   0.2);
+            stale_after_       = _configuration.value("stale_after_in_seconds",      std::int64_t{60});
+            status_interval_   = _configuration.value("status_interval_in_seconds",  std::int64_t{10});
+			// clang-format on
+
+			smoothing_ = std::clamp(smoothing_, 0.01, 1.0);
+			resume_ratio_ = std::clamp(resume_ratio_, 0.0, 1.0);
+			severe_multiplier_ = std::max(severe_multiplier_, 1.0);
+
+			const auto path = directory_ + "/load.state";
+			fd_ = open(path.c_str(), O_RDWR | O_CREAT, 0600);
+			if (fd_ < 0) {
+				THROW(UNIX_FILE_OPEN_ERR - errno, fmt::format("failed to open load state [{}]", path));
+			}
+
+			// the file is initialized under a lock so that agents starting together agree upon it
+			flock(fd_, LOCK_EX);
+
+			struct stat st{};
+			fstat(fd_, &st);
+
+			const auto initialize = static_cast<std::size_t>(st.st_size) != sizeof(shared_state);
+			if (initialize && ftruncate(fd_, sizeof(shared_state)) < 0) {
+				flock(fd_, LOCK_UN);
+				close(fd_);
+				THROW(SYS_INTERNAL_ERR, fmt::format("failed to size load state [{}] errno [{}]", path, errno));
+			}
+
+			auto* base = mmap(nullptr, sizeof(shared_state), PROT_READ | PROT_WRITE, MAP_SHARED, fd_, 0);
+			if (MAP_FAILED == base) {
+				flock(fd_, LOCK_UN);
+				close(fd_);
+				THROW(SYS_INTERNAL_ERR, fmt::format("failed to map load state [{}] errno [{}]", path, errno));
+			}
+
+			state_ = static_cast<shared_state*>(base);
+			if (initialize || magic != state_->magic) {
+				state_ = new (base) shared_state{};
+				state_->magic = magic;
+			}
+
+			flock(fd_, LOCK_UN);
+
+		} // ctor
+
+		load_monitor(const load_monitor&) = delete;
+		load_monitor& operator=(const load_monitor&) = delete;
+
+		~load_monitor()
+		{
+			munmap(state_, sizeof(shared_state));
+			close(fd_);
+
+		} // dtor
+
+		void sample(const latency_signal _signal, const clock_type::duration _latency)
+		{
+			const auto x = std::chrono::duration_cast<std::chrono::microseconds>(_latency).count();
+
+			auto& average = state_->averages[index(_signal)];
+			auto current = average.load();
+			auto next = std::int64_t{};
+			do {
+				next = 0 == current ? x : current + static_cast<std::int64_t>(smoothing_ * (x - current));
+			} while (!average.compare_exchange_weak(current, next));
+
+			++state_->samples[index(_signal)];
+			state_->last_sample = std::time(nullptr);
+
+			evaluate();
+			write_status();
+
+		} // sample
+
+		auto current_level() const -> level
+		{
+			// averages which are no longer refreshed do not hold the server in a shedding level
+			if (std::time(nullptr) - state_->last_sample.load() > stale_after_) {
+				return normal;
+			}
+
+			return static_cast<level>(state_->level.load());
+
+		} // current_level
+
+		// policies of low priority are shed once elevated, and those of normal priority once severe.
+		// policies without a priority, or of critical priority, are never shed
+		auto sheds(const std::string& _priority) const -> bool
+		{
+			const auto l = current_level();
+
+			if ("low" == _priority) {
+				return l >= elevated;
+			}
+
+			if ("normal" == _priority) {
+				return l >= severe;
+			}
+
+			return false;
+
+		} // sheds
+
+		void count_deferred()
+		{
+			++state_->deferred;
+
+		} // count_deferred
+
+		void count_skipped()
+		{
+			++state_->skipped;
+
+		} // count_skipped
+
+		auto status() const -> json
+		{
+			static constexpr std::array names{"normal", "elevated", "severe"};
+
+			return {
+				{"level", names[current_level()]},
+				{"level_since", state_->level_since.load()},
+				{"query_latency_in_microseconds", state_->averages[index(latency_signal::query)].load()},
+				{"api_latency_in_microseconds", state_->averages[index(latency_signal::api)].load()},
+				{"query_samples", state_->samples[index(latency_signal::query)].load()},
+				{"api_samples", state_->samples[index(latency_signal::api)].load()},
+				{"transitions", state_->transitions.load()},
+				{"deferred", state_->deferred.load()},
+				{"skipped", state_->skipped.load()}};
+
+		} // status
+
+	  private:
+		static constexpr std::uint64_t magic{0x69726c6f61643031}; // "irload01"
+
+		struct shared_state
+		{
+			std::uint64_t magic;
+			std::array<std::atomic<std::int64_t>, 2> averages;
+			std::array<std::atomic<std::uint64_t>, 2> samples;
+			std::atomic<std::uint32_t> level;
+			std::atomic<std::int64_t> level_since;
+			std::atomic<std::int64_t> last_sample;
+			std::atomic<std::int64_t> last_status;
+			std::atomic<std::uint64_t> transitions;
+			std::atomic<std::uint64_t> deferred;
+			std::atomic<std::uint64_t> skipped;
+		};
+
+		static_assert(std::atomic<std::int64_t>::is_always_lock_free, "shared load state requires lock free atomics");
+
+		static constexpr auto index(const latency_signal _signal) -> std::size_t
+		{
+			return static_cast<std::size_t>(_signal);
+
+		} // index
+
+		// the load relative to the thresholds, the greater of the two signals
+		auto ratio() const -> double
+		{
+			auto r = 0.0;
+			for (std::size_t i = 0; i < thresholds_.size(); ++i) {
+				if (thresholds_[i] > 0) {
+					r = std::max(r, static_cast<double>(state_->averages[i].load()) / thresholds_[i]);
+				}
+			}
+
+			return r;
+
+		} // ratio
+
+		void evaluate()
+		{
+			const auto r = ratio();
+			const std::array<double, 3> rise{0.0, 1.0, severe_multiplier_};
+
+			auto current = state_->level.load();
+			auto target = current;
+
+			while (target < severe && r >= rise[target + 1]) {
+				++target;
+			}
+
+			while (target > normal && r < rise[target] * resume_ratio_) {
+				--target;
+			}
+
+			if (target == current || !state_->level.compare_exchange_strong(current, target)) {
+				return;
+			}
+
+			++state_->transitions;
+			state_->level_since = std::time(nullptr);
+
+			rodsLog(
+				LOG_NOTICE,
+				"policy load shedding level changed from [%u] to [%u] at [%.2f] times the latency threshold",
+				current,
+				target,
+				r);
+
+		} // evaluate
+
+		// one agent at a time writes the status, at most once per interval
+		void write_status()
+		{
+			const auto now = static_cast<std::int64_t>(std::time(nullptr));
+
+			auto last = state_->last_status.load();
+			if (now - last < status_interval_ || !state_->last_status.compare_exchange_strong(last, now)) {
+				return;
+			}
+
+			const auto path = directory_ + "/status.json";
+			const auto tmp = fmt::format("{}.{}", path, getpid());
+
+			{
+				std::ofstream out{tmp, std::ios::trunc};
+				out << status().dump(4);
+			}
+
+			std::error_code ec{};
+			std::filesystem::rename(tmp, path, ec);
+
+		} // write_status
+
+		std::string directory_{};
+		int fd_{-1};
+		shared_state* state_{};
+
+		std::array<std::int64_t, 2> thresholds_{};
+		double severe_multiplier_{};
+		double resume_ratio_{};
+		double smoothing_{};
+		std::int64_t stale_after_{};
+		std::int64_t status_interval_{};
+
+	}; // class load_monitor
+
+} // namespace irods::policy_composition
+
+#endif // IRODS_POLICY_COMPOSITION_FRAMEWORK_LOAD_MONITOR_HPP
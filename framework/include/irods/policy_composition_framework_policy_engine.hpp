@@ -36,23 +36,59 @@ namespace irods::policy_composition::policy_engine
     using plugin_type         = pluggable_rule_engine<irods::default_re_ctx>;
     using plugin_pointer_type = plugin_type*;
     using implementation_type = std::function<error(const context&, arg_type)>;
-
-    auto                log_errors{false};
-    json                plugin_config;
-    context             policy_context;
-    implementation_type policy_implementation;
+    using hook_type           = std::function<void()>;
+
+    auto                   log_errors{false};
+    json                   plugin_config;
+    context                policy_context;
+    implementation_type    policy_implementation;
+    std::vector<hook_type> start_hooks;
+    std::vector<hook_type> stop_hooks;
 	// clang-format on
 
+	// hooks are invoked as the plugin is started and stopped within each process of the server,
+	// for policy engines which keep state or threads beyond a single invocation
+	auto register_start_hook(hook_type _hook) -> void
+	{
+		start_hooks.push_back(std::move(_hook));
+
+	} // register_start_hook
+
+	auto register_stop_hook(hook_type _hook) -> void
+	{
+		stop_hooks.push_back(std::move(_hook));
+
+	} // register_stop_hook
+
 	namespace
 	{
 		auto start(default_re_ctx&, const std::string&) -> error
 		{
 			RuleExistsHelper::Instance()->registerRuleRegex(policy_context.policy_name + ".*");
+
+			for (auto& hook : start_hooks) {
+				try {
+					hook();
+				}
+				catch (const std::exception& _e) {
+					rodsLog(LOG_ERROR, "[%s] start hook failed [%s]", policy_context.instance_name.c_str(), _e.what());
+				}
+			}
+
 			return SUCCESS();
 		}
 
 		auto stop(default_re_ctx&, const std::string&) -> error
 		{
+			for (auto& hook : stop_hooks) {
+				try {
+					hook();
+				}
+				catch (const std::exception& _e) {
+					rodsLog(LOG_ERROR, "[%s] stop hook failed [%s]", policy_context.instance_name.c_str(), _e.what());
+				}
+			}
+
 			return SUCCESS();
 		}
 
@@ -104,6 +140,35 @@ namespace irods::policy_composition::policy_engine
 
 		} // details
 
+		// a batch of objects is processed within a single invocation of the plugin, the policy is
+		// implemented for each object in turn and the first error is returned
+		auto invoke_policy_implementation(context& _ctx, arg_type _out) -> error
+		{
+			if (!_ctx.parameters.contains(pc::keywords::objects)) {
+				return policy_implementation(_ctx, _out);
+			}
+
+			const auto batch = _ctx.parameters;
+
+			auto base = batch;
+			base.erase(pc::keywords::objects);
+
+			auto result = SUCCESS();
+			for (const auto& object : batch.at(pc::keywords::objects)) {
+				_ctx.parameters = base;
+				_ctx.parameters.update(object);
+
+				if (auto err = policy_implementation(_ctx, _out); !err.ok() && result.ok()) {
+					result = err;
+				}
+			}
+
+			_ctx.parameters = batch;
+
+			return result;
+
+		} // invoke_policy_implementation
+
 		error
 		exec_rule(default_re_ctx&, const std::string& _rule_name, std::list<boost::any>& _arguments, callback _eff_hdlr)
 		{
@@ -151,7 +216,7 @@ namespace irods::policy_composition::policy_engine
 
 					log_errors = get_log_errors_flag(policy_context.parameters, policy_context.configuration);
 
-					auto err = policy_implementation(policy_context, out_variable);
+					auto err = invoke_policy_implementation(policy_context, out_variable);
 
 					if (!err.ok()) {
 						// support for stop_on_error behavior
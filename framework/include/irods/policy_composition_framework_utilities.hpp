@@ -2,6 +2,7 @@
 #define IRODS_POLICY_COMPOSITION_FRAMEWORK_UTILITIES_HPP
 
 #include "policy_composition_framework_keywords.hpp"
+#include "policy_composition_framework_load_monitor.hpp"
 
 #include <irods/irods_re_plugin.hpp>
 #include <irods/irods_exception.hpp>
@@ -12,8 +13,11 @@
 
 #include <nlohmann/json.hpp>
 
+#include <chrono>
+#include <functional>
 #include <string>
 #include <map>
+#include <vector>
 
 namespace irods::policy_composition
 {
@@ -22,6 +26,8 @@ namespace irods::policy_composition
     using json           = nlohmann::json;
     using event_map_type = std::map<std::string, std::string>;
     using arguments_type = std::list<boost::any>;
+    using dispatch_type  = std::function<bool(const json&, const json&, const json&)>;
+    using field_selector = std::function<bool(const std::string&)>;
 	// clang-format on
 
 	template <typename T>
@@ -70,10 +76,16 @@ namespace irods::policy_composition
 	auto get_index_and_json_from_obj_inp(const dataObjInp_t*) -> std::tuple<int, json>;
 	auto serialize_generalAdminInp_to_json(const generalAdminInp_t&) -> json;
 	auto serialize_keyValPair_to_json(const keyValPair_t&) -> json;
-	auto serialize_collInp_to_json(const collInp_t&) -> json;
-	auto serialize_dataObjInp_to_json(const dataObjInp_t&) -> json;
+	auto serialize_collInp_to_json(const collInp_t&, const field_selector& = {}) -> json;
+	auto serialize_dataObjInp_to_json(const dataObjInp_t&, const field_selector& = {}) -> json;
 	auto serialize_openedDataObjInp_to_json(const openedDataObjInp_t& _inp) -> json;
 	auto serialize_rsComm_to_json(rsComm_t*) -> json;
+	auto serialize_rsComm_to_json_cached(rsComm_t*, const std::vector<std::string>&) -> const json&;
+	auto host_is_local(const std::string&) -> bool;
+	auto get_local_state_directory(const json&, const std::string&) -> std::string;
+	auto register_asynchronous_dispatch(dispatch_type) -> void;
+	auto register_load_monitor(load_monitor*) -> void;
+	auto record_latency(const latency_signal, const std::chrono::steady_clock::duration) -> void;
 	auto invoke_policies_for_event(
 		ruleExecInfo_t*,
 		const bool,
@@ -81,6 +93,14 @@ namespace irods::policy_composition
 		const std::string&,
 		const json&,
 		const json&) -> void;
+	auto invoke_policies_for_batch(
+		ruleExecInfo_t*,
+		const bool,
+		const std::string&,
+		const std::string&,
+		const json&,
+		const json&,
+		const json&) -> void;
 
 } // namespace irods::policy_composition
 
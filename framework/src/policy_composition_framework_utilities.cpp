@@ -6,6 +6,7 @@
 #include <irods/irods_stacktrace.hpp>
 
 #include <irods/rcMisc.h>
+#include <irods/rodsConnect.h>
 #include <irods/objDesc.hpp>
 #include <irods/fileOpr.hpp>
 #include <irods/msParam.h>
@@ -18,6 +19,9 @@
 
 #include <boost/regex.hpp>
 
+#include <filesystem>
+#include <string_view>
+
 // Persistent L1 File Descriptor Table
 extern l1desc_t L1desc[NUM_L1_DESC];
 
@@ -247,29 +251,59 @@ namespace irods::policy_composition
 
 	} // serialize_keyValPair_to_json
 
-	auto serialize_collInp_to_json(const collInp_t& _inp) -> json
+	// an empty selector selects every field
+	auto serialize_collInp_to_json(const collInp_t& _inp, const field_selector& _selector) -> json
 	{
+		const auto selected = [&_selector](const std::string& _field) { return !_selector || _selector(_field); };
+
 		json j;
-		j["logical_path"] = _inp.collName;
-		j["flags"] = boost::lexical_cast<std::string>(_inp.flags);
-		j["opr_type"] = boost::lexical_cast<std::string>(_inp.oprType);
-		j["cond_input"] = serialize_keyValPair_to_json(_inp.condInput);
+		if (selected("logical_path")) {
+			j["logical_path"] = _inp.collName;
+		}
+		if (selected("flags")) {
+			j["flags"] = boost::lexical_cast<std::string>(_inp.flags);
+		}
+		if (selected("opr_type")) {
+			j["opr_type"] = boost::lexical_cast<std::string>(_inp.oprType);
+		}
+		if (selected("cond_input")) {
+			j["cond_input"] = serialize_keyValPair_to_json(_inp.condInput);
+		}
 
 		return j;
 
 	} // seralize_collInp_to_json
 
-	auto serialize_dataObjInp_to_json(const dataObjInp_t& _inp) -> json
+	// an empty selector selects every field
+	auto serialize_dataObjInp_to_json(const dataObjInp_t& _inp, const field_selector& _selector) -> json
 	{
+		const auto selected = [&_selector](const std::string& _field) { return !_selector || _selector(_field); };
+
 		json j;
-		j["logical_path"] = _inp.objPath;
-		j["create_mode"] = boost::lexical_cast<std::string>(_inp.createMode);
-		j["open_flags"] = boost::lexical_cast<std::string>(_inp.openFlags);
-		j["offset"] = boost::lexical_cast<std::string>(_inp.offset);
-		j["data_size"] = boost::lexical_cast<std::string>(_inp.dataSize);
-		j["num_threads"] = boost::lexical_cast<std::string>(_inp.numThreads);
-		j["opr_type"] = boost::lexical_cast<std::string>(_inp.oprType);
-		j["cond_input"] = serialize_keyValPair_to_json(_inp.condInput);
+		if (selected("logical_path")) {
+			j["logical_path"] = _inp.objPath;
+		}
+		if (selected("create_mode")) {
+			j["create_mode"] = boost::lexical_cast<std::string>(_inp.createMode);
+		}
+		if (selected("open_flags")) {
+			j["open_flags"] = boost::lexical_cast<std::string>(_inp.openFlags);
+		}
+		if (selected("offset")) {
+			j["offset"] = boost::lexical_cast<std::string>(_inp.offset);
+		}
+		if (selected("data_size")) {
+			j["data_size"] = boost::lexical_cast<std::string>(_inp.dataSize);
+		}
+		if (selected("num_threads")) {
+			j["num_threads"] = boost::lexical_cast<std::string>(_inp.numThreads);
+		}
+		if (selected("opr_type")) {
+			j["opr_type"] = boost::lexical_cast<std::string>(_inp.oprType);
+		}
+		if (selected("cond_input")) {
+			j["cond_input"] = serialize_keyValPair_to_json(_inp.condInput);
+		}
 
 		return j;
 
@@ -338,6 +372,99 @@ namespace irods::policy_composition
 
 	} // serialize_rsComm_ptr
 
+	// a connection is serialized once and kept for as long as the identity of its client and proxy users is
+	// unchanged, as authentication may complete after the first policy enforcement point of a connection
+	auto serialize_rsComm_to_json_cached(rsComm_t* _comm, const std::vector<std::string>& _fields) -> const json&
+	{
+		struct cached_comm
+		{
+			rsComm_t* comm{};
+			std::size_t fingerprint{};
+			std::vector<std::string> fields;
+			json value;
+		};
+
+		static cached_comm cache{};
+
+		const auto fingerprint = [_comm]() -> std::size_t {
+			if (!_comm) {
+				return 0;
+			}
+
+			std::size_t seed{};
+			const auto combine = [&seed](const std::size_t _hash) {
+				seed ^= _hash + 0x9e3779b9 + (seed << 6) + (seed >> 2);
+			};
+
+			const std::hash<std::string_view> hash{};
+			combine(hash(_comm->clientUser.userName));
+			combine(hash(_comm->clientUser.rodsZone));
+			combine(hash(_comm->proxyUser.userName));
+			combine(hash(_comm->proxyUser.rodsZone));
+			combine(std::hash<int>{}(_comm->clientUser.authInfo.authFlag));
+			combine(std::hash<int>{}(_comm->proxyUser.authInfo.authFlag));
+
+			return seed;
+		}();
+
+		if (!cache.value.is_null() && cache.comm == _comm && cache.fingerprint == fingerprint &&
+		    cache.fields == _fields)
+		{
+			return cache.value;
+		}
+
+		auto value = serialize_rsComm_to_json(_comm);
+		if (_comm && !_fields.empty()) {
+			auto trimmed = json::object();
+			for (const auto& f : _fields) {
+				if (value.contains(f)) {
+					trimmed[f] = std::move(value[f]);
+				}
+			}
+
+			value = std::move(trimmed);
+		}
+
+		cache = cached_comm{_comm, fingerprint, _fields, std::move(value)};
+
+		return cache.value;
+
+	} // serialize_rsComm_to_json_cached
+
+	auto host_is_local(const std::string& _host) -> bool
+	{
+		rodsHostAddr_t addr{};
+		rstrcpy(addr.hostAddr, _host.c_str(), sizeof(addr.hostAddr));
+
+		rodsServerHost_t* server_host{};
+		if (resolveHost(&addr, &server_host) < 0 || !server_host) {
+			return false;
+		}
+
+		return LOCAL_HOST == server_host->localFlag;
+
+	} // host_is_local
+
+	auto get_local_state_directory(const json& _configuration, const std::string& _name) -> std::string
+	{
+		// state which is local to a server, such as histories and indices, is kept
+		// beneath a common root which may be overridden per plugin instance
+		const auto root =
+			get(_configuration, "local_state_directory", std::string{"/var/lib/irods/policy_composition"});
+		const auto directory = std::filesystem::path{root} / _name;
+
+		std::error_code ec{};
+		std::filesystem::create_directories(directory, ec);
+		if (ec) {
+			THROW(
+				SYS_INVALID_FILE_PATH,
+				fmt::format("failed to create local state directory [{}] [{}]", directory.string(), ec.message()));
+		}
+
+		return directory.string();
+
+	} // get_local_state_directory
+
 	auto evaluate_metadata(
 		const fs::metadata& cmd // conditional metadata
 		,
@@ -592,7 +719,10 @@ namespace irods::policy_composition
 				THROW(SYS_INVALID_INPUT_PARAM, fmt::format("invalid entity type [{}]", et.get<std::string>()));
 			}
 
+			const auto start = std::chrono::steady_clock::now();
 			auto [err, md] = evaluate_metadata_exists_conditional(comm, cmd, tgt);
+			record_latency(latency_signal::query, std::chrono::steady_clock::now() - start);
+
 			if (!err) {
 				return false;
 			}
@@ -632,6 +762,107 @@ namespace irods::policy_composition
 
 	} // evaluate_conditionals
 
+	// policies of the post and finally clauses which request asynchronous dispatch are handed to
+	// the dispatch registered by the event handler, should one be registered
+	static dispatch_type asynchronous_dispatch{};
+
+	auto register_asynchronous_dispatch(dispatch_type _dispatch) -> void
+	{
+		asynchronous_dispatch = std::move(_dispatch);
+
+	} // register_asynchronous_dispatch
+
+	// the latency of catalog queries and api calls is recorded by the monitor registered by the event
+	// handler, should one be registered, and policies which declare a priority may be shed
+	static load_monitor* monitor{};
+
+	auto register_load_monitor(load_monitor* _monitor) -> void
+	{
+		monitor = _monitor;
+
+	} // register_load_monitor
+
+	auto record_latency(const latency_signal _signal, const std::chrono::steady_clock::duration _latency) -> void
+	{
+		if (monitor) {
+			monitor->sample(_signal, _latency);
+		}
+
+	} // record_latency
+
+	static bool dispatch_asynchronously(const json& policy, const json& clause)
+	{
+		if (!asynchronous_dispatch || !policy.contains("dispatch")) {
+			return false;
+		}
+
+		// journaled policies are delivered later by a consumer of the local event journal
+		if ("asynchronous" != policy.at("dispatch") && "journal" != policy.at("dispatch")) {
+			return false;
+		}
+
+		return "post" == clause || "finally" == clause;
+
+	} // dispatch_asynchronously
+
+	static bool policy_is_active(const json& policy, const std::string& event, const std::string& rule_name)
+	{
+		for (const auto& clause : policy.at(kw::active_policy_clauses)) {
+			if (rule_name.find("_" + clause.get<std::string>()) == std::string::npos) {
+				continue;
+			}
+
+			for (const auto& op : policy.at(kw::events)) {
+				std::string upper_operation{op};
+				std::transform(
+					upper_operation.begin(), upper_operation.end(), upper_operation.begin(), [](unsigned char _letter) {
+						return ::toupper(_letter);
+					});
+				if (upper_operation == event) {
+					return true;
+				}
+			}
+		}
+
+		return false;
+
+	} // policy_is_active
+
+	// a shed policy is written to the event journal for later delivery, or is skipped should it not
+	// be deferrable.  a conditional which would itself query the catalog is not evaluated, and the
+	// policy is skipped
+	static void shed_policy(rsComm_t* comm, const json& policy, json parameters)
+	{
+		auto deferred = policy;
+		deferred["dispatch"] = "journal";
+
+		const auto defer = "skip" != policy.value("when_shed", std::string{"defer"}) && asynchronous_dispatch &&
+		                   !policy.value(kw::conditional, json::object()).contains(kw::metadata_exists);
+
+		if (!defer) {
+			monitor->count_skipped();
+			return;
+		}
+
+		if (policy.contains(kw::parameters)) {
+			auto merged = policy.at(kw::parameters);
+			merged.insert(parameters.begin(), parameters.end());
+			parameters = merged;
+		}
+
+		if (!evaluate_conditionals(comm, parameters, deferred)) {
+			return;
+		}
+
+		if (asynchronous_dispatch(deferred, parameters, policy.value(kw::configuration, json::object()))) {
+			monitor->count_deferred();
+		}
+		else {
+			monitor->count_skipped();
+		}
+
+	} // shed_policy
+
 	void invoke_policies_for_event(
 		ruleExecInfo_t* rei,
 		const bool stop_on_error,
@@ -652,6 +883,14 @@ namespace irods::policy_composition
 				continue;
 			}
 
+			// policies which declare a priority are shed while the catalog is under pressure
+			if (monitor && policy.contains("priority") && monitor->sheds(policy.at("priority").get<std::string>()) &&
+			    policy_is_active(policy, event, rule_name))
+			{
+				shed_policy(rei->rsComm, policy, parameters);
+				continue;
+			}
+
 			for (auto& clause : policy_clauses) {
 				std::string suffix{"_"};
 				suffix += clause;
@@ -690,6 +929,11 @@ namespace irods::policy_composition
 							continue;
 						}
 
+						// errors of asynchronous policies are not returned, so stop_on_error does not apply
+						if (dispatch_asynchronously(policy, clause) && asynchronous_dispatch(policy, pam, cfg)) {
+							continue;
+						}
+
 						std::string params{pam.dump()};
 						std::string config{cfg.dump()};
 						std::string out{};
@@ -716,4 +960,123 @@ namespace irods::policy_composition
 
 	} // invoke_policies_for_event
 
+	// a logical_path conditional selects the objects of a batch to which the policy applies, and
+	// is then removed from the policy
+	static auto select_objects(json& policy, const json& objects) -> json
+	{
+		if (!policy.contains(kw::conditional) || !policy.at(kw::conditional).contains(kw::logical_path)) {
+			return objects;
+		}
+
+		auto& conditional = policy.at(kw::conditional);
+		const auto cond_regex = boost::regex(conditional.at(kw::logical_path).get<std::string>());
+
+		conditional.erase(kw::logical_path);
+		if (conditional.empty()) {
+			policy.erase(kw::conditional);
+		}
+
+		auto selected = json::array();
+		for (const auto& object : objects) {
+			if (boost::regex_match(object.at(kw::logical_path).get<std::string>(), cond_regex)) {
+				selected.push_back(object);
+			}
+		}
+
+		return selected;
+
+	} // select_objects
+
+	// the conditionals which remain after selection are evaluated for each object, as they would be
+	// were the batch expanded, and are then removed from the policy.  the conditional metadata of an
+	// object, should there be any, is kept with the object
+	static auto
+	evaluate_conditionals_for_objects(rsComm_t* comm, json& policy, const json& parameters, const json& objects) -> json
+	{
+		if (!policy.contains(kw::conditional)) {
+			return objects;
+		}
+
+		auto selected = json::array();
+		for (const auto& object : objects) {
+			auto single = policy.value(kw::parameters, json::object());
+			single.update(parameters);
+			single.update(object);
+
+			if (!evaluate_conditionals(comm, single, policy)) {
+				continue;
+			}
+
+			auto kept = object;
+			if (single.contains(kw::conditional_metadata)) {
+				kept[kw::conditional_metadata] = single.at(kw::conditional_metadata);
+			}
+
+			selected.push_back(kept);
+		}
+
+		policy.erase(kw::conditional);
+
+		return selected;
+
+	} // evaluate_conditionals_for_objects
+
+	void invoke_policies_for_batch(
+		ruleExecInfo_t* rei,
+		const bool stop_on_error,
+		const std::string& event,
+		const std::string& rule_name,
+		const json& policies_to_invoke,
+		const json& parameters,
+		const json& objects)
+	{
+		for (auto policy : policies_to_invoke) {
+			if (!policy.contains(kw::policy_to_invoke) || !policy_is_active(policy, event, rule_name)) {
+				continue;
+			}
+
+			const auto selected = select_objects(policy, objects);
+			if (selected.empty()) {
+				continue;
+			}
+
+			// batch capable policies are invoked once with every object
+			if (policy.value("batch_capable", false)) {
+				auto batch = parameters;
+				batch[kw::objects] = evaluate_conditionals_for_objects(rei->rsComm, policy, parameters, selected);
+				if (batch.at(kw::objects).empty()) {
+					continue;
+				}
+
+				invoke_policies_for_event(rei, stop_on_error, event, rule_name, json::array({policy}), batch);
+				continue;
+			}
+
+			// without conditionals which require the connection, the batch is expanded into an
+			// invocation for each object by the background workers
+			const auto clause = rule_name.substr(rule_name.find_last_of('_') + 1);
+			if (!policy.contains(kw::conditional) && dispatch_asynchronously(policy, clause)) {
+				auto batch = parameters;
+				batch[kw::objects] = selected;
+
+				if (policy.contains(kw::parameters)) {
+					auto merged = policy.at(kw::parameters);
+					merged.insert(batch.begin(), batch.end());
+					batch = merged;
+				}
+
+				if (asynchronous_dispatch(policy, batch, policy.value(kw::configuration, json::object()))) {
+					continue;
+				}
+			}
+
+			for (const auto& object : selected) {
+				auto single = parameters;
+				single.update(object);
+				invoke_policies_for_event(rei, stop_on_error, event, rule_name, json::array({policy}), single);
+			}
+		}
+
+	} // invoke_policies_for_batch
+
 } //namespace irods::policy_composition
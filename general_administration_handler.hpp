@@ -40,7 +40,7 @@ namespace
 
 		obj["policy_enforcement_point"] = _rule_name;
 		obj["event"] = event;
-		obj["comm"] = pc::serialize_rsComm_to_json(_rei->rsComm);
+		obj["comm"] = eh::serialize_comm(_rei->rsComm);
 
 		return std::make_tuple(event, obj);
 
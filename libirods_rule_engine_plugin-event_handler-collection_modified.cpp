@@ -14,7 +14,6 @@ namespace
 	auto data_obj_inp_handler(const std::string& _rule_name, const pc::arguments_type& _arguments, ruleExecInfo_t* _rei)
 		-> std::tuple<std::string, json>
 	{
-		auto comm = pc::serialize_rsComm_to_json(_rei->rsComm);
 		auto it = pc::advance_or_throw(_arguments, 2);
 
 		auto inp = boost::any_cast<dataObjInp_t*>(*it);
@@ -23,8 +22,6 @@ namespace
 			return std::make_tuple(eh::SKIP_POLICY_INVOCATION, json{});
 		}
 
-		auto obj = pc::serialize_dataObjInp_to_json(*inp);
-
 		const auto event = [&]() -> const std::string {
 			std::string op = pc::pep_to_event(p2e, _rule_name);
 			if (inp->oprType == UNREG_OPR) {
@@ -33,9 +30,19 @@ namespace
 			return op;
 		}();
 
+		if (!eh::is_subscribed(_rule_name, event)) {
+			return std::make_tuple(eh::SKIP_POLICY_INVOCATION, json{});
+		}
+
+		const auto selector = eh::select_fields(event);
+
+		auto obj = pc::serialize_dataObjInp_to_json(*inp, selector);
+
 		obj[kw::policy_enforcement_point] = _rule_name;
 		obj[kw::event] = event;
-		obj[kw::comm] = comm;
+		if (eh::is_selected(selector, kw::comm)) {
+			obj[kw::comm] = eh::serialize_comm(_rei->rsComm);
+		}
 
 		return std::make_tuple(event, obj);
 
@@ -49,10 +56,18 @@ namespace
 		const auto inp{boost::any_cast<collInp_t*>(*it)};
 		const auto event{pc::pep_to_event(p2e, _rule_name)};
 
-		auto obj = pc::serialize_collInp_to_json(*inp);
+		if (!eh::is_subscribed(_rule_name, event)) {
+			return std::make_tuple(eh::SKIP_POLICY_INVOCATION, json{});
+		}
+
+		const auto selector = eh::select_fields(event);
+
+		auto obj = pc::serialize_collInp_to_json(*inp, selector);
 		obj[kw::policy_enforcement_point] = _rule_name;
 		obj[kw::event] = event;
-		obj[kw::comm] = pc::serialize_rsComm_to_json(_rei->rsComm);
+		if (eh::is_selected(selector, kw::comm)) {
+			obj[kw::comm] = eh::serialize_comm(_rei->rsComm);
+		}
 
 		return std::make_tuple(event, obj);
 
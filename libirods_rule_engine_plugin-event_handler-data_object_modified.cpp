@@ -3,9 +3,30 @@
 #include <irods/objDesc.hpp>
 #include <irods/physPath.hpp>
 #include <irods/bulkDataObjReg.h>
+#include <irods/filesystem.hpp>
+#include <irods/irods_query.hpp>
+#include <irods/client_connection.hpp>
+#include <irods/modAVUMetadata.h>
+
+#include <sys/file.h>
+#include <fcntl.h>
+#include <unistd.h>
 
 #include <fmt/format.h>
 
+#include <array>
+#include <chrono>
+#include <climits>
+#include <condition_variable>
+#include <cstring>
+#include <filesystem>
+#include <fstream>
+#include <mutex>
+#include <optional>
+#include <thread>
+
+#include "access_frequency_sketch.hpp"
+
 // Persistent L1 File Descriptor Table
 extern l1desc_t L1desc[NUM_L1_DESC];
 
@@ -36,7 +57,890 @@ namespace
 		{"phy_path_reg", "REGISTER"},
 	};
 
-	std::map<uint32_t, json> objects_in_flight{};
+	// events which may change the size or number of replicas, not including those which are
+	// accounted for at close
+	const std::set<std::string>
+		accounted_events{"PUT", "REPLICATION", "TRIM", "TRUNCATE", "UNLINK", "UNREGISTER", "REGISTER"};
+
+	// data objects opened for modification, indexed by their L1 descriptor.  records are compact
+	// copies of the fields of the dataObjInp_t and are released as the data object is closed
+	class open_object_table
+	{
+	  public:
+		// seeks of a descriptor, the byte range is that of the absolute offsets requested
+		struct seek_activity
+		{
+			std::uint64_t count{};
+			std::uint64_t since_emitted{};
+			rodsLong_t minimum_offset{};
+			rodsLong_t maximum_offset{};
+			std::chrono::steady_clock::time_point last_emitted{};
+			bool ranged{};
+			bool emit{};
+		};
+
+		struct record
+		{
+			std::string logical_path;
+			int create_mode{};
+			int open_flags{};
+			rodsLong_t offset{};
+			rodsLong_t data_size{};
+			int num_threads{};
+			int opr_type{};
+			std::vector<std::pair<std::string, std::string>> cond_input;
+			seek_activity seeks{};
+		};
+
+		struct usage
+		{
+			std::uint64_t records{};
+			std::uint64_t bytes{};
+			std::uint64_t peak_records{};
+			std::uint64_t peak_bytes{};
+			std::uint64_t stale{};
+		};
+
+		// the descriptor is not returned to the policy enforcement point.  the server allocates the
+		// lowest free descriptor, so the one which follows the last tracked is predicted and then
+		// verified, falling back to a search for an untracked descriptor open for the path
+		void track(const dataObjInp_t& _inp)
+		{
+			auto index = is_untracked_descriptor_for(predicted_, _inp.objPath) ? std::optional<int>{predicted_}
+			                                                                   : find_descriptor_for(_inp.objPath);
+			if (!index) {
+				rodsLog(LOG_DEBUG, "no descriptor found for [%s]", _inp.objPath);
+				return;
+			}
+
+			predicted_ = *index + 1;
+
+			record r{
+				_inp.objPath,
+				_inp.createMode,
+				_inp.openFlags,
+				_inp.offset,
+				_inp.dataSize,
+				_inp.numThreads,
+				_inp.oprType,
+				{}};
+
+			for (int i = 0; i < _inp.condInput.len; ++i) {
+				if (_inp.condInput.keyWord && _inp.condInput.keyWord[i]) {
+					const auto* value =
+						(_inp.condInput.value && _inp.condInput.value[i]) ? _inp.condInput.value[i] : "empty_value";
+					r.cond_input.emplace_back(_inp.condInput.keyWord[i], value);
+				}
+			}
+
+			release(*index);
+
+			usage_.bytes += size_of(r);
+			usage_.records += 1;
+			usage_.peak_bytes = std::max(usage_.peak_bytes, usage_.bytes);
+			usage_.peak_records = std::max(usage_.peak_records, usage_.records);
+
+			records_[*index] = std::move(r);
+
+		} // track
+
+		// while the descriptor is open the record must describe the same data object, otherwise
+		// it was left behind by a descriptor which has since been reused
+		auto find(const int _index, const bool _descriptor_is_open) -> record*
+		{
+			if (_index < 0 || _index >= NUM_L1_DESC || !records_[_index]) {
+				return nullptr;
+			}
+
+			if (_descriptor_is_open) {
+				const auto& l1 = L1desc[_index];
+				if (FD_INUSE != l1.inuseFlag || !l1.dataObjInp ||
+				    records_[_index]->logical_path != l1.dataObjInp->objPath)
+				{
+					++usage_.stale;
+					release(_index);
+					return nullptr;
+				}
+			}
+
+			return &*records_[_index];
+
+		} // find
+
+		void release(const int _index)
+		{
+			if (_index < 0 || _index >= NUM_L1_DESC || !records_[_index]) {
+				return;
+			}
+
+			usage_.bytes -= size_of(*records_[_index]);
+			usage_.records -= 1;
+			records_[_index].reset();
+
+			predicted_ = std::min(predicted_, _index);
+
+		} // release
+
+		// records which remain as the agent stops were never closed, and are reported
+		// along with the usage of the table
+		void report(const json& _configuration)
+		{
+			if (0 == usage_.records) {
+				return;
+			}
+
+			auto leaked = json::array();
+			for (const auto& r : records_) {
+				if (r) {
+					leaked.push_back(r->logical_path);
+				}
+			}
+
+			const auto directory = pc::get_local_state_directory(_configuration, "open_objects");
+			const auto path = fmt::format("{}/{}.json", directory, getpid());
+
+			const json report{
+				{"records", usage_.records},
+				{"bytes", usage_.bytes},
+				{"peak_records", usage_.peak_records},
+				{"peak_bytes", usage_.peak_bytes},
+				{"stale", usage_.stale},
+				{"logical_paths", leaked}};
+
+			std::ofstream out{path};
+			out << report.dump() << '\n';
+
+			rodsLog(LOG_NOTICE, "[%lu] open data objects were not closed [%s]", usage_.records, path.c_str());
+
+		} // report
+
+		static auto to_json(const record& _record) -> json
+		{
+			auto cond_input = json::object();
+			for (const auto& [k, v] : _record.cond_input) {
+				cond_input[k] = v;
+			}
+
+			if (_record.cond_input.empty()) {
+				cond_input["keyValPair_t"] = "nullptr";
+			}
+
+			return {
+				{kw::logical_path, _record.logical_path},
+				{"create_mode", std::to_string(_record.create_mode)},
+				{"open_flags", std::to_string(_record.open_flags)},
+				{"offset", std::to_string(_record.offset)},
+				{"data_size", std::to_string(_record.data_size)},
+				{"num_threads", std::to_string(_record.num_threads)},
+				{"opr_type", std::to_string(_record.opr_type)},
+				{"cond_input", cond_input}};
+
+		} // to_json
+
+		static auto to_json(const seek_activity& _seeks) -> json
+		{
+			return {
+				{"count", _seeks.count},
+				{"minimum_offset", _seeks.minimum_offset},
+				{"maximum_offset", _seeks.maximum_offset}};
+
+		} // to_json
+
+	  private:
+		// descriptors below this are reserved by the server
+		static constexpr int first_descriptor{3};
+
+		auto is_untracked_descriptor_for(const int _index, const char* _logical_path) const -> bool
+		{
+			if (_index < first_descriptor || _index >= NUM_L1_DESC) {
+				return false;
+			}
+
+			const auto& l1 = L1desc[_index];
+			if (FD_INUSE != l1.inuseFlag || !l1.dataObjInp || 0 != std::strcmp(l1.dataObjInp->objPath, _logical_path)) {
+				return false;
+			}
+
+			return !records_[_index] || records_[_index]->logical_path != _logical_path;
+
+		} // is_untracked_descriptor_for
+
+		// the first match is taken, as the server allocates the lowest free descriptor
+		auto find_descriptor_for(const char* _logical_path) const -> std::optional<int>
+		{
+			for (int i = first_descriptor; i < NUM_L1_DESC; ++i) {
+				if (is_untracked_descriptor_for(i, _logical_path)) {
+					return i;
+				}
+			}
+
+			return std::nullopt;
+
+		} // find_descriptor_for
+
+		static auto size_of(const record& _record) -> std::uint64_t
+		{
+			auto bytes = sizeof(record) + _record.logical_path.capacity();
+			for (const auto& [k, v] : _record.cond_input) {
+				bytes += sizeof(std::pair<std::string, std::string>) + k.capacity() + v.capacity();
+			}
+
+			return bytes;
+
+		} // size_of
+
+		std::array<std::optional<record>, NUM_L1_DESC> records_{};
+		int predicted_{first_descriptor};
+		usage usage_{};
+
+	}; // class open_object_table
+
+	open_object_table objects_in_flight{};
+
+	auto policy_clause(const std::string& _rule_name) -> std::string
+	{
+		return _rule_name.substr(_rule_name.find_last_of('_') + 1);
+
+	} // policy_clause
+
+	const std::string accounted_bytes_attribute{"irods::resource::accounted_bytes"};
+	const std::string accounted_objects_attribute{"irods::resource::accounted_objects"};
+
+	// per resource byte and object counts, and applied to the catalog in batches.  the change made by
+	// an operation is taken from the operation itself where it carries a size, otherwise from the
+	// difference between the replicas of the data object before and after the operation.  each server
+	// applies its counts to counters of its own, so no two servers write the same counter
+	class byte_accounting
+	{
+	  public:
+		struct counters
+		{
+			std::int64_t bytes{};
+			std::int64_t objects{};
+		};
+
+		using counters_map = std::map<std::string, counters>;
+
+		byte_accounting() = default;
+		byte_accounting(const byte_accounting&) = delete;
+		byte_accounting& operator=(const byte_accounting&) = delete;
+
+		~byte_accounting()
+		{
+			stop_flusher();
+
+		} // dtor
+
+		void before(rsComm_t* _comm, const std::string& _logical_path)
+		{
+			snapshots_[_logical_path] = replicas_by_resource(_comm, _logical_path);
+
+		} // before
+
+		// the operation fails should the data object exist, so it has no replicas to query
+		void assume_absent(const std::string& _logical_path)
+		{
+			snapshots_[_logical_path] = {};
+
+		} // assume_absent
+
+		// the change to a replica is known before the operation completes, save for the size of a
+		// replica which is written in place, which is queried once the operation completes
+		void expect(
+			const std::string& _logical_path,
+			const std::string& _resource_name,
+			const counters& _delta,
+			const std::optional<int> _replica_number = std::nullopt,
+			const std::int64_t _size_before = 0)
+		{
+			expectations_[_logical_path] = {_resource_name, _delta, _replica_number, _size_before};
+
+		} // expect
+
+		// the change to a replica is known once the operation completes
+		void record(const std::string& _logical_path, const std::string& _resource_name, const counters& _delta)
+		{
+			snapshots_.erase(_logical_path);
+
+			std::lock_guard lock{mutex_};
+
+			pending_[_resource_name].bytes += _delta.bytes;
+			pending_[_resource_name].objects += _delta.objects;
+
+			++events_;
+
+		} // record
+
+		// an operation which removes every replica of the data object need not query them afterward
+		void after(rsComm_t* _comm, const std::string& _logical_path, const bool _removed = false)
+		{
+			if (auto e = expectations_.find(_logical_path); e != expectations_.end()) {
+				auto [resource, delta, replica_number, size_before] = std::move(e->second);
+				expectations_.erase(e);
+
+				if (replica_number) {
+					delta.bytes += replica_size(_comm, _logical_path, *replica_number) - size_before;
+				}
+
+				record(_logical_path, resource, delta);
+				return;
+			}
+
+			auto it = snapshots_.find(_logical_path);
+			if (it == snapshots_.end()) {
+				return;
+			}
+
+			const auto previous = std::move(it->second);
+			snapshots_.erase(it);
+
+			const auto replicas = _removed ? counters_map{} : replicas_by_resource(_comm, _logical_path);
+
+			std::lock_guard lock{mutex_};
+
+			for (const auto& [resource, current] : replicas) {
+				pending_[resource].bytes += current.bytes;
+				pending_[resource].objects += current.objects;
+			}
+
+			for (const auto& [resource, replaced] : previous) {
+				pending_[resource].bytes -= replaced.bytes;
+				pending_[resource].objects -= replaced.objects;
+			}
+
+			++events_;
+
+		} // after
+
+		void discard(const std::string& _logical_path)
+		{
+			snapshots_.erase(_logical_path);
+			expectations_.erase(_logical_path);
+
+		} // discard
+
+		// the counts are applied by a thread of the agent through a connection of its own, so that
+		// the client is not held by the catalog or by agents applying counts on this server
+		void flush_if_due(const json& _configuration)
+		{
+			// clang-format off
+            const auto interval  = pc::get(_configuration, "flush_interval_in_seconds", std::int64_t{30});
+            const auto threshold = pc::get(_configuration, "flush_threshold_in_events", std::uint64_t{1000});
+			// clang-format on
+
+			std::lock_guard lock{mutex_};
+
+			if (!flusher_.joinable()) {
+				configuration_ = _configuration;
+				interval_ = std::chrono::seconds(std::max<std::int64_t>(1, interval));
+				threshold_ = std::max<std::uint64_t>(1, threshold);
+				flusher_ = std::thread{[this] { run(); }};
+			}
+
+			if (events_ >= threshold_) {
+				due_.notify_one();
+			}
+
+		} // flush_if_due
+
+		// counts which remain once the final flush has been attempted are written to a local file,
+		// which is merged by the next flush of any agent on this server
+		void stop(const json& _configuration)
+		{
+			stop_flusher();
+
+			if (pending_.empty()) {
+				return;
+			}
+
+			const auto directory = pc::get_local_state_directory(_configuration, "byte_accounting");
+			const auto path = fmt::format("{}/pending.{}.json", directory, getpid());
+
+			directory_lock lock{directory};
+
+			auto spilled = json::object();
+			for (const auto& [resource, delta] : pending_) {
+				spilled[resource] = {{"bytes", delta.bytes}, {"objects", delta.objects}};
+			}
+
+			std::ofstream out{path, std::ios::app};
+			out << spilled.dump() << '\n';
+
+			pending_.clear();
+
+		} // stop
+
+	  private:
+		class directory_lock
+		{
+		  public:
+			explicit directory_lock(const std::string& _directory)
+			{
+				const auto path = _directory + "/accounting.lock";
+
+				fd_ = open(path.c_str(), O_RDWR | O_CREAT, 0600);
+				if (fd_ < 0) {
+					THROW(UNIX_FILE_OPEN_ERR - errno, fmt::format("failed to open [{}]", path));
+				}
+
+				flock(fd_, LOCK_EX);
+			}
+
+			directory_lock(const directory_lock&) = delete;
+			directory_lock& operator=(const directory_lock&) = delete;
+
+			~directory_lock()
+			{
+				flock(fd_, LOCK_UN);
+				close(fd_);
+			}
+
+		  private:
+			int fd_{-1};
+
+		}; // class directory_lock
+
+		// the flusher makes a final attempt to apply the counts as it is stopped
+		void stop_flusher()
+		{
+			{
+				std::lock_guard lock{mutex_};
+				stopping_ = true;
+			}
+
+			due_.notify_one();
+
+			if (flusher_.joinable()) {
+				flusher_.join();
+			}
+
+		} // stop_flusher
+
+		void run()
+		{
+			std::unique_ptr<irods::experimental::client_connection> connection{};
+
+			std::unique_lock lock{mutex_};
+
+			while (true) {
+				due_.wait_for(lock, interval_, [this] { return stopping_ || events_ >= threshold_; });
+
+				const auto stopping = stopping_;
+
+				auto batch = std::move(pending_);
+				pending_.clear();
+				events_ = 0;
+
+				lock.unlock();
+				flush(connection, batch);
+				lock.lock();
+
+				// counts which were not applied are retried by the next flush
+				for (const auto& [resource, delta] : batch) {
+					pending_[resource].bytes += delta.bytes;
+					pending_[resource].objects += delta.objects;
+				}
+
+				if (stopping) {
+					return;
+				}
+			}
+
+		} // run
+
+		void flush(std::unique_ptr<irods::experimental::client_connection>& _connection, counters_map& _batch)
+		{
+			try {
+				const auto directory = pc::get_local_state_directory(configuration_, "byte_accounting");
+
+				// agents on this server serialize the read, modify and write of its counters
+				directory_lock lock{directory};
+
+				merge_spilled_counters(directory, _batch);
+
+				if (_batch.empty()) {
+					return;
+				}
+
+				if (!_connection) {
+					_connection = std::make_unique<irods::experimental::client_connection>();
+				}
+
+				rcComm_t& comm = *_connection;
+
+				for (auto it = _batch.begin(); it != _batch.end();) {
+					const auto& [resource, delta] = *it;
+
+					if ((0 == delta.bytes && 0 == delta.objects) || apply(comm, resource, delta)) {
+						it = _batch.erase(it);
+					}
+					else {
+						++it;
+					}
+				}
+			}
+			catch (const std::exception& _e) {
+				// the connection may no longer be usable
+				_connection.reset();
+				rodsLog(LOG_ERROR, "failed to apply accounted counts [%s]", _e.what());
+			}
+
+		} // flush
+
+		auto replicas_by_resource(rsComm_t* _comm, const std::string& _logical_path) -> counters_map
+		{
+			namespace fs = irods::experimental::filesystem;
+
+			const fs::path path{_logical_path};
+
+			const auto query_str = fmt::format(
+				"SELECT DATA_REPL_NUM, RESC_NAME, DATA_SIZE WHERE COLL_NAME = '{}' AND DATA_NAME = '{}'",
+				path.parent_path().string(),
+				path.object_name().string());
+
+			const auto start = std::chrono::steady_clock::now();
+
+			counters_map replicas{};
+			for (const auto& row : irods::query<rsComm_t>{_comm, query_str}) {
+				auto& c = replicas[row[1]];
+				c.bytes += std::stoll(row[2]);
+				c.objects += 1;
+			}
+
+			pc::record_latency(pc::latency_signal::query, std::chrono::steady_clock::now() - start);
+
+			return replicas;
+
+		} // replicas_by_resource
+
+		auto replica_size(rsComm_t* _comm, const std::string& _logical_path, const int _replica_number) -> std::int64_t
+		{
+			namespace fs = irods::experimental::filesystem;
+
+			const fs::path path{_logical_path};
+
+			const auto query_str = fmt::format(
+				"SELECT DATA_SIZE WHERE COLL_NAME = '{}' AND DATA_NAME = '{}' AND DATA_REPL_NUM = '{}'",
+				path.parent_path().string(),
+				path.object_name().string(),
+				_replica_number);
+
+			const auto start = std::chrono::steady_clock::now();
+
+			irods::query<rsComm_t> qobj{_comm, query_str, 1};
+			const auto size = qobj.size() > 0 ? std::stoll(qobj.front()[0]) : std::int64_t{};
+
+			pc::record_latency(pc::latency_signal::query, std::chrono::steady_clock::now() - start);
+
+			return size;
+
+		} // replica_size
+
+		void merge_spilled_counters(const std::string& _directory, counters_map& _counters)
+		{
+			for (const auto& entry : std::filesystem::directory_iterator{_directory}) {
+				const auto name = entry.path().filename().string();
+				if (0 != name.rfind("pending.", 0)) {
+					continue;
+				}
+
+				std::ifstream in{entry.path()};
+				for (std::string line; std::getline(in, line);) {
+					try {
+						for (const auto& [resource, delta] : json::parse(line).items()) {
+							_counters[resource].bytes += delta.at("bytes").get<std::int64_t>();
+							_counters[resource].objects += delta.at("objects").get<std::int64_t>();
+						}
+					}
+					catch (const json::exception& _e) {
+						rodsLog(LOG_ERROR, "failed to parse spilled counters in [%s] [%s]", name.c_str(), _e.what());
+					}
+				}
+
+				std::filesystem::remove(entry.path());
+			}
+
+		} // merge_spilled_counters
+
+		// the counters of this server are written by no other server, so the read, modify and write
+		// of them under the lock of this server loses no counts
+		auto apply(rcComm_t& _comm, const std::string& _resource_name, const counters& _delta) -> bool
+		{
+			const auto bytes_attribute = fmt::format("{}::{}", accounted_bytes_attribute, host_name());
+			const auto objects_attribute = fmt::format("{}::{}", accounted_objects_attribute, host_name());
+
+			const auto query_str = fmt::format(
+				"SELECT META_RESC_ATTR_NAME, META_RESC_ATTR_VALUE WHERE RESC_NAME = '{}' AND META_RESC_ATTR_NAME IN "
+				"('{}', '{}')",
+				_resource_name,
+				bytes_attribute,
+				objects_attribute);
+
+			counters current{};
+			for (const auto& row : irods::query<rcComm_t>{&_comm, query_str}) {
+				auto& value = (bytes_attribute == row[0]) ? current.bytes : current.objects;
+				value = std::stoll(row[1]);
+			}
+
+			// deltas on resources which are not yet counted are applied from zero, the counters
+			// may be seeded from a catalog query of the resource.  the counters of a server may
+			// go negative should replicas counted by another server be removed through it
+			const auto set = [&](const std::string& _attribute, const std::int64_t _value) {
+				const auto value = std::to_string(_value);
+
+				modAVUMetadataInp_t set_op{};
+				set_op.arg0 = "set";
+				set_op.arg1 = "-R";
+				set_op.arg2 = const_cast<char*>(_resource_name.c_str());
+				set_op.arg3 = const_cast<char*>(_attribute.c_str());
+				set_op.arg4 = const_cast<char*>(value.c_str());
+
+				return rcModAVUMetadata(&_comm, &set_op);
+			};
+
+			const auto bytes_status = set(bytes_attribute, current.bytes + _delta.bytes);
+			const auto objects_status = set(objects_attribute, current.objects + _delta.objects);
+			if (bytes_status < 0 || objects_status < 0) {
+				rodsLog(
+					LOG_ERROR,
+					"failed to update accounting for [%s] [%d] [%d]",
+					_resource_name.c_str(),
+					bytes_status,
+					objects_status);
+				return false;
+			}
+
+			return true;
+
+		} // apply
+
+		static auto host_name() -> const std::string&
+		{
+			static const std::string name = [] {
+				char buffer[HOST_NAME_MAX + 1]{};
+				gethostname(buffer, sizeof(buffer) - 1);
+				return std::string{buffer};
+			}();
+
+			return name;
+
+		} // host_name
+
+		struct expectation
+		{
+			std::string resource_name;
+			counters delta;
+			std::optional<int> replica_number;
+			std::int64_t size_before;
+		};
+
+		std::map<std::string, counters_map> snapshots_{};
+		std::map<std::string, expectation> expectations_{};
+
+		// the counts pending application and the state of the flusher are guarded by the mutex
+		std::mutex mutex_{};
+		std::condition_variable due_{};
+		counters_map pending_{};
+		std::uint64_t events_{};
+		bool stopping_{};
+		json configuration_{};
+		std::chrono::seconds interval_{};
+		std::uint64_t threshold_{};
+		std::thread flusher_{};
+
+	}; // class byte_accounting
+
+	byte_accounting accounting{};
+
+	// accesses are counted in a sketch local to the agent which is periodically merged into the
+	// sketch shared by the server, from which the promotion policy estimates how hot an object is
+	class access_tracking
+	{
+	  public:
+		void record(const std::string& _logical_path, const json& _configuration)
+		{
+			if (!sketch_) {
+				// clang-format off
+                irods::sketch_dimensions dimensions{};
+                dimensions.width = pc::get(_configuration, "sketch_width", dimensions.width);
+                dimensions.depth = pc::get(_configuration, "sketch_depth", dimensions.depth);
+				// clang-format on
+
+				sketch_ = std::make_unique<irods::count_min_sketch>(dimensions);
+			}
+
+			sketch_->add(_logical_path);
+
+			const auto interval = pc::get(_configuration, "merge_interval_in_seconds", std::int64_t{10});
+			if (std::chrono::steady_clock::now() - last_merge_ >= std::chrono::seconds(interval)) {
+				merge(_configuration);
+			}
+
+		} // record
+
+		void merge(const json& _configuration)
+		{
+			if (!sketch_ || sketch_->empty()) {
+				return;
+			}
+
+			const auto path = pc::get_local_state_directory(_configuration, "access_frequency") + "/access.sketch";
+			const auto half_life = pc::get(_configuration, "half_life_in_seconds", std::int64_t{3600});
+
+			irods::shared_sketch shared{path, sketch_->dimensions(), half_life};
+			shared.merge(*sketch_);
+
+			sketch_->clear();
+			last_merge_ = std::chrono::steady_clock::now();
+
+		} // merge
+
+	  private:
+		std::unique_ptr<irods::count_min_sketch> sketch_{};
+		std::chrono::steady_clock::time_point last_merge_{std::chrono::steady_clock::now()};
+
+	}; // class access_tracking
+
+	access_tracking access_tracker{};
+
+	auto track_access(const std::string& _rule_name, const std::string& _logical_path) -> void
+	{
+		const auto& plugin_configuration = eh::configuration->plugin_configuration;
+		if (!plugin_configuration.contains("access_tracking") || _logical_path.empty()) {
+			return;
+		}
+
+		if (eh::policy_clauses::post != _rule_name.substr(_rule_name.find_last_of('_') + 1)) {
+			return;
+		}
+
+		try {
+			access_tracker.record(_logical_path, plugin_configuration.at("access_tracking"));
+		}
+		catch (const std::exception& _e) {
+			rodsLog(LOG_ERROR, "access tracking failed for [%s] [%s]", _logical_path.c_str(), _e.what());
+		}
+
+	} // track_access
+
+	auto leaf_resource_name(const std::string& _hierarchy) -> std::string
+	{
+		return _hierarchy.substr(_hierarchy.find_last_of(';') + 1);
+
+	} // leaf_resource_name
+
+	auto accounting_configuration(const std::string& _logical_path) -> const json*
+	{
+		const auto& plugin_configuration = eh::configuration->plugin_configuration;
+		if (!plugin_configuration.contains("byte_accounting") || _logical_path.empty()) {
+			return nullptr;
+		}
+
+		return &plugin_configuration.at("byte_accounting");
+
+	} // accounting_configuration
+
+	// the change is taken from the operation where it is known, otherwise the replicas of the data
+	// object are captured in the pre clause and compared in the post clause
+	auto account_for_operation(
+		const std::string& _rule_name,
+		const std::string& _event,
+		const dataObjInp_t& _inp,
+		ruleExecInfo_t* _rei) -> void
+	{
+		const std::string logical_path{_inp.objPath};
+
+		const auto* configuration = accounting_configuration(logical_path);
+		if (!configuration) {
+			return;
+		}
+
+		const auto clause = policy_clause(_rule_name);
+		const auto forced = nullptr != getValByKey(&_inp.condInput, FORCE_FLAG_KW);
+		const auto creates = ("PUT" == _event || "COPY" == _event) && !forced;
+
+		try {
+			if (eh::policy_clauses::pre == clause) {
+				if (creates) {
+					accounting.assume_absent(logical_path);
+				}
+				else {
+					accounting.before(_rei->rsComm, logical_path);
+				}
+			}
+			else if (eh::policy_clauses::post == clause) {
+				// the hierarchy of a put is resolved by the operation, and its size is given
+				const auto* hierarchy = getValByKey(&_inp.condInput, RESC_HIER_STR_KW);
+				if ("PUT" == _event && creates && hierarchy && _inp.dataSize >= 0) {
+					accounting.record(logical_path, leaf_resource_name(hierarchy), {_inp.dataSize, 1});
+				}
+				else {
+					const auto removed = "UNLINK" == _event && !getValByKey(&_inp.condInput, REPL_NUM_KW);
+					accounting.after(_rei->rsComm, logical_path, removed);
+				}
+
+				accounting.flush_if_due(*configuration);
+			}
+			else if (eh::policy_clauses::except == clause) {
+				accounting.discard(logical_path);
+			}
+		}
+		catch (const std::exception& _e) {
+			// accounting must never fail the operation itself
+			rodsLog(LOG_ERROR, "byte accounting failed for [%s] [%s]", logical_path.c_str(), _e.what());
+		}
+
+	} // account_for_operation
+
+	// the change made through a descriptor opened for write is known from the descriptor, a created
+	// or truncated replica holds the bytes written while the size of one written in place is queried.
+	// descriptors opened for read change nothing
+	auto account_for_close(
+		const std::string& _rule_name,
+		const int _l1_idx,
+		const open_object_table::record& _record,
+		ruleExecInfo_t* _rei) -> void
+	{
+		const auto* configuration = accounting_configuration(_record.logical_path);
+		if (!configuration || !(_record.open_flags & (O_WRONLY | O_RDWR))) {
+			return;
+		}
+
+		const auto clause = policy_clause(_rule_name);
+
+		try {
+			if (eh::policy_clauses::pre == clause) {
+				const auto& l1 = L1desc[_l1_idx];
+				if (!l1.dataObjInfo) {
+					accounting.before(_rei->rsComm, _record.logical_path);
+					return;
+				}
+
+				const auto& info = *l1.dataObjInfo;
+				const auto resource = leaf_resource_name(info.rescHier);
+				const auto created = CREATE_TYPE == l1.openType;
+				const auto size_before = created ? 0 : info.dataSize;
+
+				if (l1.bytesWritten >= 0 && (created || _record.open_flags & O_TRUNC)) {
+					accounting.expect(_record.logical_path, resource, {l1.bytesWritten - size_before, created ? 1 : 0});
+				}
+				else {
+					accounting.expect(_record.logical_path, resource, {0, created ? 1 : 0}, info.replNum, size_before);
+				}
+			}
+			else if (eh::policy_clauses::post == clause) {
+				accounting.after(_rei->rsComm, _record.logical_path);
+				accounting.flush_if_due(*configuration);
+			}
+			else if (eh::policy_clauses::except == clause) {
+				accounting.discard(_record.logical_path);
+			}
+		}
+		catch (const std::exception& _e) {
+			rodsLog(LOG_ERROR, "byte accounting failed for [%s] [%s]", _record.logical_path.c_str(), _e.what());
+		}
+
+	} // account_for_operation
 
 	std::string hierarchy_resolution_operation{};
 
@@ -48,7 +952,9 @@ namespace
 	{
 		const std::string event{hierarchy_resolution_operation};
 
-		auto comm = pc::serialize_rsComm_to_json(_rei->rsComm);
+		if (!eh::is_subscribed(_rule_name, event)) {
+			return;
+		}
 
 		auto data_name = getSqlResultByInx(&_attr_arr, COL_DATA_NAME);
 		if (!data_name) {
@@ -65,25 +971,35 @@ namespace
 			offset_int.push_back(atoi(&offset->value[offset->len * i]));
 		}
 
+		// the fields shared by every object of the upload are serialized once for the batch
 		dataObjInp_t inp{};
 		inp.condInput = _cond_input;
-		for (int i = 0; i < _attr_arr.rowCnt; ++i) {
-			rstrcpy(inp.objPath, &data_name->value[data_name->len * i], sizeof(inp.objPath));
 
-			inp.dataSize = i == 0 ? offset_int[0] : offset_int[i] - offset_int[i - 1];
+		const auto selector = eh::select_fields(event);
 
-			auto obj = pc::serialize_dataObjInp_to_json(inp);
+		auto batch = pc::serialize_dataObjInp_to_json(inp, [&selector](const std::string& _field) {
+			return kw::logical_path != _field && "data_size" != _field && eh::is_selected(selector, _field);
+		});
 
-			obj[kw::policy_enforcement_point] = _rule_name;
-			obj[kw::event] = event;
-			obj[kw::comm] = comm;
+		batch[kw::policy_enforcement_point] = _rule_name;
+		batch[kw::event] = event;
+		if (eh::is_selected(selector, kw::comm)) {
+			batch[kw::comm] = eh::serialize_comm(_rei->rsComm);
+		}
 
-			auto p2i = eh::configuration->plugin_configuration.at(kw::policies_to_invoke);
-			auto stop = eh::configuration->plugin_configuration.contains("stop_on_error");
+		auto objects = json::array();
+		for (int i = 0; i < _attr_arr.rowCnt; ++i) {
+			const auto data_size = i == 0 ? offset_int[0] : offset_int[i] - offset_int[i - 1];
+
+			objects.push_back(
+				{{kw::logical_path, &data_name->value[data_name->len * i]},
+			     {"data_size", boost::lexical_cast<std::string>(data_size)}});
+		}
 
-			pc::invoke_policies_for_event(_rei, stop, event, _rule_name, p2i, obj);
+		auto p2i = eh::configuration->plugin_configuration.at(kw::policies_to_invoke);
+		auto stop = eh::configuration->plugin_configuration.contains("stop_on_error");
 
-		} // for i
+		pc::invoke_policies_for_batch(_rei, stop, event, _rule_name, p2i, batch, objects);
 
 	} // invoke_policy_for_bulk_put
 
@@ -113,53 +1029,122 @@ namespace
 	auto copy_rename_handler(const std::string& _rule_name, const pc::arguments_type& _arguments, ruleExecInfo_t* _rei)
 		-> std::tuple<std::string, json>
 	{
-		auto comm = pc::serialize_rsComm_to_json(_rei->rsComm);
 		auto it = pc::advance_or_throw(_arguments, 2);
 
 		const std::string event = pc::pep_to_event(p2e, _rule_name);
 
 		auto inp = boost::any_cast<dataObjCopyInp_t*>(*it);
 
+		if ("COPY" == event) {
+			account_for_operation(_rule_name, event, inp->destDataObjInp, _rei);
+		}
+
+		if (!eh::is_subscribed(_rule_name, event)) {
+			return std::make_tuple(eh::SKIP_POLICY_INVOCATION, json{});
+		}
+
+		const auto selector = eh::select_fields(event);
+		const auto* comm = eh::is_selected(selector, kw::comm) ? &eh::serialize_comm(_rei->rsComm) : nullptr;
+
 		auto p2i = eh::configuration->plugin_configuration.at(kw::policies_to_invoke);
 		auto stop = eh::configuration->plugin_configuration.contains("stop_on_error");
 
-		json src = pc::serialize_dataObjInp_to_json(inp->srcDataObjInp);
+		json src = pc::serialize_dataObjInp_to_json(inp->srcDataObjInp, selector);
 		src[kw::policy_enforcement_point] = _rule_name;
 		src[kw::event] = event;
-		src[kw::comm] = comm;
+		if (comm) {
+			src[kw::comm] = *comm;
+		}
 		pc::invoke_policies_for_event(_rei, stop, event, _rule_name, p2i, src);
 
-		json dst = pc::serialize_dataObjInp_to_json(inp->destDataObjInp);
+		json dst = pc::serialize_dataObjInp_to_json(inp->destDataObjInp, selector);
 		dst[kw::policy_enforcement_point] = _rule_name;
 		dst[kw::event] = event;
-		dst[kw::comm] = comm;
+		if (comm) {
+			dst[kw::comm] = *comm;
+		}
 		pc::invoke_policies_for_event(_rei, stop, event, _rule_name, p2i, dst);
 
 		return std::make_tuple(eh::SKIP_POLICY_INVOCATION, json{});
 
 	} // copy_rename_handler
 
+	// the decision to emit a seek is taken in its pre clause, and followed by its remaining clauses
+	auto seek_is_emitted(
+		const std::string& _rule_name,
+		const openedDataObjInp_t& _inp,
+		open_object_table::seek_activity& _seeks) -> bool
+	{
+		if (eh::policy_clauses::pre != policy_clause(_rule_name)) {
+			return _seeks.emit;
+		}
+
+		const auto& plugin_configuration = eh::configuration->plugin_configuration;
+		const auto configuration =
+			plugin_configuration.contains("seek_events") ? plugin_configuration.at("seek_events") : json::object();
+
+		// clang-format off
+        const auto mode          = pc::get(configuration, "mode",                     std::string{"every"});
+        const auto every_n_seeks = pc::get(configuration, "every_n_seeks",            std::uint64_t{0});
+        const auto interval      = pc::get(configuration, "interval_in_milliseconds", std::int64_t{0});
+		// clang-format on
+
+		const auto now = std::chrono::steady_clock::now();
+
+		if (SEEK_SET == _inp.whence) {
+			_seeks.minimum_offset = _seeks.ranged ? std::min(_seeks.minimum_offset, _inp.offset) : _inp.offset;
+			_seeks.maximum_offset = _seeks.ranged ? std::max(_seeks.maximum_offset, _inp.offset) : _inp.offset;
+			_seeks.ranged = true;
+		}
+
+		++_seeks.count;
+		++_seeks.since_emitted;
+
+		if ("throttle" == mode) {
+			_seeks.emit = 1 == _seeks.count || (every_n_seeks > 0 && _seeks.since_emitted >= every_n_seeks) ||
+			              (interval > 0 && now - _seeks.last_emitted >= std::chrono::milliseconds(interval));
+		}
+		else {
+			_seeks.emit = "summary" != mode;
+		}
+
+		if (_seeks.emit) {
+			_seeks.since_emitted = 0;
+			_seeks.last_emitted = now;
+		}
+
+		return _seeks.emit;
+
+	} // seek_is_emitted
+
 	auto seek_handler(const std::string& _rule_name, const pc::arguments_type& _arguments, ruleExecInfo_t* _rei)
 		-> std::tuple<std::string, json>
 	{
-		auto comm = pc::serialize_rsComm_to_json(_rei->rsComm);
 		auto it = pc::advance_or_throw(_arguments, 2);
 
 		auto inp = boost::any_cast<openedDataObjInp_t*>(*it);
-		const auto l1_idx = inp->l1descInx;
-		auto obj = objects_in_flight[l1_idx];
-		if (obj.empty()) {
+		auto* record = objects_in_flight.find(inp->l1descInx, true);
+		if (!record || !seek_is_emitted(_rule_name, *inp, record->seeks)) {
 			return std::make_tuple(std::string{}, json{});
 		}
 
-		const std::string event = [&]() -> const std::string {
-			const std::string& op = pc::pep_to_event(p2e, _rule_name);
-			return op;
-		}();
+		const std::string event = pc::pep_to_event(p2e, _rule_name);
+		if (!eh::is_subscribed(_rule_name, event)) {
+			return std::make_tuple(std::string{}, json{});
+		}
+
+		const auto selector = eh::select_fields(event);
+
+		auto obj = open_object_table::to_json(*record);
+		if (eh::is_selected(selector, "seeks")) {
+			obj["seeks"] = open_object_table::to_json(record->seeks);
+		}
 
 		obj[kw::policy_enforcement_point] = _rule_name;
 		obj[kw::event] = event;
-		obj[kw::comm] = comm;
+		if (eh::is_selected(selector, kw::comm)) {
+			obj[kw::comm] = eh::serialize_comm(_rei->rsComm);
+		}
 
 		return std::make_tuple(event, obj);
 
@@ -170,21 +1155,16 @@ namespace
 	auto create_open_handler(const std::string& _rule_name, const pc::arguments_type& _arguments, ruleExecInfo_t* _rei)
 		-> std::tuple<std::string, json>
 	{
-		auto comm = pc::serialize_rsComm_to_json(_rei->rsComm);
 		auto it = pc::advance_or_throw(_arguments, 2);
 		auto inp = boost::any_cast<dataObjInp_t*>(*it);
 
-		json obj{};
-		try {
-			int l1_idx{};
-			std::tie(l1_idx, obj) = pc::get_index_and_json_from_obj_inp(inp);
-			objects_in_flight[l1_idx] = obj;
-		}
-		catch (const irods::exception& _e) {
-			rodsLog(LOG_DEBUG, "irods::get_index_and_resource_from_obj_inp failed for [%s]", inp->objPath);
+		// the descriptor is allocated by the operation, so exists only in the post clause
+		if (eh::policy_clauses::post == policy_clause(_rule_name)) {
+			objects_in_flight.track(*inp);
 		}
 
-		if (inp->openFlags & O_TRUNC) {
+		if (inp->openFlags & O_TRUNC && eh::is_subscribed(_rule_name, "TRUNCATE")) {
+			auto obj = pc::serialize_dataObjInp_to_json(*inp, eh::select_fields("TRUNCATE"));
 			obj[kw::event] = "TRUNCATE";
 			return std::make_tuple(std::string{"TRUNCATE"}, obj);
 		}
@@ -198,7 +1178,6 @@ namespace
 	auto close_handler(const std::string& _rule_name, const pc::arguments_type& _arguments, ruleExecInfo_t* _rei)
 		-> std::tuple<std::string, json>
 	{
-		auto comm = pc::serialize_rsComm_to_json(_rei->rsComm);
 		auto it = pc::advance_or_throw(_arguments, 2);
 
 		uint32_t l1_idx{};
@@ -213,14 +1192,16 @@ namespace
 			l1_idx = inp->l1descInx;
 		}
 
-		auto obj = objects_in_flight[l1_idx];
-		if (obj.empty()) {
+		// the descriptor is released by the close itself, the record is verified against it in the
+		// pre clause and released in the finally clause
+		const auto clause = policy_clause(_rule_name);
+		const auto* record = objects_in_flight.find(l1_idx, eh::policy_clauses::pre == clause);
+		if (!record) {
 			return std::make_tuple(std::string{}, json{});
 		}
 
-		auto open_flags = boost::lexical_cast<int>(obj["open_flags"].get<std::string>());
-		auto write_flag = (open_flags & O_WRONLY || open_flags & O_RDWR);
-		auto create_flag = (open_flags & O_CREAT);
+		const auto logical_path = record->logical_path;
+		const auto write_flag = (record->open_flags & O_WRONLY || record->open_flags & O_RDWR);
 
 		const auto event = [&]() -> const std::string {
 			if ("CREATE" == hierarchy_resolution_operation)
@@ -233,9 +1214,36 @@ namespace
 				return hierarchy_resolution_operation;
 		}();
 
-		obj[kw::policy_enforcement_point] = _rule_name;
-		obj[kw::event] = event;
-		obj[kw::comm] = comm;
+		// the event is only serialized should a policy subscribe to it
+		json obj{};
+		if (eh::is_subscribed(_rule_name, event)) {
+			const auto selector = eh::select_fields(event);
+
+			obj = open_object_table::to_json(*record);
+			if (record->seeks.count > 0 && eh::is_selected(selector, "seeks")) {
+				obj["seeks"] = open_object_table::to_json(record->seeks);
+			}
+
+			obj[kw::policy_enforcement_point] = _rule_name;
+			obj[kw::event] = event;
+			if (eh::is_selected(selector, kw::comm)) {
+				obj[kw::comm] = eh::serialize_comm(_rei->rsComm);
+			}
+		}
+
+		account_for_close(_rule_name, l1_idx, *record, _rei);
+
+		if (eh::policy_clauses::finally == clause) {
+			objects_in_flight.release(l1_idx);
+		}
+
+		if ("GET" == event) {
+			track_access(_rule_name, logical_path);
+		}
+
+		if (obj.empty()) {
+			return std::make_tuple(eh::SKIP_POLICY_INVOCATION, json{});
+		}
 
 		return std::make_tuple(event, obj);
 
@@ -244,11 +1252,9 @@ namespace
 	auto data_obj_inp_handler(const std::string& _rule_name, const pc::arguments_type& _arguments, ruleExecInfo_t* _rei)
 		-> std::tuple<std::string, json>
 	{
-		auto comm = pc::serialize_rsComm_to_json(_rei->rsComm);
 		auto it = pc::advance_or_throw(_arguments, 2);
 
 		auto inp = boost::any_cast<dataObjInp_t*>(*it);
-		auto obj = pc::serialize_dataObjInp_to_json(*inp);
 
 		const auto event = [&]() -> const std::string {
 			std::string op = pc::pep_to_event(p2e, _rule_name);
@@ -258,37 +1264,115 @@ namespace
 			return op;
 		}();
 
+		if (accounted_events.count(event)) {
+			account_for_operation(_rule_name, event, *inp, _rei);
+		}
+		else if ("GET" == event) {
+			track_access(_rule_name, inp->objPath);
+		}
+
+		if (!eh::is_subscribed(_rule_name, event)) {
+			return std::make_tuple(eh::SKIP_POLICY_INVOCATION, json{});
+		}
+
+		const auto selector = eh::select_fields(event);
+
+		auto obj = pc::serialize_dataObjInp_to_json(*inp, selector);
+
 		obj[kw::policy_enforcement_point] = _rule_name;
 		obj[kw::event] = event;
-		obj[kw::comm] = comm;
+		if (eh::is_selected(selector, kw::comm)) {
+			obj[kw::comm] = eh::serialize_comm(_rei->rsComm);
+		}
 
 		return std::make_tuple(event, obj);
 
 	} // data_obj_inp_handler
 
+	// byte accounting and access tracking observe operations whether or not a policy is configured
+	auto accounted_clauses(const json& _configuration) -> eh::clause_set_type
+	{
+		eh::clause_set_type clauses{};
+		if (_configuration.contains("byte_accounting")) {
+			clauses.insert({eh::policy_clauses::pre, eh::policy_clauses::post, eh::policy_clauses::except});
+		}
+
+		if (_configuration.contains("access_tracking")) {
+			clauses.insert(eh::policy_clauses::post);
+		}
+
+		return clauses;
+
+	} // accounted_clauses
+
+	// open data objects are tracked from the post clause of the open until the finally clause of
+	// the close, seeks are counted in the pre clause, and the hierarchy resolution determines the
+	// event of a close
+	auto open_clauses(const json&) -> eh::clause_set_type
+	{
+		return {eh::policy_clauses::post};
+
+	} // open_clauses
+
+	auto close_clauses(const json& _configuration) -> eh::clause_set_type
+	{
+		auto clauses = accounted_clauses(_configuration);
+		clauses.insert({eh::policy_clauses::pre, eh::policy_clauses::finally});
+
+		return clauses;
+
+	} // close_clauses
+
+	auto pre_clause(const json&) -> eh::clause_set_type
+	{
+		return {eh::policy_clauses::pre};
+
+	} // pre_clause
+
 } // namespace
 
 extern "C" eh::plugin_pointer_type plugin_factory(const std::string& _pn, const std::string& _ctx)
 {
-	eh::register_handler("data_obj_put", eh::interfaces::api, data_obj_inp_handler);
-	eh::register_handler("data_obj_get", eh::interfaces::api, data_obj_inp_handler);
-	eh::register_handler("data_obj_unlink", eh::interfaces::api, data_obj_inp_handler);
-	eh::register_handler("data_obj_repl", eh::interfaces::api, data_obj_inp_handler);
-	eh::register_handler("phy_path_reg", eh::interfaces::api, data_obj_inp_handler);
-	eh::register_handler("data_obj_truncate", eh::interfaces::api, data_obj_inp_handler);
-	eh::register_handler("data_obj_trim", eh::interfaces::api, data_obj_inp_handler);
-	eh::register_handler("data_obj_chksum", eh::interfaces::api, data_obj_inp_handler);
-	eh::register_handler("data_obj_create", eh::interfaces::api, create_open_handler);
-	eh::register_handler("data_obj_open", eh::interfaces::api, create_open_handler);
-	eh::register_handler("data_obj_close", eh::interfaces::api, close_handler);
-	eh::register_handler("replica_open", eh::interfaces::api, create_open_handler);
-	eh::register_handler("replica_close", eh::interfaces::api, close_handler);
-	eh::register_handler("data_obj_lseek", eh::interfaces::api, seek_handler);
-	eh::register_handler("data_obj_rename", eh::interfaces::api, copy_rename_handler);
-	eh::register_handler("data_obj_copy", eh::interfaces::api, copy_rename_handler);
+	eh::register_handler("data_obj_put", eh::interfaces::api, data_obj_inp_handler, accounted_clauses);
+	eh::register_handler("data_obj_get", eh::interfaces::api, data_obj_inp_handler, accounted_clauses);
+	eh::register_handler("data_obj_unlink", eh::interfaces::api, data_obj_inp_handler, accounted_clauses);
+	eh::register_handler("data_obj_repl", eh::interfaces::api, data_obj_inp_handler, accounted_clauses);
+	eh::register_handler("phy_path_reg", eh::interfaces::api, data_obj_inp_handler, accounted_clauses);
+	eh::register_handler("data_obj_truncate", eh::interfaces::api, data_obj_inp_handler, accounted_clauses);
+	eh::register_handler("data_obj_trim", eh::interfaces::api, data_obj_inp_handler, accounted_clauses);
+	eh::register_handler("data_obj_chksum", eh::interfaces::api, data_obj_inp_handler, accounted_clauses);
+	eh::register_handler("data_obj_create", eh::interfaces::api, create_open_handler, open_clauses);
+	eh::register_handler("data_obj_open", eh::interfaces::api, create_open_handler, open_clauses);
+	eh::register_handler("data_obj_close", eh::interfaces::api, close_handler, close_clauses);
+	eh::register_handler("replica_open", eh::interfaces::api, create_open_handler, open_clauses);
+	eh::register_handler("replica_close", eh::interfaces::api, close_handler, close_clauses);
+	eh::register_handler("data_obj_lseek", eh::interfaces::api, seek_handler, pre_clause);
+	eh::register_handler("data_obj_rename", eh::interfaces::api, copy_rename_handler, accounted_clauses);
+	eh::register_handler("data_obj_copy", eh::interfaces::api, copy_rename_handler, accounted_clauses);
 	eh::register_handler("bulk_data_obj_put", eh::interfaces::api, bulk_put_handler);
 
-	eh::register_handler("resolve_hierarchy", eh::interfaces::resource, hierarchy_handler);
+	eh::register_handler("resolve_hierarchy", eh::interfaces::resource, hierarchy_handler, pre_clause);
+
+	eh::register_stop_hook([] {
+		if (eh::configuration && eh::configuration->plugin_configuration.contains("byte_accounting")) {
+			accounting.stop(eh::configuration->plugin_configuration.at("byte_accounting"));
+		}
+	});
+
+	eh::register_stop_hook([] {
+		if (eh::configuration && eh::configuration->plugin_configuration.contains("access_tracking")) {
+			access_tracker.merge(eh::configuration->plugin_configuration.at("access_tracking"));
+		}
+	});
+
+	eh::register_stop_hook([] {
+		try {
+			objects_in_flight.report(eh::configuration ? eh::configuration->plugin_configuration : json::object());
+		}
+		catch (const irods::exception& e) {
+			rodsLog(LOG_ERROR, "failed to report open data objects [%s]", e.what());
+		}
+	});
 
 	return eh::make(_pn, _ctx);
 } // plugin_factory
@@ -22,14 +22,16 @@ namespace
 	{
 		const std::string event{"METADATA"};
 
+		if (!eh::is_subscribed(_rule_name, event)) {
+			return std::make_tuple(eh::SKIP_POLICY_INVOCATION, json{});
+		}
+
 		const std::map<xm::entity_type, std::string> to_variable{
 			{xm::entity_type::collection, kw::logical_path},
 			{xm::entity_type::data_object, kw::logical_path},
 			{xm::entity_type::user, kw::user_name},
 			{xm::entity_type::resource, kw::source_resource}};
 
-		auto comm = pc::serialize_rsComm_to_json(_rei->rsComm);
-
 		auto it = _arguments.begin();
 		std::advance(it, 2);
 		if (_arguments.end() == it) {
@@ -40,17 +42,21 @@ namespace
 		const auto et{xm::to_entity_type(inp->arg1)};
 		const auto var{to_variable.at(et)};
 
+		const auto selector = eh::select_fields(event);
+
 		json obj{};
 		obj[kw::event] = event;
 		obj[var] = inp->arg2;
-		obj[kw::metadata] = {
-			{kw::comm, comm},
-			{kw::entity_type, xm::to_entity_string(et)},
-			{kw::operation, inp->arg0},
-			{kw::entity, inp->arg2},
-			{kw::attribute, inp->arg3},
-			{kw::value, inp->arg4},
-			{kw::units, inp->arg5}};
+		if (eh::is_selected(selector, kw::metadata)) {
+			obj[kw::metadata] = {
+				{kw::comm, eh::serialize_comm(_rei->rsComm)},
+				{kw::entity_type, xm::to_entity_string(et)},
+				{kw::operation, inp->arg0},
+				{kw::entity, inp->arg2},
+				{kw::attribute, inp->arg3},
+				{kw::value, inp->arg4},
+				{kw::units, inp->arg5}};
+		}
 
 		obj[kw::policy_enforcement_point] = _rule_name;
 
@@ -8,8 +8,21 @@
 
 #include <nlohmann/json.hpp>
 
+#include <boost/algorithm/string.hpp>
+
+#include <sys/file.h>
+#include <fcntl.h>
+#include <signal.h>
+#include <unistd.h>
+
 #include <algorithm>
+#include <ctime>
+#include <filesystem>
+#include <fstream>
 #include <iostream>
+#include <optional>
+#include <queue>
+#include <set>
 
 #include "parameter_substitution.hpp"
 
@@ -31,11 +44,23 @@ namespace
 	{
 		static const std::string remove_all{"remove_all_replicas"};
 		static const std::string trim_single{"trim_single_replica"};
+		static const std::string trim_to_watermark{"trim_to_low_watermark"};
+		static const std::string index_expiry{"index_expiry"};
+		static const std::string expire_due{"expire_due"};
+		static const std::string rebuild_expiry_index{"rebuild_expiry_index"};
 	}; //namespace retention_mode
 
 	auto mode_is_supported(const std::string& m) -> bool
 	{
-		return (m == retention_mode::remove_all || m == retention_mode::trim_single);
+		static const std::set<std::string> modes{
+			retention_mode::remove_all,
+			retention_mode::trim_single,
+			retention_mode::trim_to_watermark,
+			retention_mode::index_expiry,
+			retention_mode::expire_due,
+			retention_mode::rebuild_expiry_index};
+
+		return modes.count(m) > 0;
 	}
 
 	auto get_source_resource(rsComm_t* comm, const std::string& logical_path, const std::string& destination_resource)
@@ -274,6 +299,654 @@ namespace
 
 	} // object_can_be_trimmed
 
+	auto get_resource_metadata_value(rsComm_t* comm, const std::string& resource, const std::string& attribute)
+		-> std::string
+	{
+		auto qstr = fmt::format(
+			"SELECT META_RESC_ATTR_VALUE WHERE RESC_NAME = '{}' AND META_RESC_ATTR_NAME = '{}'", resource, attribute);
+		irods::query qobj{comm, qstr};
+
+		return qobj.size() > 0 ? qobj.front()[0] : std::string{};
+
+	} // get_resource_metadata_value
+
+	struct trim_candidate
+	{
+		std::string logical_path;
+		std::string leaf_resource;
+		std::uint64_t size;
+		std::string time;
+	};
+
+	// the number of replicas whose eligibility is determined by a single query
+	constexpr std::size_t eligibility_batch_size{256};
+
+	// the data ids of the batch which have a good replica beyond the leaves of the resource
+	auto replicated_elsewhere(
+		rsComm_t* comm,
+		const std::vector<std::string>& data_ids,
+		const std::set<std::string>& leaf_ids) -> std::set<std::string>
+	{
+		std::string id_list{};
+		for (const auto& id : data_ids) {
+			id_list += fmt::format("{}'{}'", id_list.empty() ? "" : ", ", id);
+		}
+
+		auto qstr =
+			fmt::format("SELECT DATA_ID, DATA_RESC_ID WHERE DATA_ID IN ({}) AND DATA_REPL_STATUS = '1'", id_list);
+
+		std::set<std::string> ids{};
+		for (const auto& row : irods::query<rsComm_t>{comm, qstr}) {
+			if (0 == leaf_ids.count(row[1])) {
+				ids.insert(row[0]);
+			}
+		}
+
+		return ids;
+
+	} // replicated_elsewhere
+
+	// streams the replicas on the resource and retains the oldest whose combined size covers the
+	// bytes to free, the newest retained candidate is at the top of the heap and is displaced first.
+	// only replicas which have another good copy beyond the resource are eligible, which is
+	// determined for each batch of rows before they are considered, so that the retained candidates
+	// cover the bytes to free without those which may not be trimmed
+	auto select_trim_candidates(
+		rsComm_t* comm,
+		const std::string& leaf_bundle,
+		const std::set<std::string>& leaf_ids,
+		const std::string& time_column,
+		const std::uint64_t bytes_to_free,
+		const std::uint32_t maximum_candidates,
+		std::uint64_t& ineligible) -> std::vector<trim_candidate>
+	{
+		auto newer = [](const trim_candidate& a, const trim_candidate& b) { return a.time < b.time; };
+		std::priority_queue<trim_candidate, std::vector<trim_candidate>, decltype(newer)> heap{newer};
+		std::uint64_t bytes{};
+
+		std::vector<std::string> batch_ids{};
+		std::vector<trim_candidate> batch{};
+
+		auto consider_batch = [&] {
+			if (batch.empty()) {
+				return;
+			}
+
+			const auto eligible = replicated_elsewhere(comm, batch_ids, leaf_ids);
+
+			for (std::size_t i = 0; i < batch.size(); ++i) {
+				if (0 == eligible.count(batch_ids[i])) {
+					++ineligible;
+					continue;
+				}
+
+				bytes += batch[i].size;
+				heap.push(std::move(batch[i]));
+
+				while (heap.size() > 1 &&
+				       (heap.size() > maximum_candidates || bytes - heap.top().size >= bytes_to_free))
+				{
+					bytes -= heap.top().size;
+					heap.pop();
+				}
+			}
+
+			batch.clear();
+			batch_ids.clear();
+		};
+
+		auto qstr = fmt::format(
+			"SELECT DATA_ID, COLL_NAME, DATA_NAME, RESC_NAME, DATA_SIZE, {} WHERE DATA_RESC_ID IN ({})",
+			time_column,
+			leaf_bundle);
+
+		for (const auto& row : irods::query<rsComm_t>{comm, qstr}) {
+			batch_ids.push_back(row[0]);
+			batch.push_back({fmt::format("{}/{}", row[1], row[2]), row[3], std::stoull(row[4]), row[5]});
+
+			if (batch.size() >= eligibility_batch_size) {
+				consider_batch();
+			}
+		}
+
+		consider_batch();
+
+		std::vector<trim_candidate> candidates{};
+		while (!heap.empty()) {
+			candidates.push_back(heap.top());
+			heap.pop();
+		}
+
+		// oldest first
+		std::reverse(candidates.begin(), candidates.end());
+
+		return candidates;
+
+	} // select_trim_candidates
+
+	auto trim_to_low_watermark(
+		const pe::context& ctx,
+		std::string user_name,
+		const std::string& source_resource,
+		const std::string& attribute,
+		const string_vector& whitelist) -> irods::error
+	{
+		auto comm = ctx.rei->rsComm;
+
+		// clang-format off
+        const auto high_watermark     = pc::get(ctx.configuration, "high_watermark_in_percent", 90.0);
+        const auto low_watermark      = pc::get(ctx.configuration, "low_watermark_in_percent",  80.0);
+        const auto candidate_order    = pc::get(ctx.configuration, "candidate_order",           std::string{"modify_time"});
+        const auto maximum_candidates = pc::get(ctx.configuration, "maximum_candidates",        std::uint32_t{10000});
+		// clang-format on
+
+		const std::map<std::string, std::string> order_to_column{
+			{"modify_time", "DATA_MODIFY_TIME"}, {"access_time", "DATA_ACCESS_TIME"}};
+
+		if (low_watermark >= high_watermark) {
+			return ERROR(
+				SYS_INVALID_INPUT_PARAM, "low_watermark_in_percent must be less than high_watermark_in_percent");
+		}
+
+		if (0 == order_to_column.count(candidate_order)) {
+			return ERROR(
+				SYS_INVALID_INPUT_PARAM, fmt::format("candidate_order is not supported [{}]", candidate_order));
+		}
+
+		if (source_resource.empty()) {
+			return ERROR(SYS_INVALID_INPUT_PARAM, "trimming to a watermark requires a source_resource");
+		}
+
+		if (!object_can_be_trimmed(comm, attribute, source_resource, whitelist)) {
+			return ERROR(
+				SYS_INVALID_INPUT_PARAM, fmt::format("resource [{}] may not have replicas trimmed", source_resource));
+		}
+
+		const auto percent_used =
+			get_resource_metadata_value(comm, source_resource, "irods::resource::filesystem_percent_used");
+		const auto total_bytes =
+			get_resource_metadata_value(comm, source_resource, "irods::resource::filesystem_total_bytes");
+
+		if (percent_used.empty() || total_bytes.empty()) {
+			return ERROR(
+				SYS_INVALID_INPUT_PARAM,
+				fmt::format("filesystem usage has not been published for resource [{}]", source_resource));
+		}
+
+		const auto used = std::stod(percent_used);
+		if (used < high_watermark) {
+			pe::client_message(
+				{{"0.message", fmt::format("{} [{}] is below the high watermark", ctx.policy_name, source_resource)},
+			     {"1.percent_used", used}});
+			return SUCCESS();
+		}
+
+		const auto bytes_to_free = static_cast<std::uint64_t>((used - low_watermark) / 100.0 * std::stod(total_bytes));
+
+		const auto leaf_bundle = pe::compute_leaf_bundle(source_resource);
+
+		// the bundle is a list of quoted ids for use within a query
+		std::set<std::string> leaf_ids{};
+		std::string bundle_without_quotes{leaf_bundle};
+		bundle_without_quotes.erase(
+			std::remove(bundle_without_quotes.begin(), bundle_without_quotes.end(), '\''), bundle_without_quotes.end());
+		boost::split(leaf_ids, bundle_without_quotes, boost::is_any_of(", "), boost::token_compress_on);
+
+		if (user_name.empty()) {
+			user_name = comm->clientUser.userName;
+		}
+
+		std::uint64_t freed{}, trimmed{}, skipped{}, ineligible{};
+		const auto candidates = select_trim_candidates(
+			comm,
+			leaf_bundle,
+			leaf_ids,
+			order_to_column.at(candidate_order),
+			bytes_to_free,
+			maximum_candidates,
+			ineligible);
+
+		for (const auto& c : candidates) {
+			if (freed >= bytes_to_free) {
+				break;
+			}
+
+			const auto ret = remove_data_object(DATA_OBJ_TRIM_AN, comm, user_name, c.logical_path, c.leaf_resource);
+			if (ret < 0) {
+				rodsLog(
+					LOG_ERROR,
+					"failed to trim [%s] from [%s] [%d]",
+					c.logical_path.c_str(),
+					c.leaf_resource.c_str(),
+					ret);
+				++skipped;
+				continue;
+			}
+
+			freed += c.size;
+			++trimmed;
+		}
+
+		pe::client_message(
+			{{"0.message", fmt::format("{} trimmed [{}] toward the low watermark", ctx.policy_name, source_resource)},
+		     {"1.bytes_to_free", bytes_to_free},
+		     {"2.bytes_freed", freed},
+		     {"3.replicas_trimmed", trimmed},
+		     {"4.replicas_skipped", skipped},
+		     {"5.replicas_without_another_good_copy", ineligible}});
+
+		return SUCCESS();
+
+	} // trim_to_low_watermark
+
+	auto remove_all_replicas(
+		const pe::context& ctx,
+		const std::string& user_name,
+		const std::string& logical_path,
+		const std::string& source_resource,
+		const std::string& attribute,
+		const string_vector& whitelist) -> irods::error
+	{
+		auto comm = ctx.rei->rsComm;
+
+		pe::client_message({{"0.message", fmt::format("{} mode is removing all replicas", ctx.policy_name)}});
+
+		auto [unlink, resources_to_remove] =
+			determine_resource_list_for_unlink(comm, attribute, logical_path, whitelist);
+
+		pe::client_message({{"0.message", fmt::format("{} unlink flag is {}", ctx.policy_name, unlink)}});
+
+		// removing all replicas requires a call to unlink, cannot trim
+		if (unlink) {
+			pe::client_message(
+				{{"0.message", fmt::format("{} removing data object {}", ctx.policy_name, unlink, logical_path)}});
+
+			const auto ret = remove_data_object(DATA_OBJ_UNLINK_AN, comm, user_name, logical_path);
+			if (ret < 0) {
+				return ERROR(ret, boost::format("failed to remove [%s] from [%s]") % logical_path % source_resource);
+			}
+		}
+		// trim a specific list of replicas determined by policy
+		else {
+			for (const auto& src : resources_to_remove) {
+				pe::client_message(
+					{{"0.message",
+					  fmt::format("{} trimming replica {} from {}", ctx.policy_name, unlink, logical_path, src)}});
+
+				const auto ret = remove_data_object(DATA_OBJ_TRIM_AN, comm, user_name, logical_path, src);
+				if (ret < 0) {
+					return ERROR(ret, boost::format("failed to remove [%s] from [%s]") % logical_path % src);
+				}
+			} // for src
+		}
+
+		return SUCCESS();
+
+	} // remove_all_replicas
+
+	// upcoming expirations are kept locally in a file per day, so that a run reads only the
+	// buckets which are due rather than querying every object which carries an expiry
+	class expiry_index
+	{
+	  public:
+		using entry = std::pair<std::int64_t, std::string>;
+
+		explicit expiry_index(const std::string& _directory)
+			: directory_{_directory}
+		{
+			const auto lock_path = directory_ / "index.lock";
+
+			fd_ = open(lock_path.c_str(), O_RDWR | O_CREAT, 0600);
+			if (fd_ < 0) {
+				THROW(UNIX_FILE_OPEN_ERR - errno, fmt::format("failed to open [{}]", lock_path.string()));
+			}
+
+		} // ctor
+
+		expiry_index(const expiry_index&) = delete;
+		expiry_index& operator=(const expiry_index&) = delete;
+
+		~expiry_index()
+		{
+			close(fd_);
+
+		} // dtor
+
+		void insert(const std::int64_t _expiry, const std::string& _logical_path)
+		{
+			const scoped_lock lock{fd_};
+			append(_expiry, _logical_path);
+
+		} // insert
+
+		void clear()
+		{
+			const scoped_lock lock{fd_};
+			for (const auto& day : bucket_days()) {
+				std::filesystem::remove(bucket_path(day));
+			}
+
+		} // clear
+
+		// removes and returns, in order of expiry, at most _limit entries which are due.  the entries
+		// are claimed by this process until they are restored, and the claim of a process which has
+		// since exited is returned to the index by the next run.
+		auto pop_due(const std::int64_t _now, const std::size_t _limit) -> std::vector<entry>
+		{
+			const scoped_lock lock{fd_};
+
+			recover_abandoned_claims();
+
+			std::vector<entry> due{};
+
+			for (const auto& day : bucket_days()) {
+				if (day > _now / seconds_per_day || due.size() >= _limit) {
+					break;
+				}
+
+				std::vector<entry> remaining{}, claimed{};
+				for (auto&& e : read_entries(bucket_path(day))) {
+					if (e.first <= _now && due.size() + claimed.size() < _limit) {
+						claimed.push_back(std::move(e));
+					}
+					else {
+						remaining.push_back(std::move(e));
+					}
+				}
+
+				// the claim is written before the bucket is rewritten, so that no entry is lost between them
+				write_entries(claim_path(getpid()), claimed, std::ios::app);
+				write_bucket(day, remaining);
+
+				due.insert(due.end(), claimed.begin(), claimed.end());
+			}
+
+			return due;
+
+		} // pop_due
+
+		// returns to the index the entries which remain due, and releases the claim of this process
+		void restore(const std::vector<entry>& _entries)
+		{
+			const scoped_lock lock{fd_};
+
+			for (const auto& [expiry, logical_path] : _entries) {
+				append(expiry, logical_path);
+			}
+
+			std::filesystem::remove(claim_path(getpid()));
+
+		} // restore
+
+	  private:
+		static constexpr std::int64_t seconds_per_day{86400};
+
+		// the index is locked for each operation only, so that indexing is not held up by a run
+		class scoped_lock
+		{
+		  public:
+			explicit scoped_lock(const int _fd)
+				: fd_{_fd}
+			{
+				flock(fd_, LOCK_EX);
+			}
+
+			scoped_lock(const scoped_lock&) = delete;
+			scoped_lock& operator=(const scoped_lock&) = delete;
+
+			~scoped_lock()
+			{
+				flock(fd_, LOCK_UN);
+			}
+
+		  private:
+			const int fd_;
+
+		}; // class scoped_lock
+
+		void append(const std::int64_t _expiry, const std::string& _logical_path) const
+		{
+			std::ofstream out{bucket_path(_expiry / seconds_per_day), std::ios::app};
+			out << _expiry << '\t' << _logical_path << '\n';
+
+		} // append
+
+		void recover_abandoned_claims() const
+		{
+			for (const auto& f : std::filesystem::directory_iterator{directory_}) {
+				if (".claim" != f.path().extension()) {
+					continue;
+				}
+
+				const auto pid = static_cast<pid_t>(std::stol(f.path().stem().string()));
+				if (pid == getpid() || 0 == kill(pid, 0) || ESRCH != errno) {
+					continue;
+				}
+
+				for (const auto& [expiry, logical_path] : read_entries(f.path())) {
+					append(expiry, logical_path);
+				}
+
+				std::filesystem::remove(f.path());
+			}
+
+		} // recover_abandoned_claims
+
+		auto bucket_path(const std::int64_t _day) const -> std::filesystem::path
+		{
+			return directory_ / fmt::format("{0:08}.bucket", _day);
+
+		} // bucket_path
+
+		auto claim_path(const pid_t _pid) const -> std::filesystem::path
+		{
+			return directory_ / fmt::format("{}.claim", _pid);
+
+		} // claim_path
+
+		auto bucket_days() const -> std::vector<std::int64_t>
+		{
+			std::vector<std::int64_t> days{};
+			for (const auto& f : std::filesystem::directory_iterator{directory_}) {
+				if (".bucket" == f.path().extension()) {
+					days.push_back(std::stoll(f.path().stem().string()));
+				}
+			}
+
+			std::sort(days.begin(), days.end());
+
+			return days;
+
+		} // bucket_days
+
+		static auto read_entries(const std::filesystem::path& _path) -> std::set<entry>
+		{
+			// an object which is indexed more than once appears once
+			std::set<entry> entries{};
+
+			std::ifstream in{_path};
+			for (std::string line; std::getline(in, line);) {
+				const auto tab = line.find('\t');
+				if (std::string::npos == tab) {
+					continue;
+				}
+
+				entries.emplace(std::stoll(line.substr(0, tab)), line.substr(tab + 1));
+			}
+
+			return entries;
+
+		} // read_entries
+
+		static void write_entries(
+			const std::filesystem::path& _path,
+			const std::vector<entry>& _entries,
+			const std::ios::openmode _mode)
+		{
+			std::ofstream out{_path, _mode};
+			for (const auto& [expiry, logical_path] : _entries) {
+				out << expiry << '\t' << logical_path << '\n';
+			}
+
+		} // write_entries
+
+		void write_bucket(const std::int64_t _day, const std::vector<entry>& _entries) const
+		{
+			const auto path = bucket_path(_day);
+
+			if (_entries.empty()) {
+				std::filesystem::remove(path);
+				return;
+			}
+
+			const auto tmp = path.string() + ".tmp";
+			write_entries(tmp, _entries, std::ios::trunc);
+
+			std::filesystem::rename(tmp, path);
+
+		} // write_bucket
+
+		const std::filesystem::path directory_;
+		int fd_{-1};
+
+	}; // class expiry_index
+
+	// returns the expiry of the data object, or nothing should the object or attribute not exist
+	auto get_expiry_for_object(rsComm_t* comm, const std::string& logical_path, const std::string& expiry_attribute)
+		-> std::optional<std::int64_t>
+	{
+		fs::path path{logical_path};
+
+		auto qstr = fmt::format(
+			"SELECT META_DATA_ATTR_VALUE WHERE COLL_NAME = '{}' AND DATA_NAME = '{}' AND META_DATA_ATTR_NAME = '{}'",
+			path.parent_path().string(),
+			path.object_name().string(),
+			expiry_attribute);
+
+		irods::query qobj{comm, qstr};
+		if (qobj.size() == 0) {
+			return std::nullopt;
+		}
+
+		try {
+			return std::stoll(qobj.front()[0]);
+		}
+		catch (const std::exception&) {
+			rodsLog(LOG_ERROR, "invalid expiry [%s] for [%s]", qobj.front()[0].c_str(), logical_path.c_str());
+			return std::nullopt;
+		}
+
+	} // get_expiry_for_object
+
+	auto expiry_index_policy(
+		const pe::context& ctx,
+		const std::string& mode,
+		const std::string& user_name,
+		const std::string& logical_path,
+		const std::string& attribute,
+		const string_vector& whitelist) -> irods::error
+	{
+		auto comm = ctx.rei->rsComm;
+
+		// clang-format off
+        const auto expiry_attribute    = pc::get(ctx.configuration, "expiry_attribute",    std::string{"irods::retention::expires_at"});
+        const auto maximum_expirations = pc::get(ctx.configuration, "maximum_expirations", std::uint32_t{1000});
+		// clang-format on
+
+		expiry_index index{pc::get_local_state_directory(ctx.configuration, "expiry_index")};
+
+		if (mode == retention_mode::index_expiry) {
+			if (logical_path.empty()) {
+				return ERROR(SYS_INVALID_INPUT_PARAM, "indexing an expiry requires a logical_path");
+			}
+
+			// objects without an expiry are not indexed, a stale entry is discarded when it is due
+			if (const auto expiry = get_expiry_for_object(comm, logical_path, expiry_attribute); expiry) {
+				index.insert(*expiry, logical_path);
+			}
+
+			return SUCCESS();
+		}
+
+		if (mode == retention_mode::rebuild_expiry_index) {
+			index.clear();
+
+			std::uint64_t indexed{};
+			auto qstr = fmt::format(
+				"SELECT COLL_NAME, DATA_NAME, META_DATA_ATTR_VALUE WHERE META_DATA_ATTR_NAME = '{}'", expiry_attribute);
+			for (const auto& row : irods::query<rsComm_t>{comm, qstr}) {
+				try {
+					index.insert(std::stoll(row[2]), fmt::format("{}/{}", row[0], row[1]));
+					++indexed;
+				}
+				catch (const std::exception&) {
+					rodsLog(
+						LOG_ERROR, "invalid expiry [%s] for [%s/%s]", row[2].c_str(), row[0].c_str(), row[1].c_str());
+				}
+			}
+
+			pe::client_message(
+				{{"0.message", fmt::format("{} rebuilt the expiry index", ctx.policy_name)}, {"1.indexed", indexed}});
+
+			return SUCCESS();
+		}
+
+		const auto now = static_cast<std::int64_t>(std::time(nullptr));
+
+		const auto due = index.pop_due(now, maximum_expirations);
+
+		// the index is not locked while objects are removed, entries which remain due are restored
+		// afterward, as are those not yet reached should a removal throw
+		std::vector<expiry_index::entry> restored{};
+		std::size_t next{};
+
+		std::uint64_t expired{}, discarded{}, deferred{};
+		try {
+			for (; next < due.size(); ++next) {
+				const auto& path = due[next].second;
+
+				// the catalog is authoritative, the expiry may have been changed or removed since indexing
+				const auto current = get_expiry_for_object(comm, path, expiry_attribute);
+				if (!current) {
+					++discarded;
+					continue;
+				}
+
+				if (*current > now) {
+					restored.emplace_back(*current, path);
+					++deferred;
+					continue;
+				}
+
+				const auto user = user_name.empty() ? std::string{comm->clientUser.userName} : user_name;
+				if (const auto err = remove_all_replicas(ctx, user, path, {}, attribute, whitelist); !err.ok()) {
+					rodsLog(LOG_ERROR, "failed to expire [%s] [%s]", path.c_str(), err.result().c_str());
+					restored.emplace_back(*current, path);
+					++deferred;
+					continue;
+				}
+
+				++expired;
+			}
+		}
+		catch (...) {
+			restored.insert(restored.end(), due.begin() + next, due.end());
+			index.restore(restored);
+			throw;
+		}
+
+		index.restore(restored);
+
+		pe::client_message(
+			{{"0.message", fmt::format("{} expired due data objects", ctx.policy_name)},
+		     {"1.expired", expired},
+		     {"2.discarded", discarded},
+		     {"3.deferred", deferred}});
+
+		return SUCCESS();
+
+	} // expiry_index_policy
+
 	auto data_retention_policy(const pe::context& ctx, pe::arg_type out)
 	{
 		auto mode = pc::get(ctx.configuration, "mode", std::string{});
@@ -300,37 +973,26 @@ namespace
 		auto whitelist = pc::get(ctx.configuration, "resource_white_list", json::array());
 		auto attribute = pc::get(ctx.configuration, kw::attribute, std::string{"irods::retention::preserve_replicas"});
 
-		if (mode == retention_mode::remove_all) {
-			pe::client_message({{"0.message", fmt::format("{} mode is removing all replicas", ctx.policy_name)}});
-
-			auto [unlink, resources_to_remove] =
-				determine_resource_list_for_unlink(comm, attribute, logical_path, whitelist);
+		if (mode == retention_mode::index_expiry || mode == retention_mode::expire_due ||
+		    mode == retention_mode::rebuild_expiry_index)
+		{
+			return expiry_index_policy(ctx, mode, user_name, logical_path, attribute, whitelist);
+		}
 
-			pe::client_message({{"0.message", fmt::format("{} unlink flag is {}", ctx.policy_name, unlink)}});
+		if (mode == retention_mode::trim_to_watermark) {
+			if (source_resource.empty()) {
+				source_resource = pc::get(ctx.configuration, "source_resource", source_resource);
+			}
 
-			// removing all replicas requires a call to unlink, cannot trim
-			if (unlink) {
-				pe::client_message(
-					{{"0.message", fmt::format("{} removing data object {}", ctx.policy_name, unlink, logical_path)}});
+			return trim_to_low_watermark(ctx, user_name, source_resource, attribute, whitelist);
+		}
 
-				const auto ret = remove_data_object(DATA_OBJ_UNLINK_AN, comm, user_name, logical_path);
-				if (ret < 0) {
-					return ERROR(
-						ret, boost::format("failed to remove [%s] from [%s]") % logical_path % source_resource);
-				}
-			}
-			// trim a specific list of replicas determined by policy
-			else {
-				for (const auto& src : resources_to_remove) {
-					pe::client_message(
-						{{"0.message",
-					      fmt::format("{} trimming replica {} from {}", ctx.policy_name, unlink, logical_path, src)}});
-
-					const auto ret = remove_data_object(DATA_OBJ_TRIM_AN, comm, user_name, logical_path, src);
-					if (ret < 0) {
-						return ERROR(ret, boost::format("failed to remove [%s] from [%s]") % logical_path % src);
-					}
-				} // for src
+		if (mode == retention_mode::remove_all) {
+			if (const auto err =
+			        remove_all_replicas(ctx, user_name, logical_path, source_resource, attribute, whitelist);
+			    !err.ok())
+			{
+				return err;
 			}
 		}
 		// trim single replica
@@ -20,6 +20,7 @@ namespace
 		static const std::string catalog("catalog");
 		static const std::string filesystem("filesystem");
 		static const std::string checksum("checksum");
+		static const std::string sampled("sampled");
 	} //namespace verification
 
 	auto get_alternate_resource(
@@ -76,8 +77,91 @@ namespace
 
 	} // determine_source_and_destiation
 
+	auto to_json(const std::vector<irods::vault_scan_entry>& _entries, const std::size_t _maximum_entries) -> json
+	{
+		auto entries = json::array();
+
+		for (std::size_t i = 0; i < std::min(_entries.size(), _maximum_entries); ++i) {
+			const auto& e = _entries[i];
+			entries.push_back(
+				{{"logical_path", e.logical_path},
+			     {"physical_path", e.physical_path},
+			     {"catalog_size", e.catalog_size},
+			     {"filesystem_size", e.filesystem_size}});
+		}
+
+		return entries;
+
+	} // to_json
+
+	irods::error scan_resource(const pe::context& ctx, pe::arg_type out)
+	{
+		auto comm = ctx.rei->rsComm;
+
+		auto [user_name, logical_path, source_resource, destination_resource] =
+			capture_parameters(ctx.parameters, tag_first_resc);
+
+		if (source_resource.empty()) {
+			source_resource = pc::get(ctx.configuration, "source_resource", source_resource);
+		}
+
+		// clang-format off
+        const auto number_of_threads = pc::get(ctx.configuration, "number_of_threads",      std::uint32_t{4});
+        const auto maximum_entries   = pc::get(ctx.configuration, "maximum_report_entries", std::size_t{1000});
+		// clang-format on
+
+		pe::client_message(
+			{{"0.usage", fmt::format("{} resource_scan requires source_resource", ctx.policy_name)},
+		     {"1.source_resource", source_resource},
+		     {"2.number_of_threads", number_of_threads}});
+
+		try {
+			const auto report = irods::scan_resource_vault(comm, source_resource, number_of_threads);
+
+			const json result{
+				{"source_resource", source_resource},
+				{"files_scanned", report.files_scanned},
+				{"replicas_scanned", report.replicas_scanned},
+				{"missing_count", report.missing.size()},
+				{"size_mismatch_count", report.size_mismatch.size()},
+				{"orphaned_count", report.orphaned.size()},
+				{"missing", to_json(report.missing, maximum_entries)},
+				{"size_mismatch", to_json(report.size_mismatch, maximum_entries)},
+				{"orphaned", to_json(report.orphaned, maximum_entries)}};
+
+			*out = result.dump();
+
+			// the report is the result of the scan, always return it to the client
+			addRErrorMsg(&comm->rError, 0, result.dump(4).c_str());
+
+			if (!report.missing.empty() || !report.size_mismatch.empty()) {
+				return ERROR(
+					UNMATCHED_KEY_OR_INDEX,
+					fmt::format(
+						"irods_policy_data_verification resource_scan of [{}] found [{}] missing and [{}] mismatched "
+						"replicas",
+						source_resource,
+						report.missing.size(),
+						report.size_mismatch.size()));
+			}
+		}
+		catch (const irods::exception& e) {
+			return ERROR(
+				e.code(),
+				fmt::format(
+					"irods_policy_data_verification resource_scan failed for [{}] [{}]", source_resource, e.what()));
+		}
+
+		return SUCCESS();
+
+	} // scan_resource
+
 	irods::error data_verification_policy(const pe::context& ctx, pe::arg_type out)
 	{
+		if ("resource_scan" == pc::get(ctx.configuration, "mode", std::string{})) {
+			return scan_resource(ctx, out);
+		}
+
 		auto comm = ctx.rei->rsComm;
 
 		std::string user_name{}, logical_path{}, source_resource{}, destination_resource{}, type{}, units{};
@@ -111,9 +195,18 @@ namespace
 		     {"4.destination_resource", destination_resource},
 		     {"5.type", type}});
 
+		irods::sampling_configuration sampling{};
+		if (verification::sampled == type) {
+			// clang-format off
+            sampling.sample_fraction           = pc::get(ctx.configuration, "sample_fraction",           sampling.sample_fraction);
+            sampling.number_of_ranges          = pc::get(ctx.configuration, "number_of_ranges",          sampling.number_of_ranges);
+            sampling.cycle_duration_in_seconds = pc::get(ctx.configuration, "cycle_duration_in_seconds", sampling.cycle_duration_in_seconds);
+			// clang-format on
+		}
+
 		auto verif_fcn = [&](auto& comm) {
 			return irods::verify_replica_for_destination_resource(
-				&comm, type, logical_path, source_resource, destination_resource);
+				&comm, type, logical_path, source_resource, destination_resource, sampling);
 		};
 
 		bool verified = false;
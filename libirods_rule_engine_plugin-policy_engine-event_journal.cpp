@@ -0,0 +1,194 @@
+#include <irods/policy_composition_framework_policy_engine.hpp>
+#include <irods/policy_composition_framework_configuration_manager.hpp>
+#include <irods/policy_composition_framework_event_journal.hpp>
+
+#include <sys/file.h>
+#include <fcntl.h>
+#include <unistd.h>
+
+#include <fstream>
+
+namespace
+{
+
+	// clang-format off
+    namespace pc   = irods::policy_composition;
+    namespace kw   = irods::policy_composition::keywords;
+    namespace pe   = irods::policy_composition::policy_engine;
+    using     json = nlohmann::json;
+	// clang-format on
+
+	// a consumer is served by one agent at a time, an agent which finds the consumer already
+	// held returns rather than waiting
+	class consumer_lock
+	{
+	  public:
+		explicit consumer_lock(const std::string& _path)
+			: fd_{open(_path.c_str(), O_RDWR | O_CREAT, 0600)}
+		{
+			if (fd_ < 0) {
+				THROW(UNIX_FILE_OPEN_ERR - errno, fmt::format("failed to open consumer lock [{}]", _path));
+			}
+
+			held_ = 0 == flock(fd_, LOCK_EX | LOCK_NB);
+
+		} // ctor
+
+		consumer_lock(const consumer_lock&) = delete;
+		consumer_lock& operator=(const consumer_lock&) = delete;
+
+		~consumer_lock()
+		{
+			if (held_) {
+				flock(fd_, LOCK_UN);
+			}
+
+			close(fd_);
+
+		} // dtor
+
+		auto held() const -> bool
+		{
+			return held_;
+
+		} // held
+
+	  private:
+		int fd_{-1};
+		bool held_{};
+
+	}; // class consumer_lock
+
+	void invoke(const pe::context& ctx, const std::string& _policy, const json& _parameters, const json& _configuration)
+	{
+		std::string params{_parameters.dump()};
+		std::string config{_configuration.dump()};
+		std::string out{};
+
+		std::list<boost::any> args{};
+		args.push_back(boost::any(&params));
+		args.push_back(boost::any(&config));
+		args.push_back(boost::any(&out));
+
+		pc::invoke_policy(ctx.rei, _policy, args);
+
+	} // invoke
+
+	// a batch of objects journaled for a policy which is not batch capable is invoked once per object
+	void deliver(const pe::context& ctx, const json& _record)
+	{
+		const auto& policy = _record.at(kw::policy_to_invoke).get_ref<const std::string&>();
+		const auto& parameters = _record.at(kw::parameters);
+		const auto& configuration = _record.at(kw::configuration);
+
+		if (!_record.value("expand", false)) {
+			invoke(ctx, policy, parameters, configuration);
+			return;
+		}
+
+		auto base = parameters;
+		base.erase(kw::objects);
+
+		for (const auto& object : parameters.at(kw::objects)) {
+			auto single = base;
+			single.update(object);
+			invoke(ctx, policy, single, configuration);
+		}
+
+	} // deliver
+
+	void write_dead_letter(const std::string& _path, const json& _record, const std::string& _error)
+	{
+		std::ofstream out{_path, std::ios::app};
+		out << json{{"record", _record}, {"error", _error}, {"time", std::time(nullptr)}}.dump() << '\n';
+
+	} // write_dead_letter
+
+	irods::error event_journal_policy(const pe::context& ctx, pe::arg_type out)
+	{
+		// clang-format off
+        const auto consumer         = pc::get(ctx.configuration, "consumer",         std::string{"default"});
+        const auto maximum_events   = pc::get(ctx.configuration, "maximum_events",   std::uint64_t{1000});
+        const auto maximum_attempts = pc::get(ctx.configuration, "maximum_attempts", std::uint32_t{3});
+		// clang-format on
+
+		const auto directory = pc::get_local_state_directory(ctx.configuration, "event_journal");
+
+		consumer_lock lock{fmt::format("{}/{}.consumer", directory, consumer)};
+		if (!lock.held()) {
+			pe::client_message(
+				{{"0.message", fmt::format("{} consumer [{}] is held by another agent", ctx.policy_name, consumer)}});
+			return SUCCESS();
+		}
+
+		// the consumer only appends should the segment size be needed, it is read from existing segments
+		pc::event_journal journal{
+			directory, pc::get(ctx.configuration, "segment_size_in_bytes", std::uint64_t{16 * 1024 * 1024}), false};
+
+		std::uint64_t delivered{}, dead{};
+		for (const auto& entry : journal.read(consumer, maximum_events)) {
+			std::string error{};
+			for (std::uint32_t attempt = 0; attempt < std::max<std::uint32_t>(maximum_attempts, 1); ++attempt) {
+				try {
+					deliver(ctx, entry.record);
+					error.clear();
+					break;
+				}
+				catch (const irods::exception& e) {
+					error = e.what();
+				}
+			}
+
+			if (error.empty()) {
+				++delivered;
+			}
+			else {
+				rodsLog(
+					LOG_ERROR,
+					"irods_policy_event_journal - failed to deliver [%s] [%s]",
+					entry.record.dump().c_str(),
+					error.c_str());
+				write_dead_letter(directory + "/dead_letters.jsonl", entry.record, error);
+				++dead;
+			}
+
+			// the cursor passes the event only once it is delivered or set aside
+			journal.acknowledge(consumer, entry.next);
+		}
+
+		const auto removed = journal.compact();
+
+		pe::client_message(
+			{{"0.message", fmt::format("{} consumer [{}]", ctx.policy_name, consumer)},
+		     {"1.delivered", delivered},
+		     {"2.dead_letters", dead},
+		     {"3.segments_removed", removed},
+		     {"4.pending_bytes", journal.pending_bytes(consumer)}});
+
+		return SUCCESS();
+
+	} // event_journal_policy
+
+} // namespace
+
+const char usage[] = R"(
+{
+    "id": "file:///var/lib/irods/configuration_schemas/v3/policy_engine_usage.json",
+    "$schema": "http://json-schema.org/draft-04/schema#",
+    "description": ""
+        "input_interfaces": [
+            {
+                "name" :  "direct_invocation",
+                "description" : "",
+                "json_schema" : ""
+            }
+        ],
+    "output_json_for_validation" : ""
+}
+)";
+
+extern "C" pe::plugin_pointer_type plugin_factory(const std::string& _plugin_name, const std::string&)
+{
+	return pe::make(_plugin_name, "irods_policy_event_journal", usage, event_journal_policy);
+
+} // plugin_factory
@@ -7,8 +7,27 @@
 #include <irods/irods_resource_backport.hpp>
 
 #include <sys/statvfs.h>
+#include <sys/mman.h>
+#include <sys/file.h>
+#include <sys/stat.h>
+#include <fcntl.h>
+#include <unistd.h>
 #include <boost/filesystem.hpp>
 
+#include <algorithm>
+#include <chrono>
+#include <cmath>
+#include <cstring>
+#include <ctime>
+#include <fstream>
+#include <future>
+#include <iterator>
+#include <map>
+#include <memory>
+#include <optional>
+#include <sstream>
+#include <thread>
+
 namespace
 {
 
@@ -37,10 +56,631 @@ namespace
 
 	} // get_vault_path
 
+	auto percent_used(const struct statvfs& _statvfs_buf) -> double
+	{
+		uint64_t free_space_blocks = static_cast<uint64_t>(_statvfs_buf.f_bavail);
+		uint64_t total_space_blocks = static_cast<uint64_t>(_statvfs_buf.f_blocks);
+
+		return 100.0 * (1.0 - static_cast<double>(free_space_blocks) / static_cast<double>(total_space_blocks));
+
+	} // percent_used
+
+	auto total_bytes(const struct statvfs& _statvfs_buf) -> std::uint64_t
+	{
+		return static_cast<std::uint64_t>(_statvfs_buf.f_blocks) * static_cast<std::uint64_t>(_statvfs_buf.f_frsize);
+
+	} // total_bytes
+
+	auto set_resource_metadata(
+		rsComm_t* _comm,
+		const std::string& _resource_name,
+		const std::string& _attribute,
+		const std::string& _value) -> int
+	{
+		modAVUMetadataInp_t set_op{};
+		set_op.arg0 = "set";
+		set_op.arg1 = "-R";
+		set_op.arg2 = const_cast<char*>(_resource_name.c_str());
+		set_op.arg3 = const_cast<char*>(_attribute.c_str());
+		set_op.arg4 = const_cast<char*>(_value.c_str());
+
+		return rsModAVUMetadata(_comm, &set_op);
+
+	} // set_resource_metadata
+
+	auto publish_usage(rsComm_t* _comm, const std::string& _resource_name, const struct statvfs& _statvfs_buf) -> int
+	{
+		if (const auto status = set_resource_metadata(
+				_comm,
+				_resource_name,
+				"irods::resource::filesystem_percent_used",
+				std::to_string(percent_used(_statvfs_buf)));
+		    status < 0)
+		{
+			return status;
+		}
+
+		return set_resource_metadata(
+			_comm,
+			_resource_name,
+			"irods::resource::filesystem_total_bytes",
+			std::to_string(total_bytes(_statvfs_buf)));
+
+	} // publish_usage
+
+	// a fixed size ring buffer of samples per resource, memory mapped from a local file and held under
+	// a lock for the lifetime of the object.  a writer holds the lock exclusively and sizes the buffer to
+	// its capacity, while a reader, given no capacity, shares the lock and adopts the existing buffer
+	class usage_history
+	{
+	  public:
+		struct sample
+		{
+			std::int64_t time;
+			double percent_used;
+		};
+
+		usage_history(const std::string& _path, const std::optional<std::uint32_t> _capacity)
+			: writer_{_capacity.has_value()}
+			, fd_{writer_ ? open(_path.c_str(), O_RDWR | O_CREAT, 0600) : open(_path.c_str(), O_RDONLY)}
+		{
+			if (fd_ < 0) {
+				// a history which has yet to be written reads as empty
+				if (!writer_ && ENOENT == errno) {
+					return;
+				}
+
+				THROW(UNIX_FILE_OPEN_ERR - errno, fmt::format("failed to open usage history [{}]", _path));
+			}
+
+			if (flock(fd_, writer_ ? LOCK_EX : LOCK_SH) < 0) {
+				close(fd_);
+				THROW(SYS_INTERNAL_ERR, fmt::format("failed to lock usage history [{}] errno [{}]", _path, errno));
+			}
+
+			struct stat st{};
+			fstat(fd_, &st);
+
+			// the existing samples are only trusted when the file is the size its header describes
+			if (static_cast<std::size_t>(st.st_size) >= sizeof(header)) {
+				map(st.st_size);
+				if (magic != header_->magic || static_cast<std::size_t>(st.st_size) != size_of(header_->capacity)) {
+					unmap();
+				}
+			}
+
+			if (!writer_) {
+				return;
+			}
+
+			const auto capacity = std::max<std::uint32_t>(1, *_capacity);
+			if (header_ && capacity == header_->capacity) {
+				return;
+			}
+
+			// a change of capacity retains the most recent samples which fit
+			const auto retained = header_ ? samples() : std::vector<sample>{};
+			const auto published = header_ ? header_->last_published : sample{};
+			unmap();
+
+			if (ftruncate(fd_, size_of(capacity)) < 0) {
+				flock(fd_, LOCK_UN);
+				close(fd_);
+				THROW(SYS_INTERNAL_ERR, fmt::format("failed to size usage history [{}] errno [{}]", _path, errno));
+			}
+
+			map(size_of(capacity));
+
+			std::memset(static_cast<void*>(header_), 0, size_);
+			header_->magic = magic;
+			header_->capacity = capacity;
+			header_->last_published = published;
+
+			const auto first = retained.size() > capacity ? retained.end() - capacity : retained.begin();
+			std::for_each(first, retained.end(), [this](const sample& _s) { append(_s); });
+
+		} // ctor
+
+		usage_history(const usage_history&) = delete;
+		usage_history& operator=(const usage_history&) = delete;
+
+		~usage_history()
+		{
+			unmap();
+
+			if (fd_ >= 0) {
+				flock(fd_, LOCK_UN);
+				close(fd_);
+			}
+
+		} // dtor
+
+		void append(const sample& _sample)
+		{
+			samples_[header_->count % header_->capacity] = _sample;
+			++header_->count;
+
+		} // append
+
+		auto samples() const -> std::vector<sample>
+		{
+			if (!header_) {
+				return {};
+			}
+
+			// oldest first
+			const auto size = std::min<std::uint64_t>(header_->count, header_->capacity);
+
+			std::vector<sample> values{};
+			for (auto i = header_->count - size; i < header_->count; ++i) {
+				values.push_back(samples_[i % header_->capacity]);
+			}
+
+			return values;
+
+		} // samples
+
+		auto last_published() const -> sample
+		{
+			return header_->last_published;
+
+		} // last_published
+
+		void set_last_published(const sample& _sample)
+		{
+			header_->last_published = _sample;
+
+		} // set_last_published
+
+	  private:
+		static constexpr std::uint64_t magic{0x6972756e75736731}; // "irunusg1"
+
+		struct header
+		{
+			std::uint64_t magic;
+			std::uint32_t capacity;
+			std::uint32_t reserved;
+			std::uint64_t count;
+			sample last_published;
+		};
+
+		static constexpr auto size_of(const std::uint32_t _capacity) -> std::size_t
+		{
+			return sizeof(header) + _capacity * sizeof(sample);
+
+		} // size_of
+
+		void map(const std::size_t _size)
+		{
+			const auto protection = writer_ ? PROT_READ | PROT_WRITE : PROT_READ;
+
+			auto* base = mmap(nullptr, _size, protection, MAP_SHARED, fd_, 0);
+			if (MAP_FAILED == base) {
+				flock(fd_, LOCK_UN);
+				close(fd_);
+				THROW(SYS_INTERNAL_ERR, fmt::format("failed to map usage history errno [{}]", errno));
+			}
+
+			size_ = _size;
+			header_ = static_cast<header*>(base);
+			samples_ = reinterpret_cast<sample*>(header_ + 1);
+
+		} // map
+
+		void unmap()
+		{
+			if (header_) {
+				munmap(header_, size_);
+			}
+
+			header_ = nullptr;
+			samples_ = nullptr;
+			size_ = 0;
+
+		} // unmap
+
+		const bool writer_{};
+		int fd_{-1};
+		std::size_t size_{};
+		header* header_{};
+		sample* samples_{};
+
+	}; // class usage_history
+
+	// the rate of change of percent used per hour over the samples within the window, using either
+	// a least squares fit or an exponentially weighted average of the rate between successive samples
+	template <typename Sample>
+	auto project_fill_rate(
+		const std::vector<Sample>& _samples,
+		const std::string& _method,
+		const std::int64_t _window_in_seconds,
+		const double _weight) -> std::optional<double>
+	{
+		if (_samples.empty()) {
+			return std::nullopt;
+		}
+
+		const auto since = _samples.back().time - _window_in_seconds;
+
+		std::vector<Sample> window{};
+		std::copy_if(_samples.begin(), _samples.end(), std::back_inserter(window), [since](const auto& _s) {
+			return _s.time >= since;
+		});
+
+		if (window.size() < 2 || window.back().time <= window.front().time) {
+			return std::nullopt;
+		}
+
+		const auto hours = [origin = window.front().time](const auto& _s) {
+			return static_cast<double>(_s.time - origin) / 3600.0;
+		};
+
+		if ("ewma" == _method) {
+			std::optional<double> rate{};
+			for (std::size_t i = 1; i < window.size(); ++i) {
+				const auto elapsed = hours(window[i]) - hours(window[i - 1]);
+				if (elapsed <= 0) {
+					continue;
+				}
+
+				const auto slope = (window[i].percent_used - window[i - 1].percent_used) / elapsed;
+				rate = rate ? _weight * slope + (1 - _weight) * *rate : slope;
+			}
+
+			return rate;
+		}
+
+		double sum_x{}, sum_y{}, sum_xx{}, sum_xy{};
+		for (const auto& s : window) {
+			const auto x = hours(s);
+			sum_x += x;
+			sum_y += s.percent_used;
+			sum_xx += x * x;
+			sum_xy += x * s.percent_used;
+		}
+
+		const auto n = static_cast<double>(window.size());
+		const auto denominator = n * sum_xx - sum_x * sum_x;
+		if (0 == denominator) {
+			return std::nullopt;
+		}
+
+		return (n * sum_xy - sum_x * sum_y) / denominator;
+
+	} // project_fill_rate
+
+	auto publish_projection(
+		const pe::context& ctx,
+		const std::string& _resource_name,
+		const double _percent_used,
+		const double _fill_rate) -> int
+	{
+		auto comm = ctx.rei->rsComm;
+
+		if (const auto status = set_resource_metadata(
+				comm, _resource_name, "irods::resource::filesystem_fill_rate", std::to_string(_fill_rate));
+		    status < 0)
+		{
+			return status;
+		}
+
+		if (_fill_rate > 0) {
+			const auto hours_to_full = std::max(0.0, 100.0 - _percent_used) / _fill_rate;
+			return set_resource_metadata(
+				comm, _resource_name, "irods::resource::filesystem_hours_to_full", std::to_string(hours_to_full));
+		}
+
+		// a resource which is not filling has no time to full
+		modAVUMetadataInp_t rm_op{};
+		rm_op.arg0 = "rmw";
+		rm_op.arg1 = "-R";
+		rm_op.arg2 = const_cast<char*>(_resource_name.c_str());
+		rm_op.arg3 = "irods::resource::filesystem_hours_to_full";
+		rm_op.arg4 = "%";
+
+		rsModAVUMetadata(comm, &rm_op);
+
+		return 0;
+
+	} // publish_projection
+
+	auto get_history_path(const pe::context& ctx, const std::string& _resource_name) -> std::string
+	{
+		return fmt::format(
+			"{}/{}.history", pc::get_local_state_directory(ctx.configuration, "filesystem_usage"), _resource_name);
+
+	} // get_history_path
+
+	auto record_usage(const pe::context& ctx, const std::string& _resource_name, const struct statvfs& _statvfs_buf)
+		-> int
+	{
+		const auto used = percent_used(_statvfs_buf);
+
+		// clang-format off
+        const auto minimum_change = pc::get(ctx.configuration, "minimum_change_in_percent",    0.0);
+        const auto maximum_age    = pc::get(ctx.configuration, "maximum_age_in_seconds",       std::int64_t{0});
+        const auto capacity       = pc::get(ctx.configuration, "history_capacity",             std::uint32_t{4096});
+        const auto method         = pc::get(ctx.configuration, "projection_method",            std::string{"linear"});
+        const auto window         = pc::get(ctx.configuration, "projection_window_in_seconds", std::int64_t{86400});
+        const auto weight         = pc::get(ctx.configuration, "projection_weight",            0.3);
+		// clang-format on
+
+		if ("linear" != method && "ewma" != method) {
+			rodsLog(LOG_ERROR, "[%s]: unknown projection_method [%s]", __FUNCTION__, method.c_str());
+			return SYS_INVALID_INPUT_PARAM;
+		}
+
+		const auto now = static_cast<std::int64_t>(std::time(nullptr));
+
+		try {
+			usage_history history{get_history_path(ctx, _resource_name), capacity};
+			history.append({now, used});
+
+			// the catalog is only updated when the value has moved far enough, or has aged
+			const auto last = history.last_published();
+			const auto changed = std::abs(used - last.percent_used) >= minimum_change;
+			const auto expired = maximum_age > 0 && now - last.time >= maximum_age;
+			if (0 != last.time && !changed && !expired) {
+				return 0;
+			}
+
+			if (const auto status = publish_usage(ctx.rei->rsComm, _resource_name, _statvfs_buf); status < 0) {
+				return status;
+			}
+
+			history.set_last_published({now, used});
+
+			if (const auto rate = project_fill_rate(history.samples(), method, window, weight); rate) {
+				return publish_projection(ctx, _resource_name, used, *rate);
+			}
+
+			return 0;
+		}
+		catch (const irods::exception& e) {
+			rodsLog(
+				LOG_ERROR,
+				"[%s]: usage history is unavailable for [%s] [%s]",
+				__FUNCTION__,
+				_resource_name.c_str(),
+				e.what());
+		}
+
+		return publish_usage(ctx.rei->rsComm, _resource_name, _statvfs_buf);
+
+	} // record_usage
+
+	auto report_history(const pe::context& ctx, const std::string& _resource_name, pe::arg_type out) -> irods::error
+	{
+		const auto since = std::time(nullptr) - pc::get(ctx.parameters, "history_seconds_ago", std::int64_t{86400});
+
+		auto samples = json::array();
+
+		try {
+			usage_history history{get_history_path(ctx, _resource_name), std::nullopt};
+			for (const auto& s : history.samples()) {
+				if (s.time >= since) {
+					samples.push_back({{"time", s.time}, {"percent_used", s.percent_used}});
+				}
+			}
+		}
+		catch (const irods::exception& e) {
+			return ERROR(e.code(), e.what());
+		}
+
+		const json report{{"source_resource", _resource_name}, {"samples", samples}};
+
+		*out = report.dump();
+
+		addRErrorMsg(&ctx.rei->rsComm->rError, 0, report.dump(4).c_str());
+
+		return SUCCESS();
+
+	} // report_history
+
+	struct mount_entry
+	{
+		std::string device;
+		std::string mount_point;
+	};
+
+	auto unescape_mount_field(const std::string& _field) -> std::string
+	{
+		// spaces, tabs, and backslashes are octal escaped within the mount table
+		std::string value{};
+		for (std::string::size_type i = 0; i < _field.size(); ++i) {
+			if ('\\' == _field[i] && i + 3 < _field.size()) {
+				value += static_cast<char>(std::stoi(_field.substr(i + 1, 3), nullptr, 8));
+				i += 3;
+			}
+			else {
+				value += _field[i];
+			}
+		}
+
+		return value;
+
+	} // unescape_mount_field
+
+	auto read_mount_table() -> std::vector<mount_entry>
+	{
+		// the mount table is read rather than stating each vault, as a stat
+		// may block indefinitely on an unresponsive network filesystem
+		std::ifstream mountinfo{"/proc/self/mountinfo"};
+		if (!mountinfo) {
+			THROW(SYS_INTERNAL_ERR, "failed to open /proc/self/mountinfo");
+		}
+
+		std::vector<mount_entry> mounts{};
+
+		for (std::string line; std::getline(mountinfo, line);) {
+			std::istringstream fields{line};
+			std::string id, parent_id, device, root, mount_point;
+			if (fields >> id >> parent_id >> device >> root >> mount_point) {
+				mounts.push_back({device, unescape_mount_field(mount_point)});
+			}
+		}
+
+		return mounts;
+
+	} // read_mount_table
+
+	auto find_mount(const std::vector<mount_entry>& _mounts, const std::string& _path) -> const mount_entry*
+	{
+		// the longest mount point which prefixes the path, later entries shadow earlier mounts
+		const mount_entry* match{};
+		for (const auto& m : _mounts) {
+			const auto& mp = m.mount_point;
+			const auto prefixes =
+				"/" == mp || _path == mp ||
+				(0 == _path.compare(0, mp.size(), mp) && _path.size() > mp.size() && '/' == _path[mp.size()]);
+			if (prefixes && (!match || mp.size() >= match->mount_point.size())) {
+				match = &m;
+			}
+		}
+
+		return match;
+
+	} // find_mount
+
+	// only resources whose vault is a local filesystem are measured, the vault path of another type
+	// of resource, such as s3, does not name the storage it uses
+	auto get_local_resources(rsComm_t* _comm, const std::vector<std::string>& _types) -> std::vector<std::string>
+	{
+		std::vector<std::string> resources{};
+
+		irods::query<rsComm_t> qobj{_comm, "SELECT RESC_NAME, RESC_LOC, RESC_VAULT_PATH, RESC_TYPE_NAME"};
+		for (const auto& row : qobj) {
+			if (row[2].empty() || std::find(_types.begin(), _types.end(), row[3]) == _types.end()) {
+				continue;
+			}
+
+			if (pc::host_is_local(row[1])) {
+				resources.push_back(row[0]);
+			}
+		}
+
+		return resources;
+
+	} // get_local_resources
+
+	irods::error filesystem_usage_for_resources(const pe::context& ctx, const std::vector<std::string>& _resources)
+	{
+		const auto timeout =
+			std::chrono::milliseconds(pc::get(ctx.configuration, "statvfs_timeout_in_milliseconds", 5000));
+
+		const auto mounts = read_mount_table();
+
+		// resources sharing a filesystem are grouped by device so that each filesystem is stated once
+		std::map<std::string, std::pair<std::string, std::vector<std::string>>> filesystems{};
+		std::vector<std::string> failed{};
+
+		for (const auto& resc : _resources) {
+			try {
+				const auto vault_path = get_vault_path(resc);
+				const auto* mount = find_mount(mounts, vault_path);
+				if (!mount) {
+					rodsLog(LOG_ERROR, "[%s]: no mount point found for vault [%s]", __FUNCTION__, vault_path.c_str());
+					failed.push_back(resc);
+					continue;
+				}
+
+				auto& [mount_point, resources] = filesystems[mount->device];
+				mount_point = mount->mount_point;
+				resources.push_back(resc);
+			}
+			catch (const irods::exception& e) {
+				rodsLog(LOG_ERROR, "[%s]: %s", __FUNCTION__, e.what());
+				failed.push_back(resc);
+			}
+		}
+
+		using statvfs_result = std::pair<int, struct statvfs>;
+
+		// each statvfs runs in a detached thread which owns its promise, a hung
+		// mount leaves its thread blocked without blocking the sweep
+		std::map<std::string, std::future<statvfs_result>> results{};
+		for (const auto& [device, filesystem] : filesystems) {
+			auto promise = std::make_shared<std::promise<statvfs_result>>();
+			results.emplace(device, promise->get_future());
+
+			std::thread{[promise, mount_point = filesystem.first] {
+				statvfs_result result{};
+				result.first = statvfs(mount_point.c_str(), &result.second);
+				promise->set_value(result);
+			}}.detach();
+		}
+
+		const auto deadline = std::chrono::steady_clock::now() + timeout;
+
+		auto usage = json::object();
+
+		for (auto& [device, future] : results) {
+			const auto& [mount_point, resources] = filesystems.at(device);
+
+			if (std::future_status::ready != future.wait_until(deadline)) {
+				rodsLog(LOG_ERROR, "[%s]: statvfs of [%s] timed out", __FUNCTION__, mount_point.c_str());
+				failed.insert(failed.end(), resources.begin(), resources.end());
+				continue;
+			}
+
+			const auto [ret, statvfs_buf] = future.get();
+			if (0 != ret) {
+				rodsLog(LOG_ERROR, "[%s]: statvfs of [%s] failed", __FUNCTION__, mount_point.c_str());
+				failed.insert(failed.end(), resources.begin(), resources.end());
+				continue;
+			}
+
+			const auto percent = percent_used(statvfs_buf);
+
+			for (const auto& resc : resources) {
+				if (const auto status = record_usage(ctx, resc, statvfs_buf); status < 0) {
+					rodsLog(
+						LOG_ERROR,
+						"[%s]: failed to assign filesystem usage metadata for resource [%s] [%d]",
+						__FUNCTION__,
+						resc.c_str(),
+						status);
+					failed.push_back(resc);
+					continue;
+				}
+
+				usage[resc] = percent;
+			}
+		}
+
+		pe::client_message(
+			{{"0.message", fmt::format("{} filesystems stated [{}]", ctx.policy_name, filesystems.size())},
+		     {"1.usage", usage},
+		     {"2.failed", failed}});
+
+		if (!failed.empty()) {
+			return ERROR(
+				SYS_INVALID_RESC_INPUT,
+				fmt::format("failed to compute filesystem usage for resources [{}]", fmt::join(failed, ", ")));
+		}
+
+		return SUCCESS();
+
+	} // filesystem_usage_for_resources
+
 	irods::error filesystem_usage(const pe::context& ctx, pe::arg_type out)
 	{
 		auto [un, lp, source_resource, dr] = capture_parameters(ctx.parameters, tag_first_resc);
 
+		if (ctx.parameters.contains("source_resources") || pc::get(ctx.parameters, "all_local_resources", false)) {
+			const auto types =
+				ctx.configuration.value("filesystem_resource_types", std::vector<std::string>{"unixfilesystem"});
+			const auto resources = ctx.parameters.contains("source_resources")
+			                           ? ctx.parameters.at("source_resources").get<std::vector<std::string>>()
+			                           : get_local_resources(ctx.rei->rsComm, types);
+
+			return filesystem_usage_for_resources(ctx, resources);
+		}
+
+		if (pc::get(ctx.parameters, "report_history", false)) {
+			return report_history(ctx, source_resource, out);
+		}
+
 		auto vault_path = get_vault_path(source_resource);
 
 		pe::client_message(
@@ -74,21 +714,7 @@ namespace
 			return ERROR(SYS_INVALID_RESC_INPUT, msg);
 		}
 
-		uint64_t free_space_blocks = static_cast<uint64_t>(statvfs_buf.f_bavail);
-		uint64_t total_space_blocks = static_cast<uint64_t>(statvfs_buf.f_blocks);
-
-		double percent_used =
-			100.0 * (1.0 - static_cast<double>(free_space_blocks) / static_cast<double>(total_space_blocks));
-		std::string percent_used_str = std::to_string(percent_used);
-
-		modAVUMetadataInp_t set_op{};
-		set_op.arg0 = "set";
-		set_op.arg1 = "-R";
-		set_op.arg2 = const_cast<char*>(source_resource.c_str());
-		set_op.arg3 = "irods::resource::filesystem_percent_used";
-		set_op.arg4 = const_cast<char*>(percent_used_str.c_str());
-
-		auto status = rsModAVUMetadata(ctx.rei->rsComm, &set_op);
+		const auto status = record_usage(ctx, source_resource, statvfs_buf);
 		if (status < 0) {
 			return ERROR(
 				status, fmt::format("Failed to assign filesystem usage metadata for resource [%s]", source_resource));
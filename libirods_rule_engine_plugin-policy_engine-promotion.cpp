@@ -0,0 +1,314 @@
+#include <irods/policy_composition_framework_policy_engine.hpp>
+#include <irods/policy_composition_framework_parameter_capture.hpp>
+#include <irods/policy_composition_framework_configuration_manager.hpp>
+
+#include <irods/irods_hierarchy_parser.hpp>
+#include <irods/rsModAVUMetadata.hpp>
+#include <irods/scoped_privileged_client.hpp>
+
+#include <ctime>
+
+#include "access_frequency_sketch.hpp"
+#include "parameter_substitution.hpp"
+
+namespace
+{
+
+	// clang-format off
+    namespace pc   = irods::policy_composition;
+    namespace kw   = irods::policy_composition::keywords;
+    namespace pe   = irods::policy_composition::policy_engine;
+    namespace fs   = irods::experimental::filesystem;
+    using     json = nlohmann::json;
+	// clang-format on
+
+	const std::string promoted_attribute_prefix{"irods::promotion::promoted::"};
+
+	auto get_sketch_path(const json& _configuration) -> std::string
+	{
+		return pc::get_local_state_directory(_configuration, "access_frequency") + "/access.sketch";
+
+	} // get_sketch_path
+
+	auto replica_exists_on_resource(rsComm_t* _comm, const std::string& _logical_path, const std::string& _resource)
+		-> bool
+	{
+		fs::path path{_logical_path};
+
+		const auto query_str = fmt::format(
+			"SELECT DATA_REPL_NUM WHERE COLL_NAME = '{}' AND DATA_NAME = '{}' AND DATA_REPL_STATUS = '1' AND "
+			"DATA_RESC_ID IN ({})",
+			path.parent_path().string(),
+			path.object_name().string(),
+			pe::compute_leaf_bundle(_resource));
+
+		irods::query<rsComm_t> qobj{_comm, query_str};
+
+		return qobj.size() > 0;
+
+	} // replica_exists_on_resource
+
+	auto get_root_of_good_replica(rsComm_t* _comm, const std::string& _logical_path) -> std::string
+	{
+		fs::path path{_logical_path};
+
+		const auto query_str = fmt::format(
+			"SELECT DATA_RESC_HIER WHERE COLL_NAME = '{}' AND DATA_NAME = '{}' AND DATA_REPL_STATUS = '1'",
+			path.parent_path().string(),
+			path.object_name().string());
+
+		irods::query<rsComm_t> qobj{_comm, query_str};
+		if (qobj.size() == 0) {
+			return {};
+		}
+
+		return irods::hierarchy_parser{qobj.front()[0]}.first_resc();
+
+	} // get_root_of_good_replica
+
+	// the marker of a promotion is kept by the server, whether or not the client which caused the
+	// promotion may modify the metadata of the data object
+	auto modify_metadata(
+		rsComm_t* _comm,
+		const std::string& _operation,
+		const std::string& _logical_path,
+		const std::string& _attribute,
+		const std::string& _value) -> int
+	{
+		modAVUMetadataInp_t op{};
+		op.arg0 = const_cast<char*>(_operation.c_str());
+		op.arg1 = "-d";
+		op.arg2 = const_cast<char*>(_logical_path.c_str());
+		op.arg3 = const_cast<char*>(_attribute.c_str());
+		op.arg4 = const_cast<char*>(_value.c_str());
+
+		irods::experimental::scoped_privileged_client spc{*_comm};
+
+		return rsModAVUMetadata(_comm, &op);
+
+	} // modify_metadata
+
+	void invoke(const pe::context& ctx, const std::string& _policy, const json& _parameters, const json& _configuration)
+	{
+		std::string params{_parameters.dump()};
+		std::string config{_configuration.dump()};
+		std::string out{};
+
+		std::list<boost::any> args{};
+		args.push_back(boost::any(&params));
+		args.push_back(boost::any(&config));
+		args.push_back(boost::any(&out));
+
+		pc::invoke_policy(ctx.rei, _policy, args);
+
+	} // invoke
+
+	auto promote(
+		const pe::context& ctx,
+		const std::string& _user_name,
+		const std::string& _logical_path,
+		const std::string& _destination_resource) -> irods::error
+	{
+		auto comm = ctx.rei->rsComm;
+
+		const auto threshold = pc::get(ctx.configuration, "hotness_threshold", 10.0);
+
+		const auto hotness = [&] {
+			irods::shared_sketch sketch{get_sketch_path(ctx.configuration), std::nullopt};
+			return sketch.estimate(_logical_path);
+		}();
+
+		if (hotness < threshold || replica_exists_on_resource(comm, _logical_path, _destination_resource)) {
+			return SUCCESS();
+		}
+
+		const auto source_resource = get_root_of_good_replica(comm, _logical_path);
+		if (source_resource.empty()) {
+			return ERROR(SYS_REPLICA_DOES_NOT_EXIST, fmt::format("no good replica of [{}] to promote", _logical_path));
+		}
+
+		pe::client_message(
+			{{"0.message",
+			  fmt::format("{} promoting [{}] to [{}]", ctx.policy_name, _logical_path, _destination_resource)},
+		     {"1.hotness", hotness}});
+
+		invoke(
+			ctx,
+			"irods_policy_data_replication",
+			{{kw::user_name, _user_name},
+		     {kw::logical_path, _logical_path},
+		     {kw::source_resource, source_resource},
+		     {kw::destination_resource, _destination_resource}},
+			json::object());
+
+		const auto status = modify_metadata(
+			comm,
+			"set",
+			_logical_path,
+			promoted_attribute_prefix + _destination_resource,
+			fmt::format("{0:011}", std::time(nullptr)));
+		if (status < 0) {
+			return ERROR(status, fmt::format("failed to record promotion of [{}]", _logical_path));
+		}
+
+		return SUCCESS();
+
+	} // promote
+
+	// replicas which have cooled are trimmed from the destination resource by data_retention,
+	// after they have been resident for a minimum time
+	auto demote(const pe::context& ctx, const std::string& _user_name, const std::string& _destination_resource)
+		-> irods::error
+	{
+		auto comm = ctx.rei->rsComm;
+
+		// clang-format off
+        const auto cooling_threshold = pc::get(ctx.configuration, "cooling_threshold",            1.0);
+        const auto minimum_residency = pc::get(ctx.configuration, "minimum_residency_in_seconds", std::int64_t{3600});
+        const auto maximum_demotions = pc::get(ctx.configuration, "maximum_demotions",            std::uint32_t{1000});
+		// clang-format on
+
+		const auto attribute = promoted_attribute_prefix + _destination_resource;
+		const auto now = static_cast<std::int64_t>(std::time(nullptr));
+
+		const auto query_str = fmt::format(
+			"SELECT COLL_NAME, DATA_NAME, META_DATA_ATTR_VALUE WHERE META_DATA_ATTR_NAME = '{}'", attribute);
+
+		std::vector<std::string> resident{};
+		for (const auto& row : irods::query<rsComm_t>{comm, query_str}) {
+			try {
+				if (now - std::stoll(row[2]) >= minimum_residency) {
+					resident.push_back(fmt::format("{}/{}", row[0], row[1]));
+				}
+			}
+			catch (const std::exception&) {
+				rodsLog(
+					LOG_ERROR,
+					"invalid promotion time [%s] for [%s/%s]",
+					row[2].c_str(),
+					row[0].c_str(),
+					row[1].c_str());
+			}
+		}
+
+		// estimates are taken together so the sketch is not held while trimming
+		std::vector<std::string> cooled{};
+		{
+			irods::shared_sketch sketch{get_sketch_path(ctx.configuration), std::nullopt};
+			for (const auto& path : resident) {
+				if (cooled.size() < maximum_demotions && sketch.estimate(path) < cooling_threshold) {
+					cooled.push_back(path);
+				}
+			}
+		}
+
+		std::uint64_t demoted{}, retained{}, failed{};
+		for (const auto& path : cooled) {
+			try {
+				invoke(
+					ctx,
+					"irods_policy_data_retention",
+					{{kw::user_name, _user_name},
+				     {kw::logical_path, path},
+				     {kw::source_resource, _destination_resource}},
+					{{"mode", "trim_single_replica"}});
+			}
+			catch (const irods::exception& e) {
+				rodsLog(LOG_ERROR, "irods_policy_promotion - failed to demote [%s] [%s]", path.c_str(), e.what());
+				++failed;
+				continue;
+			}
+
+			// a trim forbidden by the whitelist or by preservation metadata succeeds without trimming,
+			// and the replica remains tracked until it is gone
+			if (replica_exists_on_resource(comm, path, _destination_resource)) {
+				++retained;
+				continue;
+			}
+
+			modify_metadata(comm, "rmw", path, attribute, "%");
+			++demoted;
+		}
+
+		pe::client_message(
+			{{"0.message", fmt::format("{} demoted from [{}]", ctx.policy_name, _destination_resource)},
+		     {"1.demoted", demoted},
+		     {"2.retained", retained},
+		     {"3.failed", failed}});
+
+		return SUCCESS();
+
+	} // demote
+
+	irods::error promotion_policy(const pe::context& ctx, pe::arg_type out)
+	{
+		auto comm = ctx.rei->rsComm;
+
+		auto [user_name, logical_path, source_resource, destination_resource] =
+			capture_parameters(ctx.parameters, tag_first_resc);
+
+		if (destination_resource.empty()) {
+			destination_resource = pc::get(ctx.configuration, "destination_resource", destination_resource);
+		}
+
+		if (user_name.empty()) {
+			user_name = comm->clientUser.userName;
+		}
+
+		const auto mode = pc::get(ctx.configuration, "mode", std::string{"promote"});
+
+		pe::client_message(
+			{{"0.usage", fmt::format("{} requires destination_resource, and logical_path to promote", ctx.policy_name)},
+		     {"1.user_name", user_name},
+		     {"2.logical_path", logical_path},
+		     {"3.destination_resource", destination_resource},
+		     {"4.mode", mode}});
+
+		if (destination_resource.empty()) {
+			return ERROR(SYS_INVALID_INPUT_PARAM, "irods_policy_promotion - empty destination_resource");
+		}
+
+		if ("demote" == mode) {
+			return demote(ctx, user_name, destination_resource);
+		}
+
+		if ("promote" != mode) {
+			return ERROR(SYS_INVALID_INPUT_PARAM, fmt::format("irods_policy_promotion - unknown mode [{}]", mode));
+		}
+
+		if (logical_path.empty()) {
+			return ERROR(SYS_INVALID_INPUT_PARAM, "irods_policy_promotion - empty logical_path");
+		}
+
+		return promote(ctx, user_name, logical_path, destination_resource);
+
+	} // promotion_policy
+
+} // namespace
+
+const char usage[] = R"(
+{
+    "id": "file:///var/lib/irods/configuration_schemas/v3/policy_engine_usage.json",
+    "$schema": "http://json-schema.org/draft-04/schema#",
+    "description": ""
+        "input_interfaces": [
+            {
+                "name" :  "event_handler-data_object_modified",
+                "description" : "",
+                "json_schema" : ""
+            },
+            {
+                "name" :  "direct_invocation",
+                "description" : "",
+                "json_schema" : ""
+            }
+        ],
+    "output_json_for_validation" : ""
+}
+)";
+
+extern "C" pe::plugin_pointer_type plugin_factory(const std::string& _plugin_name, const std::string&)
+{
+	return pe::make(_plugin_name, "irods_policy_promotion", usage, promotion_policy);
+
+} // plugin_factory
@@ -9,6 +9,14 @@
 #include <nlohmann/json.hpp>
 #include <fmt/format.h>
 
+#include <algorithm>
+#include <array>
+#include <functional>
+#include <mutex>
+#include <optional>
+#include <set>
+#include <tuple>
+
 #include "parameter_substitution.hpp"
 
 namespace
@@ -32,6 +40,137 @@ namespace
 		return j.at(k).get<T>();
 	} // get
 
+	const std::string last_verified_attribute_prefix{"irods::verification::last_verified::"};
+
+	using replica_key = std::tuple<std::string, std::string, std::string>;
+	using result_row = irods::query_processor<rsComm_t>::result_row;
+
+	// rows of the driving query are gathered into batches, and the replicas of a batch which were
+	// verified within the interval with an unchanged modify time are found by a single query bounded
+	// by the names within the batch.  genquery cannot select the replicas which lack an avu, so the
+	// interval may not be a condition of the driving query itself without losing those never verified
+	class reverify_filter
+	{
+	  public:
+		reverify_filter(
+			rsComm_t& _comm,
+			const time_t _interval,
+			const std::vector<std::size_t>& _indices,
+			const std::size_t _batch_size,
+			const std::function<void(const result_row&)>& _invoke)
+			: comm_{_comm}
+			, interval_{_interval}
+			, indices_{_indices}
+			, batch_size_{std::max<std::size_t>(1, _batch_size)}
+			, invoke_{_invoke}
+		{
+		} // ctor
+
+		void submit(const result_row& _results)
+		{
+			const auto complete =
+				std::all_of(indices_.begin(), indices_.end(), [&](const std::size_t i) { return i < _results.size(); });
+
+			if (!complete) {
+				invoke_(_results);
+				return;
+			}
+
+			std::vector<result_row> batch{};
+
+			{
+				std::lock_guard lock{mutex_};
+				pending_.push_back(_results);
+				if (pending_.size() < batch_size_) {
+					return;
+				}
+
+				batch.swap(pending_);
+			}
+
+			process(batch);
+
+		} // submit
+
+		void flush()
+		{
+			std::vector<result_row> batch{};
+
+			{
+				std::lock_guard lock{mutex_};
+				batch.swap(pending_);
+			}
+
+			process(batch);
+
+		} // flush
+
+	  private:
+		auto key(const result_row& _results) const -> replica_key
+		{
+			return {_results[indices_[0]], _results[indices_[1]], _results[indices_[2]]};
+
+		} // key
+
+		void process(const std::vector<result_row>& _batch)
+		{
+			if (_batch.empty()) {
+				return;
+			}
+
+			std::array<std::set<std::string>, 3> names{};
+			for (const auto& r : _batch) {
+				for (std::size_t i = 0; i < names.size(); ++i) {
+					names[i].insert(r[indices_[i]]);
+				}
+			}
+
+			auto in_list = [](const std::set<std::string>& _values) {
+				std::string list{};
+				for (const auto& v : _values) {
+					list += fmt::format("{}'{}'", list.empty() ? "" : ", ", v);
+				}
+
+				return list;
+			};
+
+			const auto query_str = fmt::format(
+				"SELECT COLL_NAME, DATA_NAME, RESC_NAME, META_DATA_ATTR_NAME, META_DATA_ATTR_UNITS, DATA_MODIFY_TIME"
+				" WHERE META_DATA_ATTR_NAME like '{}%' AND META_DATA_ATTR_VALUE >= '{:011}'"
+				" AND COLL_NAME IN ({}) AND DATA_NAME IN ({}) AND RESC_NAME IN ({})",
+				last_verified_attribute_prefix,
+				std::time(nullptr) - interval_,
+				in_list(names[0]),
+				in_list(names[1]),
+				in_list(names[2]));
+
+			// the names of the batch may combine into replicas outside of it, which are ignored
+			std::set<replica_key> verified{};
+			for (const auto& row : irods::query<rsComm_t>{&comm_, query_str}) {
+				if (row[3] == last_verified_attribute_prefix + row[2] && row[4] == row[5]) {
+					verified.emplace(row[0], row[1], row[2]);
+				}
+			}
+
+			for (const auto& r : _batch) {
+				if (verified.count(key(r)) == 0) {
+					invoke_(r);
+				}
+			}
+
+		} // process
+
+		rsComm_t& comm_;
+		const time_t interval_;
+		const std::vector<std::size_t> indices_;
+		const std::size_t batch_size_;
+		const std::function<void(const result_row&)> invoke_;
+
+		std::mutex mutex_{};
+		std::vector<result_row> pending_{};
+
+	}; // class reverify_filter
+
 	irods::error query_processor_policy(const pe::context& ctx, pe::arg_type out)
 	{
 		try {
@@ -46,6 +185,9 @@ namespace
             auto query_string       = pc::get(params, "query_string",       std::string{});
             auto policies_to_invoke = pc::get(params, "policies_to_invoke", json{});
             auto stop_on_error      = pc::get(params, "stop_on_error",      std::string{}) == "true";
+            auto reverify_interval  = pc::get(params, "min_reverify_interval",   time_t{0});
+            auto reverify_indices   = pc::get(params, "reverify_result_indices", std::vector<std::size_t>{1, 2, 3});
+            auto reverify_batch     = pc::get(params, "reverify_batch_size",     std::size_t{64});
 			// clang-format on
 
 			pe::client_message(
@@ -55,7 +197,8 @@ namespace
 			     {"3.query_type", query_type_string},
 			     {"4.query_string", query_string},
 			     {"5.policies_to_invoke", policies_to_invoke.dump(4)},
-			     {"6.stop_on_error", stop_on_error}});
+			     {"6.stop_on_error", stop_on_error},
+			     {"7.min_reverify_interval", reverify_interval}});
 
 			if (query_string.empty()) {
 				return ERROR(SYS_INVALID_INPUT_PARAM, "irods_policy_query_processor - empty query string");
@@ -124,7 +267,6 @@ namespace
 			pe::client_message({{"0.message", fmt::format("{} query_string {}", ctx.policy_name, query_string)}});
 
 			using json = nlohmann::json;
-			using result_row = irods::query_processor<rsComm_t>::result_row;
 
 			json params_to_pass{};
 			if (ctx.parameters.contains(kw::parameters)) {
@@ -137,7 +279,14 @@ namespace
 			pe::client_message(
 				{{"0.message", fmt::format("{} params_to_pass {}", ctx.policy_name, params_to_pass.dump(4))}});
 
-			auto job = [&](const result_row& _results) {
+			if (reverify_interval > 0 && reverify_indices.size() != 3) {
+				return ERROR(
+					SYS_INVALID_INPUT_PARAM,
+					"irods_policy_query_processor - reverify_result_indices requires collection, data, and resource "
+					"indices");
+			}
+
+			auto invoke_policies = [&](const result_row& _results) {
 				// capture the row of results from the query
 				auto res_arr = json::array();
 
@@ -165,6 +314,11 @@ namespace
 						cfg = ctx.parameters.at(kw::configuration);
 					}
 
+					// policies which record their verification only do so when it may be skipped
+					if (reverify_interval > 0 && !cfg.contains("min_reverify_interval")) {
+						cfg["min_reverify_interval"] = reverify_interval;
+					}
+
 					// inject query results into parameters
 					pam["query_results"] = res_arr;
 
@@ -187,6 +341,20 @@ namespace
 					}
 
 				} // for policy
+			}; // invoke_policies
+
+			std::optional<reverify_filter> filter{};
+			if (reverify_interval > 0) {
+				filter.emplace(comm, reverify_interval, reverify_indices, reverify_batch, invoke_policies);
+			}
+
+			auto job = [&](const result_row& _results) {
+				if (filter) {
+					filter->submit(_results);
+				}
+				else {
+					invoke_policies(_results);
+				}
 			}; // job
 
 			auto query_type = irods::query<rsComm_t>::convert_string_to_query_type(query_type_string);
@@ -196,6 +364,11 @@ namespace
 			auto f = qp.execute(tp, *ctx.rei->rsComm);
 			auto errors = f.get();
 
+			// rows which remain short of a full batch
+			if (filter) {
+				filter->flush();
+			}
+
 			if (errors.size() > 0) {
 				for (auto& e : errors) {
 					rodsLog(LOG_ERROR, "query failed [%d]::[%s]", std::get<0>(e), std::get<1>(e).c_str());
@@ -219,6 +392,10 @@ namespace
 
 					job(res);
 				}
+
+				if (filter) {
+					filter->flush();
+				}
 			}
 		}
 		catch (const irods::exception& e) {
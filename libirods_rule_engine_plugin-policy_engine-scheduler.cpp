@@ -0,0 +1,576 @@
+#include <irods/policy_composition_framework_policy_engine.hpp>
+#include <irods/policy_composition_framework_configuration_manager.hpp>
+
+#include <irods/client_connection.hpp>
+#include <irods/execMyRule.h>
+#include <irods/irods_configuration_keywords.hpp>
+#include <irods/msParam.h>
+#include <irods/rcMisc.h>
+
+#include <sys/file.h>
+#include <errno.h>
+#include <fcntl.h>
+#include <unistd.h>
+
+#include <atomic>
+#include <bitset>
+#include <chrono>
+#include <condition_variable>
+#include <ctime>
+#include <filesystem>
+#include <fstream>
+#include <memory>
+#include <mutex>
+#include <optional>
+#include <sstream>
+#include <thread>
+
+namespace
+{
+
+	// clang-format off
+    namespace pc   = irods::policy_composition;
+    namespace kw   = irods::policy_composition::keywords;
+    namespace pe   = irods::policy_composition::policy_engine;
+    using     json = nlohmann::json;
+	// clang-format on
+
+	auto now_in_milliseconds() -> std::int64_t
+	{
+		using namespace std::chrono;
+		return duration_cast<milliseconds>(system_clock::now().time_since_epoch()).count();
+
+	} // now_in_milliseconds
+
+	// a five field cron expression, minute hour day month weekday, evaluated in local time.  each
+	// field is a list of values, ranges and steps such as 0,30 or 1-5 or */15
+	class cron_schedule
+	{
+	  public:
+		explicit cron_schedule(const std::string& _expression)
+		{
+			std::istringstream in{_expression};
+			std::vector<std::string> fields{};
+			for (std::string f; in >> f;) {
+				fields.push_back(f);
+			}
+
+			if (5 != fields.size()) {
+				THROW(SYS_INVALID_INPUT_PARAM, fmt::format("cron expression [{}] requires five fields", _expression));
+			}
+
+			// clang-format off
+            minutes_  = parse(fields[0], 0, 59);
+            hours_    = parse(fields[1], 0, 23);
+            days_     = parse(fields[2], 1, 31);
+            months_   = parse(fields[3], 1, 12);
+            weekdays_ = parse(fields[4], 0, 7);
+			// clang-format on
+
+			// sunday is either 0 or 7
+			if (weekdays_[7]) {
+				weekdays_[0] = true;
+			}
+
+			any_day_ = "*" == fields[2];
+			any_weekday_ = "*" == fields[4];
+
+		} // ctor
+
+		// the first whole minute strictly after the given time which matches the expression
+		auto next_after(const std::time_t _time) const -> std::time_t
+		{
+			constexpr std::time_t horizon = 366 * 24 * 60 * 60;
+
+			auto t = (_time / 60 + 1) * 60;
+			while (t - _time <= horizon) {
+				std::tm tm{};
+				localtime_r(&t, &tm);
+
+				if (!months_[tm.tm_mon + 1] || !matches_day(tm)) {
+					t += (24 - tm.tm_hour) * 3600 - tm.tm_min * 60;
+					continue;
+				}
+
+				if (!hours_[tm.tm_hour]) {
+					t += (60 - tm.tm_min) * 60;
+					continue;
+				}
+
+				if (!minutes_[tm.tm_min]) {
+					t += 60;
+					continue;
+				}
+
+				return t;
+			}
+
+			THROW(SYS_INVALID_INPUT_PARAM, "cron expression never matches");
+
+		} // next_after
+
+	  private:
+		static auto parse(const std::string& _field, const int _minimum, const int _maximum) -> std::bitset<60>
+		{
+			std::bitset<60> bits{};
+
+			std::istringstream in{_field};
+			for (std::string part; std::getline(in, part, ',');) {
+				auto step = 1;
+				if (const auto slash = part.find('/'); slash != std::string::npos) {
+					step = std::stoi(part.substr(slash + 1));
+					part = part.substr(0, slash);
+				}
+
+				auto first = _minimum, last = _maximum;
+				if ("*" != part) {
+					const auto dash = part.find('-');
+					first = std::stoi(part.substr(0, dash));
+					last = dash == std::string::npos ? first : std::stoi(part.substr(dash + 1));
+				}
+
+				if (step < 1 || first < _minimum || last > _maximum || first > last) {
+					THROW(SYS_INVALID_INPUT_PARAM, fmt::format("invalid cron field [{}]", _field));
+				}
+
+				for (auto v = first; v <= last; v += step) {
+					bits[v] = true;
+				}
+			}
+
+			return bits;
+
+		} // parse
+
+		// as with cron, a restricted day and weekday match should either match
+		auto matches_day(const std::tm& _tm) const -> bool
+		{
+			const auto day = days_[_tm.tm_mday];
+			const auto weekday = weekdays_[_tm.tm_wday];
+
+			if (any_day_ || any_weekday_) {
+				return day && weekday;
+			}
+
+			return day || weekday;
+
+		} // matches_day
+
+		std::bitset<60> minutes_, hours_, days_, months_, weekdays_;
+		bool any_day_{}, any_weekday_{};
+
+	}; // class cron_schedule
+
+	struct job
+	{
+		std::string name;
+		std::string policy_to_invoke;
+		json parameters;
+		json configuration;
+
+		std::int64_t interval{};
+		std::optional<cron_schedule> cron;
+		std::int64_t offset{};
+		bool catch_up{};
+
+		std::time_t next_run{};
+		std::atomic<bool> running{};
+
+		// the record of runs, guarded by the mutex of the scheduler
+		json record{json::object()};
+	};
+
+	// the state which running jobs share with the scheduler.  jobs are not waited for as the
+	// scheduler stops, so the state outlives it until the last running job ends, and the leader
+	// lock is held until then so that no other process starts the same jobs meanwhile
+	struct scheduler_state
+	{
+		std::string directory;
+		std::string instance;
+		std::mutex mutex;
+		int leader_fd{-1};
+
+		~scheduler_state()
+		{
+			if (leader_fd >= 0) {
+				flock(leader_fd, LOCK_UN);
+				close(leader_fd);
+			}
+		}
+	};
+
+	// runs the configured jobs from a timer thread.  the thread is started only within the long
+	// lived process named by the configuration, the delay server by default, and only while that
+	// process holds the leader lock, so jobs run once per server
+	class scheduler
+	{
+	  public:
+		explicit scheduler(const json& _configuration)
+			: state_{std::make_shared<scheduler_state>()}
+			, owner_{getpid()}
+		{
+			// clang-format off
+            tick_            = std::chrono::milliseconds{pc::get(_configuration, "tick_interval_in_milliseconds", std::int64_t{1000})};
+            state_->instance = pc::get(_configuration, "rule_engine_instance", std::string{"irods_rule_engine_plugin-cpp_default_policy-instance"});
+			// clang-format on
+
+			state_->directory = pc::get_local_state_directory(_configuration, "scheduler");
+
+			for (const auto& j : _configuration.at("jobs")) {
+				jobs_.push_back(make_job(j));
+			}
+
+			thread_ = std::thread{[this] { run(); }};
+
+		} // ctor
+
+		scheduler(const scheduler&) = delete;
+		scheduler& operator=(const scheduler&) = delete;
+
+		~scheduler()
+		{
+			stop();
+
+		} // dtor
+
+		// the timer is stopped without waiting for running jobs, which finish in the background
+		// should the process outlive the scheduler
+		void stop()
+		{
+			{
+				std::lock_guard lock{state_->mutex};
+				if (stopping_) {
+					return;
+				}
+
+				stopping_ = true;
+			}
+
+			wake_.notify_all();
+			thread_.join();
+
+		} // stop
+
+		// a process forked from the owner inherits the scheduler but not its threads
+		auto owned_by_this_process() const -> bool
+		{
+			return getpid() == owner_;
+
+		} // owned_by_this_process
+
+		// the records of every job, as last written by the leader
+		static auto report(const json& _configuration) -> json
+		{
+			const auto directory = pc::get_local_state_directory(_configuration, "scheduler");
+
+			auto jobs = json::array();
+			for (const auto& j : _configuration.value("jobs", json::array())) {
+				const auto name = j.at("name").get<std::string>();
+
+				std::ifstream in{record_path(directory, name)};
+				auto record = json::parse(in, nullptr, false);
+				if (record.is_discarded()) {
+					record = json::object();
+				}
+
+				record["name"] = name;
+				jobs.push_back(record);
+			}
+
+			return jobs;
+
+		} // report
+
+	  private:
+		static auto record_path(const std::string& _directory, const std::string& _name) -> std::string
+		{
+			return fmt::format("{}/{}.json", _directory, _name);
+
+		} // record_path
+
+		static auto make_job(const json& _job) -> std::shared_ptr<job>
+		{
+			auto j = std::make_shared<job>();
+
+			// clang-format off
+            j->name             = _job.at("name").get<std::string>();
+            j->policy_to_invoke = _job.at(kw::policy_to_invoke).get<std::string>();
+            j->parameters       = _job.value(kw::parameters,    json::object());
+            j->configuration    = _job.value(kw::configuration, json::object());
+            j->catch_up         = _job.value("catch_up",        false);
+			// clang-format on
+
+			if (_job.contains("cron")) {
+				j->cron.emplace(_job.at("cron").get<std::string>());
+			}
+			else {
+				j->interval = _job.at("interval_in_seconds").get<std::int64_t>();
+				if (j->interval < 1) {
+					THROW(SYS_INVALID_INPUT_PARAM, fmt::format("job [{}] requires a positive interval", j->name));
+				}
+			}
+
+			// the jitter of a job is fixed by its name, so that jobs with the same schedule are spread
+			// apart while each job keeps a steady period
+			const auto jitter = _job.value("jitter_in_seconds", std::int64_t{0});
+			if (jitter > 0) {
+				j->offset = static_cast<std::int64_t>(std::hash<std::string>{}(j->name) % (jitter + 1));
+			}
+
+			return j;
+
+		} // make_job
+
+		// runs are aligned to the schedule rather than to the end of the previous run, so the period
+		// of a job does not drift with the time taken to run it or the tick of the timer
+		static auto next_after(const job& _job, const std::time_t _time) -> std::time_t
+		{
+			if (_job.cron) {
+				return _job.cron->next_after(_time - _job.offset) + _job.offset;
+			}
+
+			return ((_time - _job.offset) / _job.interval + 1) * _job.interval + _job.offset;
+
+		} // next_after
+
+		auto try_lead() -> bool
+		{
+			auto& fd = state_->leader_fd;
+			if (fd < 0) {
+				fd = open((state_->directory + "/leader.lock").c_str(), O_RDWR | O_CREAT, 0600);
+				if (fd < 0) {
+					return false;
+				}
+			}
+
+			if (0 != flock(fd, LOCK_EX | LOCK_NB)) {
+				return false;
+			}
+
+			// a new leader resumes the schedule from the runs recorded by the previous leader
+			const auto now = std::time(nullptr);
+			std::lock_guard lock{state_->mutex};
+			for (auto& j : jobs_) {
+				std::ifstream in{record_path(state_->directory, j->name)};
+				auto record = json::parse(in, nullptr, false);
+				if (!record.is_discarded() && record.is_object()) {
+					j->record = record;
+				}
+
+				const auto last = j->record.value("last_scheduled", std::int64_t{0});
+				j->next_run = last > 0 ? next_after(*j, last) : next_after(*j, now);
+			}
+
+			return true;
+
+		} // try_lead
+
+		static void write_record(const scheduler_state& _state, const job& _job)
+		{
+			const auto path = record_path(_state.directory, _job.name);
+			const auto tmp = fmt::format("{}.{}", path, getpid());
+
+			{
+				std::ofstream out{tmp, std::ios::trunc};
+				out << _job.record.dump(4);
+			}
+
+			std::error_code ec{};
+			std::filesystem::rename(tmp, path, ec);
+
+		} // write_record
+
+		void run()
+		{
+			auto leader = false;
+
+			std::unique_lock lock{state_->mutex};
+			while (!stopping_) {
+				wake_.wait_for(lock, tick_, [this] { return stopping_; });
+				if (stopping_) {
+					break;
+				}
+
+				if (!leader) {
+					lock.unlock();
+					leader = try_lead();
+					lock.lock();
+					if (!leader) {
+						continue;
+					}
+				}
+
+				const auto now = std::time(nullptr);
+				for (auto& j : jobs_) {
+					if (now < j->next_run) {
+						continue;
+					}
+
+					const auto scheduled = j->next_run;
+
+					// runs missed while no process led, or while the job ran long, are skipped
+					// unless the job catches up on them one at a time
+					auto following = next_after(*j, scheduled);
+					if (!j->catch_up) {
+						std::int64_t skipped{};
+						for (; following <= now; following = next_after(*j, following)) {
+							++skipped;
+						}
+
+						j->record["skipped"] = j->record.value("skipped", std::int64_t{0}) + skipped;
+					}
+
+					j->next_run = following;
+					j->record["next_run"] = following;
+
+					// a run never overlaps the previous run of the same job
+					if (j->running) {
+						j->record["overlaps_prevented"] = j->record.value("overlaps_prevented", std::int64_t{0}) + 1;
+						write_record(*state_, *j);
+						continue;
+					}
+
+					j->record["last_scheduled"] = scheduled;
+					j->running = true;
+					std::thread{[state = state_, job = j] { execute(*state, *job); }}.detach();
+				}
+			}
+
+		} // run
+
+		static void execute(scheduler_state& _state, job& _job)
+		{
+			const auto start = now_in_milliseconds();
+
+			std::string error{};
+			try {
+				invoke(_state, _job);
+			}
+			catch (const irods::exception& _e) {
+				error = _e.what();
+				rodsLog(LOG_ERROR, "irods_policy_scheduler - job [%s] failed [%s]", _job.name.c_str(), _e.what());
+			}
+
+			const auto end = now_in_milliseconds();
+
+			{
+				std::lock_guard lock{_state.mutex};
+
+				auto& r = _job.record;
+				r["last_start"] = start / 1000;
+				r["last_end"] = end / 1000;
+				r["last_duration_in_milliseconds"] = end - start;
+				r["last_status"] = error.empty() ? "success" : "failure";
+				r["last_error"] = error;
+				r["runs"] = r.value("runs", std::int64_t{0}) + 1;
+				r["failures"] = r.value("failures", std::int64_t{0}) + (error.empty() ? 0 : 1);
+
+				write_record(_state, _job);
+			}
+
+			_job.running = false;
+
+		} // execute
+
+		static void invoke(const scheduler_state& _state, const job& _job)
+		{
+			const json rule{
+				{kw::policy_to_invoke, _job.policy_to_invoke},
+				{kw::parameters, _job.parameters},
+				{kw::configuration, _job.configuration}};
+
+			const auto text = fmt::format("@external rule {{ {} }}", rule.dump());
+			if (text.size() >= META_STR_LEN) {
+				THROW(SYS_INVALID_INPUT_PARAM, fmt::format("rule text for job [{}] is too long", _job.name));
+			}
+
+			irods::experimental::client_connection connection{};
+
+			execMyRuleInp_t inp{};
+			rstrcpy(inp.myRule, text.c_str(), sizeof(inp.myRule));
+			rstrcpy(inp.outParamDesc, "ruleExecOut", sizeof(inp.outParamDesc));
+			addKeyVal(&inp.condInput, irods::KW_CFG_INSTANCE_NAME.c_str(), _state.instance.c_str());
+
+			msParamArray_t* out{};
+			rcComm_t& comm = connection;
+			const auto status = rcExecMyRule(&comm, &inp, &out);
+
+			clearKeyVal(&inp.condInput);
+			if (out) {
+				clearMsParamArray(out, 1);
+				free(out);
+			}
+
+			if (status < 0) {
+				THROW(status, fmt::format("failed to invoke [{}]", _job.policy_to_invoke));
+			}
+
+		} // invoke
+
+		std::shared_ptr<scheduler_state> state_{};
+		const pid_t owner_{};
+		std::chrono::milliseconds tick_{};
+		std::vector<std::shared_ptr<job>> jobs_{};
+
+		std::condition_variable wake_{};
+		bool stopping_{};
+		std::thread thread_{};
+
+	}; // class scheduler
+
+	std::unique_ptr<scheduler> timer{};
+
+	irods::error scheduler_policy(const pe::context& ctx, pe::arg_type out)
+	{
+		const auto jobs = scheduler::report(ctx.configuration);
+
+		pe::client_message({{"0.message", fmt::format("{} jobs", ctx.policy_name)}, {"1.jobs", jobs}});
+
+		*out = jobs.dump();
+
+		return SUCCESS();
+
+	} // scheduler_policy
+
+} // namespace
+
+const char usage[] = R"(
+{
+    "id": "file:///var/lib/irods/configuration_schemas/v3/policy_engine_usage.json",
+    "$schema": "http://json-schema.org/draft-04/schema#",
+    "description": ""
+        "input_interfaces": [
+            {
+                "name" :  "direct_invocation",
+                "description" : "",
+                "json_schema" : ""
+            }
+        ],
+    "output_json_for_validation" : ""
+}
+)";
+
+extern "C" pe::plugin_pointer_type plugin_factory(const std::string& _plugin_name, const std::string&)
+{
+	// the timer runs only within a single long lived process, never within the agents which serve
+	// clients or the connections through which jobs are invoked
+	pe::register_start_hook([] {
+		const auto process = pc::get(pe::plugin_config, "timer_process", std::string{"irodsDelayServer"});
+		if (pe::plugin_config.contains("jobs") && !timer && process == program_invocation_short_name) {
+			timer = std::make_unique<scheduler>(pe::plugin_config);
+		}
+	});
+
+	pe::register_stop_hook([] {
+		if (timer && !timer->owned_by_this_process()) {
+			// the threads of the scheduler belong to the process from which this one was forked
+			static_cast<void>(timer.release());
+			return;
+		}
+
+		timer.reset();
+	});
+
+	return pe::make(_plugin_name, "irods_policy_scheduler", usage, scheduler_policy);
+
+} // plugin_factory
@@ -0,0 +1,547 @@
+#include <irods/policy_composition_framework_policy_engine.hpp>
+#include <irods/policy_composition_framework_parameter_capture.hpp>
+#include <irods/policy_composition_framework_configuration_manager.hpp>
+
+#include <irods/irods_server_api_call.hpp>
+#include <irods/apiNumber.h>
+#include <irods/rsFileStat.hpp>
+#include <irods/rsModAVUMetadata.hpp>
+#include <irods/rcMisc.h>
+
+#include <algorithm>
+#include <chrono>
+#include <thread>
+
+#include "data_verification_utilities.hpp"
+#include "parameter_substitution.hpp"
+
+namespace
+{
+
+	// clang-format off
+    namespace pc   = irods::policy_composition;
+    namespace pe   = irods::policy_composition::policy_engine;
+    using     json = nlohmann::json;
+    using     clock_type = std::chrono::steady_clock;
+	// clang-format on
+
+	const std::string cursor_attribute{"irods::scrubber::cursor"};
+	const std::string last_pass_attribute{"irods::scrubber::last_pass_completed"};
+	const std::string retry_attribute{"irods::scrubber::retry"};
+	const std::string failed_attribute_prefix{"irods::scrubber::verification_failed::"};
+
+	// a token bucket holding at most one second of budget, the balance may
+	// go negative in which case the debt is repaid by sleeping
+	class io_budget
+	{
+	  public:
+		io_budget(const double _bytes_per_second, const double _operations_per_second)
+			: bytes_per_second_{_bytes_per_second}
+			, operations_per_second_{_operations_per_second}
+			, bytes_{_bytes_per_second}
+			, operations_{_operations_per_second}
+			, last_refill_{clock_type::now()}
+		{
+		}
+
+		void consume(const double _bytes, const double _operations)
+		{
+			refill();
+
+			double wait_in_seconds{};
+
+			if (bytes_per_second_ > 0) {
+				bytes_ -= _bytes;
+				if (bytes_ < 0) {
+					wait_in_seconds = std::max(wait_in_seconds, -bytes_ / bytes_per_second_);
+				}
+			}
+
+			if (operations_per_second_ > 0) {
+				operations_ -= _operations;
+				if (operations_ < 0) {
+					wait_in_seconds = std::max(wait_in_seconds, -operations_ / operations_per_second_);
+				}
+			}
+
+			if (wait_in_seconds > 0) {
+				std::this_thread::sleep_for(std::chrono::duration<double>(wait_in_seconds));
+			}
+
+		} // consume
+
+	  private:
+		void refill()
+		{
+			const auto now = clock_type::now();
+			const auto elapsed = std::chrono::duration<double>(now - last_refill_).count();
+			last_refill_ = now;
+
+			bytes_ = std::min(bytes_per_second_, bytes_ + elapsed * bytes_per_second_);
+			operations_ = std::min(operations_per_second_, operations_ + elapsed * operations_per_second_);
+
+		} // refill
+
+		const double bytes_per_second_;
+		const double operations_per_second_;
+		double bytes_;
+		double operations_;
+		clock_type::time_point last_refill_;
+
+	}; // class io_budget
+
+	auto probe_latency_in_milliseconds(
+		rsComm_t* _comm,
+		const std::string& _logical_path,
+		const std::string& _resource_hierarchy,
+		const std::string& _file_path) -> double
+	{
+		fileStatInp_t stat_inp{};
+		rstrcpy(stat_inp.objPath, _logical_path.c_str(), sizeof(stat_inp.objPath));
+		rstrcpy(stat_inp.rescHier, _resource_hierarchy.c_str(), sizeof(stat_inp.rescHier));
+		rstrcpy(stat_inp.fileName, _file_path.c_str(), sizeof(stat_inp.fileName));
+
+		const auto start = clock_type::now();
+
+		rodsStat_t* stat_out{};
+		irods::server_api_call(FILE_STAT_AN, _comm, &stat_inp, &stat_out);
+		free(stat_out);
+
+		return std::chrono::duration<double, std::milli>(clock_type::now() - start).count();
+
+	} // probe_latency_in_milliseconds
+
+	auto set_metadata(
+		rsComm_t* _comm,
+		const std::string& _option,
+		const std::string& _target,
+		const std::string& _attribute,
+		const std::string& _value) -> int
+	{
+		modAVUMetadataInp_t set_op{};
+		set_op.arg0 = "set";
+		set_op.arg1 = const_cast<char*>(_option.c_str());
+		set_op.arg2 = const_cast<char*>(_target.c_str());
+		set_op.arg3 = const_cast<char*>(_attribute.c_str());
+		set_op.arg4 = const_cast<char*>(_value.c_str());
+
+		return rsModAVUMetadata(_comm, &set_op);
+
+	} // set_metadata
+
+	auto remove_metadata(
+		rsComm_t* _comm,
+		const std::string& _option,
+		const std::string& _target,
+		const std::string& _attribute,
+		const std::string& _value) -> int
+	{
+		modAVUMetadataInp_t rm_op{};
+		rm_op.arg0 = "rm";
+		rm_op.arg1 = const_cast<char*>(_option.c_str());
+		rm_op.arg2 = const_cast<char*>(_target.c_str());
+		rm_op.arg3 = const_cast<char*>(_attribute.c_str());
+		rm_op.arg4 = const_cast<char*>(_value.c_str());
+
+		return rsModAVUMetadata(_comm, &rm_op);
+
+	} // remove_metadata
+
+	irods::error scrubber_policy(const pe::context& ctx, pe::arg_type out)
+	{
+		auto comm = ctx.rei->rsComm;
+
+		auto [user_name, logical_path, source_resource, destination_resource] =
+			capture_parameters(ctx.parameters, tag_first_resc);
+
+		if (source_resource.empty()) {
+			source_resource = pc::get(ctx.configuration, "source_resource", source_resource);
+		}
+
+		// clang-format off
+        const auto type                    = pc::get(ctx.configuration, "verification_type",                 std::string{"checksum"});
+        const auto bytes_per_second        = pc::get(ctx.configuration, "bytes_per_second",                  double{0});
+        const auto operations_per_second   = pc::get(ctx.configuration, "operations_per_second",             double{0});
+        const auto time_slice              = pc::get(ctx.configuration, "time_slice_in_seconds",             std::int64_t{60});
+        const auto page_size               = pc::get(ctx.configuration, "page_size",                         std::uint32_t{256});
+        const auto latency_threshold       = pc::get(ctx.configuration, "latency_threshold_in_milliseconds", double{0});
+        const auto latency_weight          = pc::get(ctx.configuration, "latency_weight",                    double{0.2});
+        const auto yield_duration          = pc::get(ctx.configuration, "yield_duration_in_milliseconds",    std::int64_t{1000});
+        const auto maximum_errors          = pc::get(ctx.configuration, "maximum_consecutive_errors",        std::uint32_t{3});
+        const auto maximum_retries         = pc::get(ctx.configuration, "maximum_retries",                   std::uint32_t{64});
+		// clang-format on
+
+		irods::sampling_configuration sampling{};
+
+		// clang-format off
+        sampling.sample_fraction           = pc::get(ctx.configuration, "sample_fraction",           sampling.sample_fraction);
+        sampling.number_of_ranges          = pc::get(ctx.configuration, "number_of_ranges",          sampling.number_of_ranges);
+        sampling.cycle_duration_in_seconds = pc::get(ctx.configuration, "cycle_duration_in_seconds", sampling.cycle_duration_in_seconds);
+		// clang-format on
+
+		pe::client_message(
+			{{"0.usage", fmt::format("{} requires source_resource", ctx.policy_name)},
+		     {"1.source_resource", source_resource},
+		     {"2.verification_type", type},
+		     {"3.bytes_per_second", bytes_per_second},
+		     {"4.operations_per_second", operations_per_second},
+		     {"5.time_slice_in_seconds", time_slice}});
+
+		if (source_resource.empty()) {
+			return ERROR(SYS_INVALID_INPUT_PARAM, "irods_policy_scrubber - empty source_resource");
+		}
+
+		const auto leaf_bundle = pe::compute_leaf_bundle(source_resource);
+		if (leaf_bundle.empty()) {
+			return ERROR(
+				SYS_INVALID_INPUT_PARAM,
+				fmt::format("irods_policy_scrubber - no leaf resources for [{}]", source_resource));
+		}
+
+		// the cursor takes the form <data id>:<replica number> of the last replica visited
+		auto [cursor, cursor_units] = get_metadata_for_resource(comm, cursor_attribute, source_resource);
+		if (cursor.empty()) {
+			cursor = "0";
+		}
+
+		const auto separator = cursor.find(':');
+		auto cursor_id = cursor.substr(0, separator);
+		auto cursor_replica = std::string::npos == separator ? std::string{} : cursor.substr(separator + 1);
+
+		// replicas which errored in an earlier slice are held as a comma separated list of
+		// <data id>:<replica number>, and are retried before the slice resumes from the cursor
+		const auto [saved_retries, retry_units] = get_metadata_for_resource(comm, retry_attribute, source_resource);
+
+		std::vector<std::string> retries{};
+		for (std::string::size_type begin{}; begin < saved_retries.size();) {
+			const auto end = std::min(saved_retries.find(',', begin), saved_retries.size());
+			if (end > begin) {
+				retries.push_back(saved_retries.substr(begin, end - begin));
+			}
+			begin = end + 1;
+		}
+
+		// the replicas which are to be retried by the next slice
+		std::vector<std::string> pending_retries{};
+		auto retries_value = saved_retries;
+
+		const auto deadline = clock_type::now() + std::chrono::seconds(time_slice);
+
+		io_budget budget{bytes_per_second, operations_per_second};
+
+		double latency{};
+		std::uint64_t verified{}, failed{}, unverified{}, errors{}, yields{};
+		std::uint32_t consecutive_errors{};
+		bool pass_completed{};
+
+		const auto log_errors = pe::get_log_errors_flag(ctx.parameters, ctx.configuration);
+
+		auto save_retries = [&] {
+			std::string value{};
+			for (const auto& r : pending_retries) {
+				value += value.empty() ? r : "," + r;
+			}
+
+			if (value == retries_value) {
+				return;
+			}
+
+			const auto ec = value.empty() ? remove_metadata(comm, "-R", source_resource, retry_attribute, retries_value)
+			                              : set_metadata(comm, "-R", source_resource, retry_attribute, value);
+			if (ec < 0) {
+				rodsLog(
+					LOG_ERROR,
+					"irods_policy_scrubber - failed to save replicas to retry for [%s] [%d]",
+					source_resource.c_str(),
+					ec);
+				return;
+			}
+
+			retries_value = value;
+		};
+
+		// the replicas to retry are saved first, so that none is lost should the cursor have passed it
+		auto save_cursor = [&] {
+			save_retries();
+
+			if (const auto ec = set_metadata(comm, "-R", source_resource, cursor_attribute, cursor); ec < 0) {
+				rodsLog(
+					LOG_ERROR,
+					"irods_policy_scrubber - failed to save cursor for [%s] [%d]",
+					source_resource.c_str(),
+					ec);
+			}
+		};
+
+		// wait for the foreground latency to settle, returns false should the time slice be exhausted
+		auto yield_to_foreground = [&](const std::string& _path, const std::string& _hier, const std::string& _file) {
+			if (latency_threshold <= 0) {
+				return true;
+			}
+
+			while (clock_type::now() < deadline) {
+				const auto sample = probe_latency_in_milliseconds(comm, _path, _hier, _file);
+				latency = (0 == latency) ? sample : latency_weight * sample + (1 - latency_weight) * latency;
+
+				if (latency <= latency_threshold) {
+					return true;
+				}
+
+				++yields;
+				std::this_thread::sleep_for(std::chrono::milliseconds(yield_duration));
+			}
+
+			return false;
+		};
+
+		const std::string columns{
+			"SELECT ORDER(DATA_ID), ORDER(DATA_REPL_NUM), COLL_NAME, DATA_NAME, DATA_SIZE, RESC_NAME, "
+			"DATA_RESC_HIER, DATA_PATH"};
+
+		auto fetch_page = [&] {
+			std::vector<std::vector<std::string>> page{};
+
+			// the remaining replicas of the data object at the cursor precede those of later data objects
+			if (!cursor_replica.empty()) {
+				const auto query_str = fmt::format(
+					"{} WHERE DATA_RESC_ID IN ({}) AND DATA_ID = '{}' AND DATA_REPL_NUM > '{}'",
+					columns,
+					leaf_bundle,
+					cursor_id,
+					cursor_replica);
+
+				for (const auto& row : irods::query<rsComm_t>{comm, query_str, page_size}) {
+					page.push_back(row);
+				}
+			}
+
+			if (page.size() < page_size) {
+				const auto query_str =
+					fmt::format("{} WHERE DATA_RESC_ID IN ({}) AND DATA_ID > '{}'", columns, leaf_bundle, cursor_id);
+
+				for (const auto& row : irods::query<rsComm_t>{comm, query_str, page_size - page.size()}) {
+					page.push_back(row);
+				}
+			}
+
+			return page;
+		};
+
+		auto record_failure = [&](const std::string& _path, const std::string& _resc_name) {
+			++failed;
+
+			if (log_errors) {
+				rodsLog(
+					LOG_ERROR,
+					"irods_policy_scrubber - [%s] verification failed for [%s] on [%s]",
+					type.c_str(),
+					_path.c_str(),
+					_resc_name.c_str());
+			}
+
+			const auto ec = set_metadata(
+				comm, "-d", _path, failed_attribute_prefix + _resc_name, fmt::format("{0:011}", std::time(nullptr)));
+			if (ec < 0) {
+				rodsLog(
+					LOG_ERROR,
+					"irods_policy_scrubber - failed to annotate [%s] on [%s] [%d]",
+					_path.c_str(),
+					_resc_name.c_str(),
+					ec);
+			}
+		};
+
+		// returns false should the verification error, in which case nothing is known of the replica
+		auto verify = [&](const std::vector<std::string>& _row) {
+			const auto path = fmt::format("{}/{}", _row[2], _row[3]);
+			const auto data_size = std::stod(_row[4]);
+			const auto& resc_name = _row[5];
+
+			// only a checksum reads the replica in full, filesystem and catalog verification are metadata
+			// operations
+			auto bytes = 0.0;
+			if ("checksum" == type) {
+				bytes = data_size;
+			}
+			else if ("sampled" == type) {
+				bytes = data_size * sampling.sample_fraction;
+			}
+
+			budget.consume(bytes, 1);
+
+			try {
+				if (irods::verify_replica_at_rest(comm, type, path, resc_name, sampling)) {
+					++verified;
+				}
+				else {
+					record_failure(path, resc_name);
+				}
+			}
+			catch (const irods::exception& e) {
+				// a replica which is missing from its vault has failed, one without a checksum cannot
+				// be verified, and one which has since been removed is passed over.  any other error
+				// is not a statement about the replica, and is neither annotated nor passed over
+				if (ENOENT == getErrno(e.code())) {
+					record_failure(path, resc_name);
+				}
+				else if (CAT_NO_CHECKSUM_FOR_REPLICA == e.code()) {
+					++unverified;
+				}
+				else if (SYS_REPLICA_DOES_NOT_EXIST != e.code()) {
+					++errors;
+
+					rodsLog(
+						LOG_ERROR,
+						"irods_policy_scrubber - verification of [%s] on [%s] failed [%d] [%s]",
+						path.c_str(),
+						resc_name.c_str(),
+						e.code(),
+						e.what());
+
+					return false;
+				}
+			}
+
+			return true;
+		};
+
+		bool slice_exhausted{};
+
+		// a replica which errors again remains to be retried, one which has since been removed is dropped
+		for (const auto& r : retries) {
+			const auto separator = r.find(':');
+			if (std::string::npos == separator) {
+				continue;
+			}
+
+			if (slice_exhausted || clock_type::now() >= deadline) {
+				slice_exhausted = true;
+				pending_retries.push_back(r);
+				continue;
+			}
+
+			const auto query_str = fmt::format(
+				"{} WHERE DATA_RESC_ID IN ({}) AND DATA_ID = '{}' AND DATA_REPL_NUM = '{}'",
+				columns,
+				leaf_bundle,
+				r.substr(0, separator),
+				r.substr(separator + 1));
+
+			irods::query<rsComm_t> qobj{comm, query_str, 1};
+			if (0 == qobj.size()) {
+				continue;
+			}
+
+			const auto row = qobj.front();
+			if (!yield_to_foreground(fmt::format("{}/{}", row[2], row[3]), row[6], row[7])) {
+				slice_exhausted = true;
+				pending_retries.push_back(r);
+				continue;
+			}
+
+			if (!verify(row)) {
+				pending_retries.push_back(r);
+			}
+		}
+
+		while (!slice_exhausted && clock_type::now() < deadline) {
+			const auto page = fetch_page();
+			if (page.empty()) {
+				pass_completed = true;
+				break;
+			}
+
+			for (const auto& row : page) {
+				const auto path = fmt::format("{}/{}", row[2], row[3]);
+
+				if (clock_type::now() >= deadline || !yield_to_foreground(path, row[6], row[7])) {
+					slice_exhausted = true;
+					break;
+				}
+
+				if (verify(row)) {
+					consecutive_errors = 0;
+				}
+				else {
+					// the cursor passes a replica which errored only once it is held to be retried by the
+					// next slice, otherwise the slice ends with the cursor before it
+					if (pending_retries.size() >= maximum_retries) {
+						slice_exhausted = true;
+						break;
+					}
+
+					pending_retries.push_back(fmt::format("{}:{}", row[0], row[1]));
+
+					if (++consecutive_errors >= std::max<std::uint32_t>(maximum_errors, 1)) {
+						slice_exhausted = true;
+					}
+				}
+
+				cursor_id = row[0];
+				cursor_replica = row[1];
+				cursor = fmt::format("{}:{}", cursor_id, cursor_replica);
+
+				if (slice_exhausted) {
+					break;
+				}
+			}
+
+			save_cursor();
+		}
+
+		// the replicas to retry are saved even should no page have been visited
+		save_retries();
+
+		if (pass_completed) {
+			cursor = "0";
+			save_cursor();
+
+			const auto ec = set_metadata(
+				comm, "-R", source_resource, last_pass_attribute, fmt::format("{0:011}", std::time(nullptr)));
+			if (ec < 0) {
+				rodsLog(
+					LOG_ERROR,
+					"irods_policy_scrubber - failed to record completed pass for [%s] [%d]",
+					source_resource.c_str(),
+					ec);
+			}
+		}
+
+		pe::client_message(
+			{{"0.message", fmt::format("{} scrubbed [{}]", ctx.policy_name, source_resource)},
+		     {"1.verified", verified},
+		     {"2.failed", failed},
+		     {"3.unverified", unverified},
+		     {"4.errors", errors},
+		     {"5.yields", yields},
+		     {"6.retries", pending_retries.size()},
+		     {"7.cursor", cursor},
+		     {"8.pass_completed", pass_completed}});
+
+		return SUCCESS();
+
+	} // scrubber_policy
+
+} // namespace
+
+const char usage[] = R"(
+{
+    "id": "file:///var/lib/irods/configuration_schemas/v3/policy_engine_usage.json",
+    "$schema": "http://json-schema.org/draft-04/schema#",
+    "description": ""
+        "input_interfaces": [
+            {
+                "name" :  "direct_invocation",
+                "description" : "",
+                "json_schema" : ""
+            }
+        ],
+    "output_json_for_validation" : ""
+}
+)";
+
+extern "C" pe::plugin_pointer_type plugin_factory(const std::string& _plugin_name, const std::string&)
+{
+	return pe::make(_plugin_name, "irods_policy_scrubber", usage, scrubber_policy);
+
+} // plugin_factory
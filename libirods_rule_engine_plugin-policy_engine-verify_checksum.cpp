@@ -5,6 +5,10 @@
 
 #include <irods/irods_resource_backport.hpp>
 #include <irods/rsFileChksum.hpp>
+#include <irods/rsModAVUMetadata.hpp>
+
+#include <algorithm>
+#include <thread>
 
 #include "data_verification_utilities.hpp"
 
@@ -19,6 +23,239 @@ namespace
     using     json = nlohmann::json;
 	// clang-format on
 
+	namespace checksum_mode
+	{
+		static const std::string catalog{"catalog"};
+		static const std::string parallel{"parallel"};
+		static const std::string sampled{"sampled"};
+	} // namespace checksum_mode
+
+	const std::string manifest_attribute{"irods::verification::sha256_manifest"};
+	const std::string last_verified_attribute_prefix{"irods::verification::last_verified::"};
+
+	auto get_manifest(
+		rsComm_t* _comm,
+		const std::string& _coll_name,
+		const std::string& _data_name,
+		const std::string& _resource_name) -> std::string
+	{
+		const auto query_str = fmt::format(
+			"SELECT META_DATA_ATTR_VALUE WHERE COLL_NAME = '{}' AND DATA_NAME = '{}'"
+			" AND META_DATA_ATTR_NAME = '{}' AND META_DATA_ATTR_UNITS = '{}'",
+			_coll_name,
+			_data_name,
+			manifest_attribute,
+			_resource_name);
+
+		irods::query<rsComm_t> qobj{_comm, query_str, 1};
+
+		return qobj.size() > 0 ? qobj.front()[0] : std::string{};
+
+	} // get_manifest
+
+	auto record_manifest(
+		rsComm_t* _comm,
+		const std::string& _logical_path,
+		const std::string& _resource_name,
+		const std::string& _previous_manifest,
+		const std::string& _manifest) -> int
+	{
+		// manifests are unique per replica, the resource name is held in the units
+		auto mod_avu = [&](const char* _op, const std::string& _value) {
+			modAVUMetadataInp_t inp{};
+			inp.arg0 = const_cast<char*>(_op);
+			inp.arg1 = "-d";
+			inp.arg2 = const_cast<char*>(_logical_path.c_str());
+			inp.arg3 = const_cast<char*>(manifest_attribute.c_str());
+			inp.arg4 = const_cast<char*>(_value.c_str());
+			inp.arg5 = const_cast<char*>(_resource_name.c_str());
+			return rsModAVUMetadata(_comm, &inp);
+		};
+
+		if (!_previous_manifest.empty()) {
+			if (const auto ec = mod_avu("rm", _previous_manifest); ec < 0) {
+				return ec;
+			}
+		}
+
+		return mod_avu("add", _manifest);
+
+	} // record_manifest
+
+	auto record_last_verified(
+		rsComm_t* _comm,
+		const std::string& _logical_path,
+		const std::string& _resource_name,
+		const std::string& _data_modify_time) -> int
+	{
+		// the modify time observed during verification is held in the units so that
+		// the query processor may skip replicas which have not changed since
+		const auto attribute = last_verified_attribute_prefix + _resource_name;
+		const auto value = fmt::format("{0:011}", std::time(nullptr));
+
+		modAVUMetadataInp_t inp{};
+		inp.arg0 = "set";
+		inp.arg1 = "-d";
+		inp.arg2 = const_cast<char*>(_logical_path.c_str());
+		inp.arg3 = const_cast<char*>(attribute.c_str());
+		inp.arg4 = const_cast<char*>(value.c_str());
+		inp.arg5 = const_cast<char*>(_data_modify_time.c_str());
+
+		return rsModAVUMetadata(_comm, &inp);
+
+	} // record_last_verified
+
+	auto verify_catalog_checksum(
+		const pe::context& ctx,
+		const std::string& logical_path,
+		const std::string& source_resource,
+		const std::string& location,
+		const std::string& resc_hier,
+		const std::string& phys_path,
+		const std::string& data_size,
+		const std::string& catalog_checksum) -> irods::error
+	{
+		auto comm = ctx.rei->rsComm;
+
+		fileChksumInp_t inp{};
+		inp.dataSize = std::atoi(data_size.c_str());
+		rstrcpy(inp.addr.hostAddr, location.c_str(), NAME_LEN);
+		rstrcpy(inp.fileName, phys_path.c_str(), MAX_NAME_LEN);
+		rstrcpy(inp.rescHier, resc_hier.c_str(), MAX_NAME_LEN);
+		rstrcpy(inp.objPath, logical_path.c_str(), MAX_NAME_LEN);
+
+		char* computed_checksum{};
+		irods::at_scope_exit free_computed_checksum{[&computed_checksum] { free(computed_checksum); }};
+		if (const auto ec = rsFileChksum(comm, &inp, &computed_checksum); ec < 0) {
+			return ERROR(
+				ec,
+				fmt::format(
+					"{} :: rsFileChksum failed for {} on {}",
+					"irods_policy_verify_checksum",
+					logical_path,
+					source_resource));
+		}
+
+		pe::client_message({{"0.message", fmt::format("{} computed_checksum {}", ctx.policy_name, computed_checksum)}});
+
+		if (!catalog_checksum.empty() && catalog_checksum != computed_checksum) {
+			const auto msg = fmt::format(
+				"checksum mismatch for [{}] on resource [{}] computed [{}] catalog [{}]",
+				logical_path,
+				source_resource,
+				computed_checksum,
+				catalog_checksum);
+
+			const auto le = pe::get_log_errors_flag(ctx.parameters, ctx.configuration);
+			if (le) {
+				rodsLog(LOG_ERROR, msg.c_str());
+			}
+
+			return ERROR(USER_CHKSUM_MISMATCH, msg);
+		}
+
+		return SUCCESS();
+
+	} // verify_catalog_checksum
+
+	auto verify_sha256_manifest(
+		const pe::context& ctx,
+		const std::string& logical_path,
+		const std::string& source_resource,
+		const std::string& coll_name,
+		const std::string& data_name,
+		const std::string& phys_path,
+		const std::string& modify_time,
+		const std::string& catalog_checksum,
+		const std::function<irods::error()>& _verify_catalog_checksum) -> irods::error
+	{
+		auto comm = ctx.rei->rsComm;
+
+		// clang-format off
+        const auto number_of_threads = std::max(1u, pc::get(ctx.configuration, "number_of_threads", std::thread::hardware_concurrency()));
+        const auto chunk_size        = pc::get(ctx.configuration, "chunk_size_in_bytes", std::uint64_t{256 * 1024 * 1024});
+		// clang-format on
+
+		auto report_mismatch = [&](const std::string& _msg) {
+			if (pe::get_log_errors_flag(ctx.parameters, ctx.configuration)) {
+				rodsLog(LOG_ERROR, _msg.c_str());
+			}
+
+			return ERROR(USER_CHKSUM_MISMATCH, _msg);
+		};
+
+		// without a catalog checksum a manifest could only record whatever is now at rest as correct,
+		// so the replica is refused as it is by verify_checksum_at_rest
+		if (catalog_checksum.empty()) {
+			return ERROR(
+				CAT_NO_CHECKSUM_FOR_REPLICA,
+				fmt::format(
+					"no checksum is registered for [{}] on [{}], a manifest cannot be recorded",
+					logical_path,
+					source_resource));
+		}
+
+		// recorded manifests take the form <modify time>:<catalog checksum>:<chunk size>:<digest>,
+		// a replica which has since been overwritten no longer matches and is baselined again
+		const auto prefix = fmt::format("{}:{}:{}:", modify_time, catalog_checksum, chunk_size);
+		const auto recorded = get_manifest(comm, coll_name, data_name, source_resource);
+
+		if (0 == recorded.compare(0, prefix.size(), prefix)) {
+			const auto computed = prefix + irods::compute_sha256_manifest(phys_path, chunk_size, number_of_threads);
+
+			pe::client_message({{"0.message", fmt::format("{} computed manifest {}", ctx.policy_name, computed)}});
+
+			if (recorded != computed) {
+				return report_mismatch(
+					fmt::format(
+						"checksum manifest mismatch for [{}] on resource [{}] computed [{}] recorded [{}]",
+						logical_path,
+						source_resource,
+						computed,
+						recorded));
+			}
+
+			return SUCCESS();
+		}
+
+		// no manifest exists for the current state of the replica, it must be verified against
+		// the catalog checksum once before the manifest may be trusted.  a sha2 catalog checksum
+		// is computed within the same pass as the manifest, others require a separate read
+		std::string computed{};
+		if (0 == catalog_checksum.rfind("sha2:", 0)) {
+			std::string file_checksum{};
+			computed =
+				prefix + irods::compute_sha256_manifest(phys_path, chunk_size, number_of_threads, &file_checksum);
+
+			if (catalog_checksum != file_checksum) {
+				return report_mismatch(
+					fmt::format(
+						"checksum mismatch for [{}] on resource [{}] computed [{}] catalog [{}]",
+						logical_path,
+						source_resource,
+						file_checksum,
+						catalog_checksum));
+			}
+		}
+		else {
+			if (const auto err = _verify_catalog_checksum(); !err.ok()) {
+				return err;
+			}
+
+			computed = prefix + irods::compute_sha256_manifest(phys_path, chunk_size, number_of_threads);
+		}
+
+		pe::client_message({{"0.message", fmt::format("{} computed manifest {}", ctx.policy_name, computed)}});
+
+		if (const auto ec = record_manifest(comm, logical_path, source_resource, recorded, computed); ec < 0) {
+			return ERROR(
+				ec, fmt::format("failed to record checksum manifest for [{}] on [{}]", logical_path, source_resource));
+		}
+
+		return SUCCESS();
+
+	} // verify_sha256_manifest
+
 	irods::error verify_checksum(const pe::context& ctx, pe::arg_type out)
 	{
 		auto comm = ctx.rei->rsComm;
@@ -28,22 +265,26 @@ namespace
 		std::tie(user_name, logical_path, source_resource, destination_resource) =
 			capture_parameters(ctx.parameters, tag_last_resc);
 
+		const auto mode = pc::get(ctx.configuration, "checksum_mode", checksum_mode::catalog);
+
 		pe::client_message(
 			{{"0.usage", fmt::format("{} requires logical_patah and source_resource", ctx.policy_name)},
 		     {"1.logical_path", logical_path},
-		     {"2.source_resource", source_resource}});
+		     {"2.source_resource", source_resource},
+		     {"3.checksum_mode", mode}});
 
 		auto catalog_checksum = std::string{};
 		auto resc_hier = std::string{};
 		auto phys_path = std::string{};
 		auto data_size = std::string{};
+		auto modify_time = std::string{};
 		auto coll_name = std::string{};
 		auto data_name = std::string{};
 
 		irods::get_object_and_collection_from_path(logical_path, coll_name, data_name);
 
 		const auto query_str = fmt::format(
-			"SELECT DATA_CHECKSUM, DATA_RESC_HIER, DATA_PATH, DATA_SIZE WHERE DATA_NAME = '{}'"
+			"SELECT DATA_CHECKSUM, DATA_RESC_HIER, DATA_PATH, DATA_SIZE, DATA_MODIFY_TIME WHERE DATA_NAME = '{}'"
 			" AND COLL_NAME = '{}' AND RESC_NAME = '{}'",
 			data_name,
 			coll_name,
@@ -55,6 +296,7 @@ namespace
 			resc_hier = qobj.front()[1];
 			phys_path = qobj.front()[2];
 			data_size = qobj.front()[3];
+			modify_time = qobj.front()[4];
 		}
 
 		std::string location;
@@ -77,41 +319,89 @@ namespace
 		     {"4.coll_name", coll_name},
 		     {"5.data_name", data_name}});
 
-		fileChksumInp_t inp{};
-		inp.dataSize = std::atoi(data_size.c_str());
-		rstrcpy(inp.addr.hostAddr, location.c_str(), NAME_LEN);
-		rstrcpy(inp.fileName, phys_path.c_str(), MAX_NAME_LEN);
-		rstrcpy(inp.rescHier, resc_hier.c_str(), MAX_NAME_LEN);
-		rstrcpy(inp.objPath, logical_path.c_str(), MAX_NAME_LEN);
+		auto verify_catalog = [&] {
+			return verify_catalog_checksum(
+				ctx, logical_path, source_resource, location, resc_hier, phys_path, data_size, catalog_checksum);
+		};
 
-		char* computed_checksum{};
-		irods::at_scope_exit free_computed_checksum{[&computed_checksum] { free(computed_checksum); }};
-		if (const auto ec = rsFileChksum(comm, &inp, &computed_checksum); ec < 0) {
-			return ERROR(
-				ec,
-				fmt::format(
-					"{} :: rsFileChksum failed for {} on {}",
-					"irods_policy_verify_checksum",
-					logical_path,
-					source_resource));
-		}
+		auto verify_replica = [&]() -> irods::error {
+			if (checksum_mode::parallel == mode) {
+				// the vault file is read directly, which requires a local unixfilesystem resource
+				if (irods::resource_is_local_unixfilesystem(resc_hier)) {
+					return verify_sha256_manifest(
+						ctx,
+						logical_path,
+						source_resource,
+						coll_name,
+						data_name,
+						phys_path,
+						modify_time,
+						catalog_checksum,
+						verify_catalog);
+				}
 
-		pe::client_message({{"0.message", fmt::format("{} computed_checksum {}", ctx.policy_name, computed_checksum)}});
+				pe::client_message(
+					{{"0.message",
+					  fmt::format(
+						  "{} resource {} is not a local unixfilesystem, falling back to catalog checksum",
+						  ctx.policy_name,
+						  source_resource)}});
+			}
+			else if (checksum_mode::sampled == mode) {
+				irods::sampling_configuration sampling{};
 
-		if (!catalog_checksum.empty() && catalog_checksum != computed_checksum) {
-			const auto msg = fmt::format(
-				"checksum mismatch for [{}] on resource [{}] computed [{}] catalog [{}]",
-				logical_path,
-				source_resource,
-				computed_checksum,
-				catalog_checksum);
+				// clang-format off
+                sampling.sample_fraction           = pc::get(ctx.configuration, "sample_fraction",           sampling.sample_fraction);
+                sampling.number_of_ranges          = pc::get(ctx.configuration, "number_of_ranges",          sampling.number_of_ranges);
+                sampling.cycle_duration_in_seconds = pc::get(ctx.configuration, "cycle_duration_in_seconds", sampling.cycle_duration_in_seconds);
+				// clang-format on
 
-			const auto le = pe::get_log_errors_flag(ctx.parameters, ctx.configuration);
-			if (le) {
-				rodsLog(LOG_ERROR, msg.c_str());
+				auto verified = false;
+				try {
+					verified = irods::verify_sampled_ranges_for_resource(
+						comm, logical_path, source_resource, sampling, [&] { return verify_catalog().ok(); });
+				}
+				catch (const irods::exception& e) {
+					return ERROR(e.code(), e.what());
+				}
+
+				if (!verified) {
+					const auto msg = fmt::format(
+						"sampled verification failed for [{}] on resource [{}]", logical_path, source_resource);
+
+					if (pe::get_log_errors_flag(ctx.parameters, ctx.configuration)) {
+						rodsLog(LOG_ERROR, msg.c_str());
+					}
+
+					return ERROR(USER_CHKSUM_MISMATCH, msg);
+				}
+
+				return SUCCESS();
+			}
+			else if (checksum_mode::catalog != mode) {
+				return ERROR(SYS_INVALID_INPUT_PARAM, fmt::format("checksum mode is not supported [{}]", mode));
 			}
 
-			return ERROR(USER_CHKSUM_MISMATCH, msg);
+			return verify_catalog();
+		};
+
+		if (const auto err = verify_replica(); !err.ok()) {
+			return err;
+		}
+
+		// the time of verification is only of use to those which skip recently verified replicas
+		if (pc::get(ctx.configuration, "min_reverify_interval", time_t{0}) <= 0) {
+			return SUCCESS();
+		}
+
+		if (const auto ec = record_last_verified(comm, logical_path, source_resource, modify_time); ec < 0) {
+			rodsLog(
+				LOG_ERROR,
+				"%s :: failed to record verification time for [%s] on [%s] [%d]",
+				ctx.policy_name.c_str(),
+				logical_path.c_str(),
+				source_resource.c_str(),
+				ec);
 		}
 
 		return SUCCESS();
@@ -0,0 +1,641 @@
+#include <irods/policy_composition_framework_policy_engine.hpp>
+#include <irods/policy_composition_framework_configuration_manager.hpp>
+#include <irods/policy_composition_framework_dispatch_queue.hpp>
+#include <irods/policy_composition_framework_event_journal.hpp>
+
+#include <irods/clientLogin.h>
+#include <irods/execMyRule.h>
+#include <irods/getRodsEnv.h>
+#include <irods/irods_configuration_keywords.hpp>
+#include <irods/msParam.h>
+#include <irods/rcConnect.h>
+#include <irods/rcMisc.h>
+
+#include <sys/file.h>
+#include <fcntl.h>
+#include <unistd.h>
+
+#include <algorithm>
+#include <atomic>
+#include <ctime>
+#include <fstream>
+#include <map>
+#include <mutex>
+#include <thread>
+
+namespace
+{
+
+	// clang-format off
+    namespace pc   = irods::policy_composition;
+    namespace kw   = irods::policy_composition::keywords;
+    namespace pe   = irods::policy_composition::policy_engine;
+    using     json = nlohmann::json;
+	// clang-format on
+
+	// every drain of a queue reads through the same cursor of each priority
+	const std::string consumer{"drain"};
+
+	// parameters of an enqueue which describe the work rather than being passed to it
+	const std::vector<std::string> enqueue_keys{
+		kw::policy_to_invoke,
+		kw::parameters,
+		kw::configuration,
+		"priority",
+		"deduplication_key",
+		"batch_capable"};
+
+	// a single invocation of a policy, either for one item of work or for a batch of items, on
+	// behalf of the user who enqueued the work
+	struct invocation
+	{
+		std::string policy_to_invoke;
+		json parameters;
+		json configuration;
+		std::size_t items{};
+		std::string user_name;
+		std::string zone;
+	};
+
+	// a connection to the local server as the service account, acting for the user who enqueued
+	// the work so that a policy is never invoked with more privilege than its user holds
+	class proxied_connection
+	{
+	  public:
+		proxied_connection(const std::string& _user_name, const std::string& _zone)
+		{
+			rodsEnv env{};
+			if (const auto ec = getRodsEnv(&env); ec < 0) {
+				THROW(ec, "failed to read the environment of the service account");
+			}
+
+			// the service account is the proxy user, and authenticates, while the user of the work
+			// is the client user
+			rErrMsg_t error{};
+			comm_ = _rcConnect(
+				env.rodsHost,
+				env.rodsPort,
+				env.rodsUserName,
+				env.rodsZone,
+				_user_name.c_str(),
+				_zone.c_str(),
+				&error,
+				0,
+				NO_RECONN);
+			if (!comm_) {
+				THROW(error.status, fmt::format("failed to connect on behalf of [{}#{}]", _user_name, _zone));
+			}
+
+			if (const auto ec = clientLogin(comm_); ec < 0) {
+				rcDisconnect(comm_);
+				THROW(ec, fmt::format("failed to authenticate on behalf of [{}#{}]", _user_name, _zone));
+			}
+
+		} // ctor
+
+		proxied_connection(const proxied_connection&) = delete;
+		proxied_connection& operator=(const proxied_connection&) = delete;
+
+		~proxied_connection()
+		{
+			rcDisconnect(comm_);
+
+		} // dtor
+
+		operator rcComm_t&()
+		{
+			return *comm_;
+
+		} // operator rcComm_t&
+
+	  private:
+		rcComm_t* comm_{};
+
+	}; // class proxied_connection
+
+	using connection_map = std::map<std::string, std::unique_ptr<proxied_connection>>;
+
+	// a drain is served by one agent at a time, an agent which finds the queue already held
+	// returns rather than waiting
+	class drain_lock
+	{
+	  public:
+		explicit drain_lock(const std::string& _path)
+			: fd_{open(_path.c_str(), O_RDWR | O_CREAT, 0600)}
+		{
+			if (fd_ < 0) {
+				THROW(UNIX_FILE_OPEN_ERR - errno, fmt::format("failed to open work queue lock [{}]", _path));
+			}
+
+			held_ = 0 == flock(fd_, LOCK_EX | LOCK_NB);
+
+		} // ctor
+
+		drain_lock(const drain_lock&) = delete;
+		drain_lock& operator=(const drain_lock&) = delete;
+
+		~drain_lock()
+		{
+			if (held_) {
+				flock(fd_, LOCK_UN);
+			}
+
+			close(fd_);
+
+		} // dtor
+
+		auto held() const -> bool
+		{
+			return held_;
+
+		} // held
+
+	  private:
+		int fd_{-1};
+		bool held_{};
+
+	}; // class drain_lock
+
+	auto get_queue_directory(const json& _configuration) -> std::string
+	{
+		const auto queue = pc::get(_configuration, "queue", std::string{"default"});
+		return pc::get_local_state_directory(_configuration, fmt::format("work_queue/{}", queue));
+
+	} // get_queue_directory
+
+	// each priority is kept in its own journal, ordered so that the greatest priority is drained first
+	auto open_priorities(const json& _configuration, const std::string& _directory)
+		-> std::map<std::int32_t, std::unique_ptr<pc::event_journal>, std::greater<>>
+	{
+		// clang-format off
+        const auto segment_size = pc::get(_configuration, "segment_size_in_bytes", std::uint64_t{16 * 1024 * 1024});
+        const auto synchronous  = pc::get(_configuration, "synchronous_writes",    false);
+		// clang-format on
+
+		std::map<std::int32_t, std::unique_ptr<pc::event_journal>, std::greater<>> journals{};
+		for (const auto& e : std::filesystem::directory_iterator{_directory}) {
+			const auto name = e.path().filename().string();
+			if (e.is_directory() && 0 == name.rfind("priority_", 0)) {
+				const auto priority = std::stoi(name.substr(9));
+				journals[priority] = std::make_unique<pc::event_journal>(e.path().string(), segment_size, synchronous);
+			}
+		}
+
+		return journals;
+
+	} // open_priorities
+
+	auto rule_text(const invocation& _invocation) -> std::string
+	{
+		const json rule{
+			{kw::policy_to_invoke, _invocation.policy_to_invoke},
+			{kw::parameters, _invocation.parameters},
+			{kw::configuration, _invocation.configuration}};
+
+		return fmt::format("@external rule {{ {} }}", rule.dump());
+
+	} // rule_text
+
+	void invoke_locally(const pe::context& ctx, const invocation& _invocation)
+	{
+		std::string params{_invocation.parameters.dump()};
+		std::string config{_invocation.configuration.dump()};
+		std::string out{};
+
+		std::list<boost::any> args{};
+		args.push_back(boost::any(&params));
+		args.push_back(boost::any(&config));
+		args.push_back(boost::any(&out));
+
+		pc::invoke_policy(ctx.rei, _invocation.policy_to_invoke, args);
+
+	} // invoke_locally
+
+	// workers invoke policies through their own connections to the local server, one for each user,
+	// as the agent serving the drain may not be shared between threads
+	void invoke_remotely(connection_map& _connections, const std::string& _instance, const invocation& _invocation)
+	{
+		auto& connection = _connections[fmt::format("{}#{}", _invocation.user_name, _invocation.zone)];
+		if (!connection) {
+			connection = std::make_unique<proxied_connection>(_invocation.user_name, _invocation.zone);
+		}
+
+		const auto text = rule_text(_invocation);
+
+		execMyRuleInp_t inp{};
+		rstrcpy(inp.myRule, text.c_str(), sizeof(inp.myRule));
+		rstrcpy(inp.outParamDesc, "ruleExecOut", sizeof(inp.outParamDesc));
+		addKeyVal(&inp.condInput, irods::KW_CFG_INSTANCE_NAME.c_str(), _instance.c_str());
+
+		msParamArray_t* out{};
+		rcComm_t& comm = *connection;
+		const auto status = rcExecMyRule(&comm, &inp, &out);
+
+		clearKeyVal(&inp.condInput);
+		if (out) {
+			clearMsParamArray(out, 1);
+			free(out);
+		}
+
+		if (status < 0) {
+			// the connection may no longer be usable
+			connection.reset();
+			THROW(status, fmt::format("failed to invoke [{}]", _invocation.policy_to_invoke));
+		}
+
+	} // invoke_remotely
+
+	// later work for the same key supersedes earlier work which has not yet been invoked, the
+	// work keeps the place of the first item so that priority order is preserved
+	auto deduplicate(const std::vector<json>& _items, std::uint64_t& _deduplicated) -> std::vector<json>
+	{
+		std::vector<json> unique{};
+		std::map<std::string, std::size_t> index{};
+
+		for (const auto& item : _items) {
+			const auto key = item.value("key", std::string{});
+			if (key.empty()) {
+				unique.push_back(item);
+				continue;
+			}
+
+			if (const auto it = index.find(key); it != index.end()) {
+				unique[it->second] = item;
+				++_deduplicated;
+				continue;
+			}
+
+			index[key] = unique.size();
+			unique.push_back(item);
+		}
+
+		return unique;
+
+	} // deduplicate
+
+	// items for a batch capable policy with the same configuration and user are invoked together, as
+	// many as fit within a single rule.  all other items are invoked on their own
+	auto make_invocations(const std::vector<json>& _items, const std::size_t _maximum_batch_size)
+		-> std::vector<invocation>
+	{
+		std::vector<invocation> invocations{};
+		std::map<std::string, std::size_t> open_batches{};
+
+		for (const auto& item : _items) {
+			const auto& policy = item.at(kw::policy_to_invoke).get_ref<const std::string&>();
+			const auto& parameters = item.at(kw::parameters);
+			const auto& configuration = item.at(kw::configuration);
+
+			// work enqueued without a user is set aside by the workers rather than invoked
+			const auto user = item.value("user", json::object());
+			const auto user_name = user.value("user_name", std::string{});
+			const auto zone = user.value("zone", std::string{});
+
+			if (!item.value("batch_capable", false)) {
+				invocations.push_back({policy, parameters, configuration, 1, user_name, zone});
+				continue;
+			}
+
+			const auto batch_key = fmt::format("{}#{}\n{}\n{}", user_name, zone, policy, configuration.dump());
+			if (const auto it = open_batches.find(batch_key); it != open_batches.end()) {
+				auto& batch = invocations[it->second];
+				auto candidate = batch;
+				candidate.parameters[kw::objects].push_back(parameters);
+
+				if (batch.items < _maximum_batch_size && rule_text(candidate).size() < META_STR_LEN) {
+					batch = std::move(candidate);
+					++batch.items;
+					continue;
+				}
+			}
+
+			open_batches[batch_key] = invocations.size();
+			invocations.push_back(
+				{policy, {{kw::objects, json::array({parameters})}}, configuration, 1, user_name, zone});
+		}
+
+		return invocations;
+
+	} // make_invocations
+
+	void write_dead_letter(const std::string& _path, const invocation& _invocation, const std::string& _error)
+	{
+		std::ofstream out{_path, std::ios::app};
+		out << json{{kw::policy_to_invoke, _invocation.policy_to_invoke},
+		            {kw::parameters, _invocation.parameters},
+		            {kw::configuration, _invocation.configuration},
+		            {"user", {{"user_name", _invocation.user_name}, {"zone", _invocation.zone}}},
+		            {"error", _error},
+		            {"time", std::time(nullptr)}}
+		           .dump()
+		    << '\n';
+
+	} // write_dead_letter
+
+	auto report(
+		const std::string& _queue,
+		std::map<std::int32_t, std::unique_ptr<pc::event_journal>, std::greater<>>& _journals) -> json
+	{
+		const auto now = static_cast<std::int64_t>(std::time(nullptr));
+
+		std::uint64_t depth{};
+		std::int64_t oldest{};
+		auto priorities = json::array();
+
+		for (auto& [priority, journal] : _journals) {
+			const auto pending = journal->pending(consumer);
+			const auto first = journal->read(consumer, 1);
+			const auto age = first.empty() ? 0 : now - first.front().record.value("time", now);
+
+			priorities.push_back(
+				{{"priority", priority},
+			     {"depth", pending},
+			     {"pending_bytes", journal->pending_bytes(consumer)},
+			     {"oldest_age_in_seconds", age}});
+
+			depth += pending;
+			oldest = std::max(oldest, age);
+		}
+
+		return {{"queue", _queue}, {"depth", depth}, {"oldest_age_in_seconds", oldest}, {"priorities", priorities}};
+
+	} // report
+
+	auto enqueue(const pe::context& ctx) -> irods::error
+	{
+		const auto& p = ctx.parameters;
+		if (!p.contains(kw::policy_to_invoke)) {
+			return ERROR(SYS_INVALID_INPUT_PARAM, "irods_policy_work_queue - missing policy_to_invoke");
+		}
+
+		// the parameters of the event are passed along with those given for the work, and those given
+		// for the work take precedence
+		auto parameters = p.value(kw::parameters, json::object());
+		for (const auto& [k, v] : p.items()) {
+			if (!parameters.contains(k) && std::find(enqueue_keys.begin(), enqueue_keys.end(), k) == enqueue_keys.end())
+			{
+				parameters[k] = v;
+			}
+		}
+
+		parameters = pc::event_handler::dispatch_queue::compact(parameters);
+
+		// clang-format off
+        const auto priority    = std::clamp(p.value("priority", pc::get(ctx.configuration, "priority", std::int32_t{0})), 0, 99);
+        const auto deduplicate = pc::get(ctx.configuration, "deduplicate", false);
+		// clang-format on
+
+		// the work is invoked on behalf of the client which enqueued it
+		const auto& client = ctx.rei->rsComm->clientUser;
+		const json user{{"user_name", client.userName}, {"zone", client.rodsZone}};
+		const auto configuration = p.value(kw::configuration, json::object());
+
+		// deduplication is requested by the configuration, and work is merged only with work of the
+		// same user, policy and configuration
+		std::string key{};
+		if (deduplicate) {
+			key = p.value("deduplication_key", parameters.value(kw::logical_path, std::string{}));
+			if (!key.empty()) {
+				key = fmt::format(
+					"{}#{}\n{}\n{}\n{}",
+					client.userName,
+					client.rodsZone,
+					p.at(kw::policy_to_invoke).get<std::string>(),
+					configuration.dump(),
+					key);
+			}
+		}
+
+		const auto directory = get_queue_directory(ctx.configuration);
+
+		// clang-format off
+        const auto segment_size = pc::get(ctx.configuration, "segment_size_in_bytes", std::uint64_t{16 * 1024 * 1024});
+        const auto synchronous  = pc::get(ctx.configuration, "synchronous_writes",    false);
+		// clang-format on
+
+		pc::event_journal journal{fmt::format("{}/priority_{:02}", directory, priority), segment_size, synchronous};
+		journal.append(
+			{{kw::policy_to_invoke, p.at(kw::policy_to_invoke)},
+		     {kw::parameters, parameters},
+		     {kw::configuration, configuration},
+		     {"batch_capable", p.value("batch_capable", false)},
+		     {"user", user},
+		     {"key", key},
+		     {"time", std::time(nullptr)}});
+
+		return SUCCESS();
+
+	} // enqueue
+
+	auto drain(const pe::context& ctx, pe::arg_type out) -> irods::error
+	{
+		// clang-format off
+        const auto queue              = pc::get(ctx.configuration, "queue",                std::string{"default"});
+        const auto number_of_workers  = pc::get(ctx.configuration, "number_of_workers",    std::uint32_t{4});
+        const auto maximum_items      = pc::get(ctx.configuration, "maximum_items",        std::uint64_t{10000});
+        const auto maximum_batch_size = pc::get(ctx.configuration, "maximum_batch_size",   std::uint64_t{100});
+        const auto maximum_attempts   = pc::get(ctx.configuration, "maximum_attempts",     std::uint32_t{3});
+        const auto instance           = pc::get(ctx.configuration, "rule_engine_instance", std::string{"irods_rule_engine_plugin-cpp_default_policy-instance"});
+		// clang-format on
+
+		const auto directory = get_queue_directory(ctx.configuration);
+
+		drain_lock lock{directory + "/drain.lock"};
+		if (!lock.held()) {
+			pe::client_message(
+				{{"0.message", fmt::format("{} queue [{}] is drained by another agent", ctx.policy_name, queue)}});
+			return SUCCESS();
+		}
+
+		auto journals = open_priorities(ctx.configuration, directory);
+
+		std::mutex mutex{};
+		std::atomic<std::uint64_t> invoked{}, failed{};
+		std::uint64_t read{}, deduplicated{}, batches{};
+
+		while (read < maximum_items) {
+			// the greatest priority is read first, lesser priorities fill what remains of the batch
+			std::vector<json> items{};
+			std::map<std::int32_t, std::uint64_t> positions{};
+			for (auto& [priority, journal] : journals) {
+				const auto remaining = std::min(maximum_items - read, maximum_batch_size * number_of_workers);
+				if (items.size() >= remaining) {
+					break;
+				}
+
+				for (auto& entry : journal->read(consumer, remaining - items.size())) {
+					positions[priority] = entry.next;
+					items.push_back(std::move(entry.record));
+				}
+			}
+
+			if (items.empty()) {
+				break;
+			}
+
+			read += items.size();
+
+			const auto invocations = make_invocations(deduplicate(items, deduplicated), maximum_batch_size);
+
+			// invocations too large for a rule are invoked by this agent once the workers are done
+			std::vector<const invocation*> local{};
+			std::atomic<std::size_t> next{};
+
+			auto work = [&] {
+				connection_map connections{};
+				for (auto i = next++; i < invocations.size(); i = next++) {
+					const auto& inv = invocations[i];
+					if (inv.user_name.empty()) {
+						failed += inv.items;
+						std::lock_guard lock{mutex};
+						write_dead_letter(directory + "/dead_letters.jsonl", inv, "work was enqueued without a user");
+						continue;
+					}
+
+					if (rule_text(inv).size() >= META_STR_LEN) {
+						std::lock_guard lock{mutex};
+						local.push_back(&inv);
+						continue;
+					}
+
+					std::string error{};
+					for (std::uint32_t attempt = 0; attempt < std::max<std::uint32_t>(maximum_attempts, 1); ++attempt) {
+						try {
+							invoke_remotely(connections, instance, inv);
+							error.clear();
+							break;
+						}
+						catch (const irods::exception& e) {
+							error = e.what();
+						}
+					}
+
+					if (error.empty()) {
+						invoked += inv.items;
+						continue;
+					}
+
+					failed += inv.items;
+					rodsLog(
+						LOG_ERROR,
+						"irods_policy_work_queue - failed to invoke [%s] [%s]",
+						inv.policy_to_invoke.c_str(),
+						error.c_str());
+
+					std::lock_guard lock{mutex};
+					write_dead_letter(directory + "/dead_letters.jsonl", inv, error);
+				}
+			};
+
+			std::vector<std::thread> workers{};
+			const auto count = std::min<std::size_t>(std::max<std::uint32_t>(number_of_workers, 1), invocations.size());
+			for (std::size_t i = 0; i < count; ++i) {
+				workers.emplace_back(work);
+			}
+
+			for (auto& w : workers) {
+				w.join();
+			}
+
+			// the agent serving the drain acts for its own client, work of any other user is set aside
+			const auto& client = ctx.rei->rsComm->clientUser;
+			for (const auto* inv : local) {
+				if (inv->user_name != client.userName || inv->zone != client.rodsZone) {
+					failed += inv->items;
+					write_dead_letter(
+						directory + "/dead_letters.jsonl", *inv, "work is too large to invoke on behalf of its user");
+					continue;
+				}
+
+				try {
+					invoke_locally(ctx, *inv);
+					invoked += inv->items;
+				}
+				catch (const irods::exception& e) {
+					failed += inv->items;
+					write_dead_letter(directory + "/dead_letters.jsonl", *inv, e.what());
+				}
+			}
+
+			batches += invocations.size();
+
+			// the cursors pass the work only once it is invoked or set aside
+			for (const auto& [priority, position] : positions) {
+				journals.at(priority)->acknowledge(consumer, position);
+				journals.at(priority)->compact();
+			}
+		}
+
+		auto status = report(queue, journals);
+		status["read"] = read;
+		status["invoked"] = invoked.load();
+		status["failed"] = failed.load();
+		status["deduplicated"] = deduplicated;
+		status["invocations"] = batches;
+
+		pe::client_message(
+			{{"0.message", fmt::format("{} drained queue [{}]", ctx.policy_name, queue)}, {"1.status", status}});
+
+		*out = status.dump();
+
+		return SUCCESS();
+
+	} // drain
+
+	irods::error work_queue_policy(const pe::context& ctx, pe::arg_type out)
+	{
+		const auto mode = pc::get(ctx.configuration, "mode", std::string{"enqueue"});
+
+		if ("enqueue" == mode) {
+			return enqueue(ctx);
+		}
+
+		if ("drain" == mode) {
+			return drain(ctx, out);
+		}
+
+		if ("status" == mode) {
+			const auto queue = pc::get(ctx.configuration, "queue", std::string{"default"});
+			auto journals = open_priorities(ctx.configuration, get_queue_directory(ctx.configuration));
+			const auto status = report(queue, journals);
+
+			pe::client_message(
+				{{"0.message", fmt::format("{} queue [{}]", ctx.policy_name, queue)}, {"1.status", status}});
+
+			*out = status.dump();
+
+			return SUCCESS();
+		}
+
+		return ERROR(SYS_INVALID_INPUT_PARAM, fmt::format("irods_policy_work_queue - unknown mode [{}]", mode));
+
+	} // work_queue_policy
+
+} // namespace
+
+const char usage[] = R"(
+{
+    "id": "file:///var/lib/irods/configuration_schemas/v3/policy_engine_usage.json",
+    "$schema": "http://json-schema.org/draft-04/schema#",
+    "description": ""
+        "input_interfaces": [
+            {
+                "name" :  "event_handler-data_object_modified",
+                "description" : "",
+                "json_schema" : ""
+            },
+            {
+                "name" :  "direct_invocation",
+                "description" : "",
+                "json_schema" : ""
+            }
+        ],
+    "output_json_for_validation" : ""
+}
+)";
+
+extern "C" pe::plugin_pointer_type plugin_factory(const std::string& _plugin_name, const std::string&)
+{
+	return pe::make(_plugin_name, "irods_policy_work_queue", usage, work_queue_policy);
+
+} // plugin_factory
@@ -0,0 +1,212 @@
+// measures the cost of the rule_exists check made by the server for each policy enforcement point
+// of an api call: the regex registered with the RuleExistsHelper, followed by the lookup of the
+// policy enforcement point among those consumed by the instance.  before, the catch-all "pep_.*" was
+// registered and every clause of every registered operation was consumed.  after, only the clauses
+// of the configured policies are consumed, here a single policy of the post clause of the data object
+// modified event handler, and a regex of exactly those names is registered: either as a flat list of
+// alternatives, or factored by prefix as consume_policy_enforcement_points builds it.  a policy
+// enforcement point which passes both checks is routed to exec_rule
+//
+//     g++ -O2 -std=c++17 rule_exists_regex.cpp -lboost_regex -o rule_exists_regex
+//     ./rule_exists_regex [iterations]
+
+#include <boost/regex.hpp>
+
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <regex>
+#include <set>
+#include <string>
+#include <vector>
+
+namespace
+{
+	// clang-format off
+    using clock_type = std::chrono::steady_clock;
+	// clang-format on
+
+	// the operations registered by the data object modified event handler
+	const std::vector<std::string> registered_api_operations{
+		"data_obj_put",
+		"data_obj_get",
+		"data_obj_unlink",
+		"data_obj_repl",
+		"phy_path_reg",
+		"data_obj_truncate",
+		"data_obj_trim",
+		"data_obj_chksum",
+		"data_obj_create",
+		"data_obj_open",
+		"data_obj_close",
+		"replica_open",
+		"replica_close",
+		"data_obj_lseek",
+		"data_obj_rename",
+		"data_obj_copy",
+		"bulk_data_obj_put"};
+
+	const std::vector<std::string> registered_resource_operations{"resolve_hierarchy"};
+
+	// the policy enforcement points fired by an iput, an iget, an ils and an imeta ls, in which
+	// most api calls are not consumed by the event handler at all
+	const std::vector<std::string> fired_api_operations{
+		"auth_request",
+		"auth_response",
+		"get_misc_svr_info",
+		"obj_stat",
+		"gen_query",
+		"data_obj_put",
+		"get_resource_info_for_operation",
+		"data_obj_get",
+		"data_obj_open",
+		"data_obj_read",
+		"data_obj_close",
+		"open_collection",
+		"read_collection",
+		"close_collection",
+		"mod_avu_metadata",
+		"gen_query"};
+
+	const std::vector<std::string>
+		fired_resource_operations{"resolve_hierarchy", "create", "open", "read", "write", "close", "stat", "modified"};
+
+	const std::vector<std::string> fired_database_operations{
+		"check_auth",
+		"gen_query",
+		"reg_data_obj",
+		"mod_data_obj_meta",
+		"mod_avu_metadata"};
+
+	auto consumed_policy_enforcement_points(const std::vector<std::string>& _clauses) -> std::set<std::string>
+	{
+		std::set<std::string> consumed{};
+		for (const auto& c : _clauses) {
+			for (const auto& o : registered_api_operations) {
+				consumed.insert("pep_api_" + o + "_" + c);
+			}
+
+			for (const auto& o : registered_resource_operations) {
+				consumed.insert("pep_resource_" + o + "_" + c);
+			}
+		}
+
+		return consumed;
+
+	} // consumed_policy_enforcement_points
+
+	auto join(const std::vector<std::string>& _names) -> std::string
+	{
+		std::string joined{};
+		for (const auto& n : _names) {
+			joined += (joined.empty() ? "" : "|") + n;
+		}
+
+		return joined;
+
+	} // join
+
+	auto flat_regex(const std::set<std::string>& _consumed) -> std::string
+	{
+		return "^(" + join({_consumed.begin(), _consumed.end()}) + ")$";
+
+	} // flat_regex
+
+	auto factored_regex(const std::vector<std::string>& _clauses) -> std::string
+	{
+		std::vector<std::string> operations{};
+		for (const auto& o : registered_api_operations) {
+			operations.push_back("api_" + o);
+		}
+
+		for (const auto& o : registered_resource_operations) {
+			operations.push_back("resource_" + o);
+		}
+
+		return "^pep_(?:(?:" + join(operations) + ")_(?:" + join(_clauses) + "))$";
+
+	} // factored_regex
+
+	auto fired_policy_enforcement_points() -> std::vector<std::string>
+	{
+		std::vector<std::string> peps{};
+
+		const auto fire = [&peps](const std::string& _interface, const std::vector<std::string>& _operations) {
+			for (const auto& o : _operations) {
+				for (const auto& c : {"pre", "post", "finally"}) {
+					peps.push_back("pep_" + _interface + "_" + o + "_" + c);
+				}
+			}
+		};
+
+		fire("api", fired_api_operations);
+		fire("resource", fired_resource_operations);
+		fire("database", fired_database_operations);
+
+		return peps;
+
+	} // fired_policy_enforcement_points
+
+	template <typename Regex, typename Match>
+	void measure(
+		const char* _name,
+		const Regex& _regex,
+		Match _match,
+		const std::set<std::string>& _consumed,
+		const std::vector<std::string>& _peps,
+		const std::size_t _iterations)
+	{
+		const auto rule_exists = [&](const std::string& _pep) {
+			return _match(_pep, _regex) && _consumed.count(_pep) > 0;
+		};
+
+		std::size_t routed{};
+		for (const auto& p : _peps) {
+			routed += rule_exists(p) ? 1 : 0;
+		}
+
+		volatile std::size_t sink{};
+
+		const auto start = clock_type::now();
+		for (std::size_t i = 0; i < _iterations; ++i) {
+			for (const auto& p : _peps) {
+				sink = sink + (rule_exists(p) ? 1 : 0);
+			}
+		}
+		const auto elapsed = std::chrono::duration<double, std::micro>(clock_type::now() - start).count();
+
+		std::printf(
+			"%-36s %6.1f us per workload  %4zu of %zu policy enforcement points routed to exec_rule\n",
+			_name,
+			elapsed / _iterations,
+			routed,
+			_peps.size());
+
+	} // measure
+
+} // namespace
+
+int main(int _argc, char** _argv)
+{
+	const std::size_t iterations = _argc > 1 ? std::strtoull(_argv[1], nullptr, 10) : 20000;
+
+	const auto peps = fired_policy_enforcement_points();
+
+	const auto before = consumed_policy_enforcement_points({"pre", "post", "except", "finally"});
+	const auto after = consumed_policy_enforcement_points({"post"});
+	const auto flat = flat_regex(after);
+	const auto factored = factored_regex({"post"});
+
+	const auto boost_match = [](const std::string& _s, const boost::regex& _r) { return boost::regex_match(_s, _r); };
+	const auto std_match = [](const std::string& _s, const std::regex& _r) { return std::regex_match(_s, _r); };
+
+	measure("before,  boost::regex \"pep_.*\"", boost::regex{"pep_.*"}, boost_match, before, peps, iterations);
+	measure("flat,    boost::regex", boost::regex{flat}, boost_match, after, peps, iterations);
+	measure("factored boost::regex", boost::regex{factored}, boost_match, after, peps, iterations);
+	measure("before,  std::regex \"pep_.*\"", std::regex{"pep_.*"}, std_match, before, peps, iterations);
+	measure("flat,    std::regex", std::regex{flat}, std_match, after, peps, iterations);
+	measure("factored std::regex", std::regex{factored}, std_match, after, peps, iterations);
+
+	return 0;
+
+} // main
@@ -4,6 +4,7 @@ import time
 import contextlib
 import tempfile
 import shutil
+import json
 
 import os.path
 
@@ -31,22 +32,595 @@ class TestPolicyEngineVerifyChecksum(ResourceBase, unittest.TestCase):
         super(TestPolicyEngineVerifyChecksum, self).tearDown()
 
     @contextlib.contextmanager
-    def filesystem_usage_configured(self):
+    def filesystem_usage_configured(self, plugin_specific_configuration=None):
         filename = paths.server_config_path()
 
         irods_config = IrodsConfig()
         irods_config.server_config['advanced_settings']['delay_server_sleep_time_in_seconds'] = 1
 
+        if plugin_specific_configuration is None:
+            plugin_specific_configuration = { "log_errors" : "true" }
+
+        irods_config.server_config['plugin_configuration']['rule_engines'].insert(0,
+               {
+                    "instance_name": "irods_rule_engine_plugin-policy_engine-verify_checksum-instance",
+                    "plugin_name": "irods_rule_engine_plugin-policy_engine-verify_checksum",
+                    "plugin_specific_configuration": plugin_specific_configuration
+               }
+            )
+
+
+        try:
+            with lib.file_backed_up(filename):
+                irods_config.commit(irods_config.server_config, irods_config.server_config_path)
+                IrodsController().reload_configuration()
+                yield
+        finally:
+            IrodsController().reload_configuration()
+
+    def test_verify_checksum_success(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            value = ""
+
+            try:
+                rule = """
+{
+    "policy_to_invoke" : "irods_policy_execute_rule",
+    "parameters" : {
+        "policy_to_invoke"    : "irods_policy_verify_checksum",
+        "parameters" : {
+            "logical_path" : "/tempZone/home/rods/file0",
+            "source_resource" : "demoResc"
+        }
+    }
+}
+INPUT null
+OUTPUT ruleExecOut
+"""
+
+                rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+                with open(rule_file, 'w') as f:
+                    f.write(rule)
+
+                admin_session.assert_icommand(['iput', '-fK', rule_file, 'file0'])
+
+                out = 'need more scope'
+                with self.filesystem_usage_configured():
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'usage')
+
+            finally:
+                admin_session.assert_icommand('irm -f ' + 'file0')
+                print('annnnd... were done\n')
+
+
+    def test_verify_checksum_failure(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            value = ""
+
+            try:
+                rule = """
+{
+    "policy_to_invoke" : "irods_policy_execute_rule",
+    "parameters" : {
+        "policy_to_invoke"    : "irods_policy_verify_checksum",
+        "parameters" : {
+            "logical_path" : "/tempZone/home/rods/file0",
+            "source_resource" : "demoResc"
+        }
+    }
+}
+INPUT null
+OUTPUT ruleExecOut
+"""
+
+                rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+                with open(rule_file, 'w') as f:
+                    f.write(rule)
+
+                admin_session.assert_icommand(['iput', '-fK', rule_file, 'file0'])
+
+                with open('/var/lib/irods/Vault/home/rods/file0', 'w') as f:
+                    f.write('X')
+
+                out = 'need more scope'
+                with self.filesystem_usage_configured():
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'failed')
+
+            finally:
+                admin_session.assert_icommand('irm -f ' + 'file0')
+                print('annnnd... were done\n')
+
+    def test_verify_checksum_parallel_records_manifest(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            try:
+                rule = """
+{
+    "policy_to_invoke" : "irods_policy_execute_rule",
+    "parameters" : {
+        "policy_to_invoke"    : "irods_policy_verify_checksum",
+        "parameters" : {
+            "logical_path" : "/tempZone/home/rods/file0",
+            "source_resource" : "demoResc"
+        }
+    }
+}
+INPUT null
+OUTPUT ruleExecOut
+"""
+
+                rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+                with open(rule_file, 'w') as f:
+                    f.write(rule)
+
+                admin_session.assert_icommand(['iput', '-fK', rule_file, 'file0'])
+
+                configuration = {
+                    "log_errors" : "true",
+                    "checksum_mode" : "parallel",
+                    "number_of_threads" : 4,
+                    "chunk_size_in_bytes" : 16
+                }
+
+                with self.filesystem_usage_configured(configuration):
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'manifest')
+
+                    admin_session.assert_icommand('imeta ls -d /tempZone/home/rods/file0', 'STDOUT_SINGLELINE', 'irods::verification::sha256_manifest')
+
+                    # an overwrite changes the catalog checksum, and the manifest is recorded again
+                    lib.create_local_testfile('file0_overwrite')
+                    admin_session.assert_icommand(['iput', '-fK', 'file0_overwrite', 'file0'])
+                    os.remove('file0_overwrite')
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'manifest')
+
+                    with open('/var/lib/irods/Vault/home/rods/file0', 'r+') as f:
+                        f.write('X')
+
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'failed')
+
+            finally:
+                admin_session.assert_icommand('irm -f ' + 'file0')
+
+    def test_verify_checksum_parallel_refuses_replica_without_checksum(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            try:
+                rule = """
+{
+    "policy_to_invoke" : "irods_policy_execute_rule",
+    "parameters" : {
+        "policy_to_invoke"    : "irods_policy_verify_checksum",
+        "parameters" : {
+            "logical_path" : "/tempZone/home/rods/file0",
+            "source_resource" : "demoResc"
+        }
+    }
+}
+INPUT null
+OUTPUT ruleExecOut
+"""
+
+                rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+                with open(rule_file, 'w') as f:
+                    f.write(rule)
+
+                # the replica is put without a checksum
+                admin_session.assert_icommand(['iput', '-f', rule_file, 'file0'])
+
+                configuration = {
+                    "log_errors" : "true",
+                    "checksum_mode" : "parallel",
+                    "number_of_threads" : 4,
+                    "chunk_size_in_bytes" : 16
+                }
+
+                with self.filesystem_usage_configured(configuration):
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDERR_SINGLELINE', 'CAT_NO_CHECKSUM_FOR_REPLICA')
+
+                    admin_session.assert_icommand_fail('imeta ls -d /tempZone/home/rods/file0', 'STDOUT_SINGLELINE', 'irods::verification::sha256_manifest')
+
+            finally:
+                admin_session.assert_icommand('irm -f ' + 'file0')
+
+    def test_verify_checksum_sampled_records_digests(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            try:
+                rule = """
+{
+    "policy_to_invoke" : "irods_policy_execute_rule",
+    "parameters" : {
+        "policy_to_invoke"    : "irods_policy_verify_checksum",
+        "parameters" : {
+            "logical_path" : "/tempZone/home/rods/file0",
+            "source_resource" : "demoResc"
+        }
+    }
+}
+INPUT null
+OUTPUT ruleExecOut
+"""
+
+                rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+                with open(rule_file, 'w') as f:
+                    f.write(rule)
+
+                admin_session.assert_icommand(['iput', '-fK', rule_file, 'file0'])
+
+                configuration = {
+                    "log_errors" : "true",
+                    "checksum_mode" : "sampled",
+                    "sample_fraction" : 1.0,
+                    "number_of_ranges" : 4
+                }
+
+                with self.filesystem_usage_configured(configuration):
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'usage')
+
+                    admin_session.assert_icommand('imeta ls -d /tempZone/home/rods/file0', 'STDOUT_SINGLELINE', 'irods::verification::sampled_digests')
+
+                    with open('/var/lib/irods/Vault/home/rods/file0', 'r+') as f:
+                        f.write('X')
+
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'failed')
+
+            finally:
+                admin_session.assert_icommand('irm -f ' + 'file0')
+
+class TestPolicyEngineScrubber(ResourceBase, unittest.TestCase):
+    def setUp(self):
+        super(TestPolicyEngineScrubber, self).setUp()
+
+    def tearDown(self):
+        super(TestPolicyEngineScrubber, self).tearDown()
+
+    @contextlib.contextmanager
+    def scrubber_configured(self):
+        filename = paths.server_config_path()
+
+        irods_config = IrodsConfig()
+        irods_config.server_config['advanced_settings']['delay_server_sleep_time_in_seconds'] = 1
+
+        irods_config.server_config['plugin_configuration']['rule_engines'].insert(0,
+               {
+                    "instance_name": "irods_rule_engine_plugin-policy_engine-scrubber-instance",
+                    "plugin_name": "irods_rule_engine_plugin-policy_engine-scrubber",
+                    "plugin_specific_configuration": {
+                        "log_errors" : "true",
+                        "verification_type" : "filesystem",
+                        "bytes_per_second" : 1048576,
+                        "operations_per_second" : 100,
+                        "time_slice_in_seconds" : 10,
+                        "latency_threshold_in_milliseconds" : 1000
+                    }
+               }
+            )
+
+        try:
+            with lib.file_backed_up(filename):
+                irods_config.commit(irods_config.server_config, irods_config.server_config_path)
+                IrodsController().reload_configuration()
+                yield
+        finally:
+            IrodsController().reload_configuration()
+
+    def test_scrubber_pass(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            try:
+                rule = """
+{
+    "policy_to_invoke" : "irods_policy_execute_rule",
+    "parameters" : {
+        "policy_to_invoke"    : "irods_policy_scrubber",
+        "parameters" : {
+            "source_resource" : "demoResc"
+        }
+    }
+}
+INPUT null
+OUTPUT ruleExecOut
+"""
+
+                rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+                with open(rule_file, 'w') as f:
+                    f.write(rule)
+
+                admin_session.assert_icommand(['iput', '-f', rule_file, 'file0'])
+
+                with self.scrubber_configured():
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'usage')
+                    admin_session.assert_icommand('imeta ls -R demoResc', 'STDOUT_SINGLELINE', 'irods::scrubber::last_pass_completed')
+
+                    with open('/var/lib/irods/Vault/home/rods/file0', 'a') as f:
+                        f.write('X')
+
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'usage')
+                    admin_session.assert_icommand('imeta ls -d /tempZone/home/rods/file0', 'STDOUT_SINGLELINE', 'irods::scrubber::verification_failed::demoResc')
+
+            finally:
+                admin_session.assert_icommand('irm -f ' + 'file0')
+                admin_session.assert_icommand('imeta rm -R demoResc irods::scrubber::cursor 0')
+                admin_session.assert_icommand('imeta rmw -R demoResc irods::scrubber::last_pass_completed %')
+
+class TestPolicyEnginePromotion(ResourceBase, unittest.TestCase):
+    def setUp(self):
+        super(TestPolicyEnginePromotion, self).setUp()
+
+    def tearDown(self):
+        super(TestPolicyEnginePromotion, self).tearDown()
+
+    @contextlib.contextmanager
+    def promotion_configured(self):
+        filename = paths.server_config_path()
+
+        irods_config = IrodsConfig()
+
+        irods_config.server_config['plugin_configuration']['rule_engines'].insert(0,
+               {
+                    "instance_name": "irods_rule_engine_plugin-event_handler-data_object_modified-instance",
+                    "plugin_name": "irods_rule_engine_plugin-event_handler-data_object_modified",
+                    "plugin_specific_configuration": {
+                        "access_tracking" : {
+                            "merge_interval_in_seconds" : 0
+                        },
+                        "policies_to_invoke" : []
+                    }
+               }
+            )
+
+        irods_config.server_config['plugin_configuration']['rule_engines'].insert(0,
+               {
+                    "instance_name": "irods_rule_engine_plugin-policy_engine-data_replication-instance",
+                    "plugin_name": "irods_rule_engine_plugin-policy_engine-data_replication",
+                    "plugin_specific_configuration": {
+                        "log_errors" : "true"
+                    }
+               }
+            )
+
+        irods_config.server_config['plugin_configuration']['rule_engines'].insert(0,
+               {
+                    "instance_name": "irods_rule_engine_plugin-policy_engine-promotion-instance",
+                    "plugin_name": "irods_rule_engine_plugin-policy_engine-promotion",
+                    "plugin_specific_configuration": {
+                        "log_errors" : "true",
+                        "hotness_threshold" : 3,
+                        "destination_resource" : "AnotherResc"
+                    }
+               }
+            )
+
+        try:
+            with lib.file_backed_up(filename):
+                irods_config.commit(irods_config.server_config, irods_config.server_config_path)
+                IrodsController().reload_configuration()
+                yield
+        finally:
+            IrodsController().reload_configuration()
+
+    def test_promotion_of_hot_object(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            filename = 'test_promotion_file'
+            lib.create_local_testfile(filename)
+            logical_path = '/tempZone/home/rods/' + filename
+
+            try:
+                rule = """
+{
+    "policy_to_invoke" : "irods_policy_execute_rule",
+    "parameters" : {
+        "policy_to_invoke"    : "irods_policy_promotion",
+        "parameters" : {
+            "logical_path" : "/tempZone/home/rods/test_promotion_file"
+        }
+    }
+}
+INPUT null
+OUTPUT ruleExecOut
+"""
+
+                rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+                with open(rule_file, 'w') as f:
+                    f.write(rule)
+
+                with self.promotion_configured():
+                    admin_session.assert_icommand('iput -R demoResc ' + filename + ' ' + logical_path)
+
+                    # a single access is below the threshold
+                    admin_session.assert_icommand('iget -f ' + logical_path + ' ' + filename)
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'usage')
+                    admin_session.assert_icommand_fail('ils -l ' + logical_path, 'STDOUT_SINGLELINE', 'AnotherResc')
+
+                    for i in range(3):
+                        admin_session.assert_icommand('iget -f ' + logical_path + ' ' + filename)
+
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'usage')
+                    admin_session.assert_icommand('ils -l ' + logical_path, 'STDOUT_SINGLELINE', 'AnotherResc')
+                    admin_session.assert_icommand('imeta ls -d ' + logical_path, 'STDOUT_SINGLELINE', 'irods::promotion::promoted::AnotherResc')
+
+            finally:
+                admin_session.run_icommand('irm -f ' + logical_path)
+                os.remove(filename)
+
+class TestPolicyEngineWorkQueue(ResourceBase, unittest.TestCase):
+    def setUp(self):
+        super(TestPolicyEngineWorkQueue, self).setUp()
+
+    def tearDown(self):
+        super(TestPolicyEngineWorkQueue, self).tearDown()
+
+    @contextlib.contextmanager
+    def work_queue_configured(self):
+        filename = paths.server_config_path()
+
+        irods_config = IrodsConfig()
+
+        irods_config.server_config['plugin_configuration']['rule_engines'].insert(0,
+               {
+                    "instance_name": "irods_rule_engine_plugin-event_handler-data_object_modified-instance",
+                    "plugin_name": "irods_rule_engine_plugin-event_handler-data_object_modified",
+                    "plugin_specific_configuration": {
+                        "policies_to_invoke" : [
+                            {
+                                "active_policy_clauses" : ["post"],
+                                "events" : ["put", "write"],
+                                "policy_to_invoke" : "irods_policy_work_queue",
+                                "parameters" : {
+                                    "policy_to_invoke" : "irods_policy_testing_policy"
+                                }
+                            }
+                        ]
+                    }
+               }
+            )
+
+        irods_config.server_config['plugin_configuration']['rule_engines'].insert(0,
+               {
+                    "instance_name": "irods_rule_engine_plugin-policy_engine-testing_policy-instance",
+                    "plugin_name": "irods_rule_engine_plugin-policy_engine-testing_policy",
+                    "plugin_specific_configuration": {
+                        "log_errors" : "true"
+                    }
+               }
+            )
+
+        irods_config.server_config['plugin_configuration']['rule_engines'].insert(0,
+               {
+                    "instance_name": "irods_rule_engine_plugin-policy_engine-work_queue-instance",
+                    "plugin_name": "irods_rule_engine_plugin-policy_engine-work_queue",
+                    "plugin_specific_configuration": {
+                        "log_errors" : "true",
+                        "queue" : "test_work_queue",
+                        "deduplicate" : True
+                    }
+               }
+            )
+
+        try:
+            with lib.file_backed_up(filename):
+                irods_config.commit(irods_config.server_config, irods_config.server_config_path)
+                IrodsController().reload_configuration()
+                yield
+        finally:
+            IrodsController().reload_configuration()
+
+    def test_work_queue_deduplicates_and_drains(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            filename = 'test_work_queue_file'
+            lib.create_local_testfile(filename)
+            logical_path = '/tempZone/home/rods/' + filename
+
+            rule = """
+{
+    "policy_to_invoke" : "irods_policy_execute_rule",
+    "parameters" : {
+        "policy_to_invoke" : "irods_policy_work_queue",
+        "configuration" : {
+            "mode" : "drain"
+        }
+    }
+}
+INPUT null
+OUTPUT ruleExecOut
+"""
+
+            rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+            with open(rule_file, 'w') as f:
+                f.write(rule)
+
+            try:
+                with self.work_queue_configured():
+                    admin_session.assert_icommand('iput ' + filename + ' ' + logical_path)
+                    admin_session.assert_icommand('iput -f ' + filename + ' ' + logical_path)
+
+                    # nothing is invoked until the queue is drained
+                    admin_session.assert_icommand_fail('imeta ls -d ' + logical_path, 'STDOUT_SINGLELINE', 'irods_policy_testing_policy')
+
+                    # both puts are merged into a single invocation of the policy
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', '"deduplicated": 1')
+                    admin_session.assert_icommand('imeta ls -d ' + logical_path, 'STDOUT_SINGLELINE', 'irods_policy_testing_policy')
+            finally:
+                admin_session.run_icommand('irm -f ' + logical_path)
+                os.remove(filename)
+                os.remove(rule_file)
+
+    def test_work_queue_invokes_work_as_its_user(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            filename = 'test_work_queue_user_file'
+            lib.create_local_testfile(filename)
+            logical_path = self.user0.session_collection + '/' + filename
+
+            rule = """
+{
+    "policy_to_invoke" : "irods_policy_execute_rule",
+    "parameters" : {
+        "policy_to_invoke" : "irods_policy_work_queue",
+        "configuration" : {
+            "mode" : "drain"
+        }
+    }
+}
+INPUT null
+OUTPUT ruleExecOut
+"""
+
+            rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+            with open(rule_file, 'w') as f:
+                f.write(rule)
+
+            try:
+                with self.work_queue_configured():
+                    # the work is enqueued by a user other than the service account
+                    self.user0.assert_icommand('iput ' + filename + ' ' + logical_path)
+
+                    # the drain invokes the work through a connection acting for that user
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', '"failed": 0')
+                    self.user0.assert_icommand('imeta ls -d ' + logical_path, 'STDOUT_SINGLELINE', 'irods_policy_testing_policy')
+            finally:
+                self.user0.run_icommand('irm -f ' + logical_path)
+                os.remove(filename)
+                os.remove(rule_file)
+
+class TestPolicyEngineScheduler(ResourceBase, unittest.TestCase):
+    def setUp(self):
+        super(TestPolicyEngineScheduler, self).setUp()
+
+    def tearDown(self):
+        super(TestPolicyEngineScheduler, self).tearDown()
+
+    @contextlib.contextmanager
+    def scheduler_configured(self, logical_path):
+        filename = paths.server_config_path()
+
+        irods_config = IrodsConfig()
+
         irods_config.server_config['plugin_configuration']['rule_engines'].insert(0,
                {
-                    "instance_name": "irods_rule_engine_plugin-policy_engine-verify_checksum-instance",
-                    "plugin_name": "irods_rule_engine_plugin-policy_engine-verify_checksum",
+                    "instance_name": "irods_rule_engine_plugin-policy_engine-testing_policy-instance",
+                    "plugin_name": "irods_rule_engine_plugin-policy_engine-testing_policy",
                     "plugin_specific_configuration": {
                         "log_errors" : "true"
                     }
                }
             )
 
+        irods_config.server_config['plugin_configuration']['rule_engines'].insert(0,
+               {
+                    "instance_name": "irods_rule_engine_plugin-policy_engine-scheduler-instance",
+                    "plugin_name": "irods_rule_engine_plugin-policy_engine-scheduler",
+                    "plugin_specific_configuration": {
+                        "log_errors" : "true",
+                        "jobs" : [
+                            {
+                                "name" : "test_scheduler_job",
+                                "interval_in_seconds" : 2,
+                                "policy_to_invoke" : "irods_policy_testing_policy",
+                                "parameters" : {
+                                    "event" : "SCHEDULED",
+                                    "logical_path" : logical_path
+                                }
+                            }
+                        ]
+                    }
+               }
+            )
 
         try:
             with lib.file_backed_up(filename):
@@ -56,77 +630,46 @@ class TestPolicyEngineVerifyChecksum(ResourceBase, unittest.TestCase):
         finally:
             IrodsController().reload_configuration()
 
-    def test_verify_checksum_success(self):
+    def test_scheduler_runs_job(self):
         with session.make_session_for_existing_admin() as admin_session:
-            value = ""
+            filename = 'test_scheduler_file'
+            lib.create_local_testfile(filename)
+            logical_path = '/tempZone/home/rods/' + filename
 
-            try:
-                rule = """
+            rule = """
 {
     "policy_to_invoke" : "irods_policy_execute_rule",
     "parameters" : {
-        "policy_to_invoke"    : "irods_policy_verify_checksum",
-        "parameters" : {
-            "logical_path" : "/tempZone/home/rods/file0",
-            "source_resource" : "demoResc"
-        }
+        "policy_to_invoke" : "irods_policy_scheduler"
     }
 }
 INPUT null
 OUTPUT ruleExecOut
 """
 
-                rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
-                with open(rule_file, 'w') as f:
-                    f.write(rule)
-
-                admin_session.assert_icommand(['iput', '-fK', rule_file, 'file0'])
-
-                out = 'need more scope'
-                with self.filesystem_usage_configured():
-                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'usage')
-
-            finally:
-                admin_session.assert_icommand('irm -f ' + 'file0')
-                print('annnnd... were done\n')
-
-
-    def test_verify_checksum_failure(self):
-        with session.make_session_for_existing_admin() as admin_session:
-            value = ""
+            rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+            with open(rule_file, 'w') as f:
+                f.write(rule)
 
             try:
-                rule = """
-{
-    "policy_to_invoke" : "irods_policy_execute_rule",
-    "parameters" : {
-        "policy_to_invoke"    : "irods_policy_verify_checksum",
-        "parameters" : {
-            "logical_path" : "/tempZone/home/rods/file0",
-            "source_resource" : "demoResc"
-        }
-    }
-}
-INPUT null
-OUTPUT ruleExecOut
-"""
-
-                rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
-                with open(rule_file, 'w') as f:
-                    f.write(rule)
-
-                admin_session.assert_icommand(['iput', '-fK', rule_file, 'file0'])
+                admin_session.assert_icommand('iput ' + filename + ' ' + logical_path)
 
-                with open('/var/lib/irods/Vault/home/rods/file0', 'w') as f:
-                    f.write('X')
+                with self.scheduler_configured(logical_path):
+                    # the job is run by the timer of whichever process of the server leads
+                    out = ''
+                    for i in range(20):
+                        out, err, ec = admin_session.run_icommand('imeta ls -d ' + logical_path)
+                        if out.find('SCHEDULED') != -1:
+                            break
+                        time.sleep(1)
 
-                out = 'need more scope'
-                with self.filesystem_usage_configured():
-                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'failed')
+                    assert(out.find('SCHEDULED') != -1)
 
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'last_duration_in_milliseconds')
             finally:
-                admin_session.assert_icommand('irm -f ' + 'file0')
-                print('annnnd... were done\n')
+                admin_session.run_icommand('irm -f ' + logical_path)
+                os.remove(filename)
+                os.remove(rule_file)
 
 class TestPolicyEngineQueryProcessor(ResourceBase, unittest.TestCase):
     def setUp(self):
@@ -170,6 +713,15 @@ class TestPolicyEngineQueryProcessor(ResourceBase, unittest.TestCase):
                }
             )
 
+        irods_config.server_config['plugin_configuration']['rule_engines'].insert(0,
+               {
+                    "instance_name": "irods_rule_engine_plugin-policy_engine-verify_checksum-instance",
+                    "plugin_name": "irods_rule_engine_plugin-policy_engine-verify_checksum",
+                    "plugin_specific_configuration": {
+                    }
+               }
+            )
+
 
         try:
             with lib.file_backed_up(filename):
@@ -502,6 +1054,63 @@ OUTPUT ruleExecOut"""
                 admin_session.assert_icommand('iadmin rum')
 
 
+    def test_query_invocation_skips_recently_verified(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            try:
+                filename = 'test_put_file'
+                lib.create_local_testfile(filename)
+                admin_session.assert_icommand('iput -K ' + filename)
+                admin_session.assert_icommand('ils -l', 'STDOUT_SINGLELINE', filename)
+
+                rule = """
+{
+    "policy_to_invoke" : "irods_policy_execute_rule",
+    "parameters" : {
+        "policy_to_invoke" : "irods_policy_query_processor",
+        "parameters" : {
+              "query_string" : "SELECT USER_NAME, COLL_NAME, DATA_NAME, RESC_NAME WHERE COLL_NAME = '/tempZone/home/rods' AND DATA_NAME = 'test_put_file'",
+              "query_limit" : 1,
+              "query_type" : "general",
+              "number_of_threads" : 1,
+              "min_reverify_interval" : 3600,
+              "policies_to_invoke" : [
+                  {
+                      "policy_to_invoke" : "irods_policy_verify_checksum",
+                      "configuration" : {
+                      }
+                  },
+                  {
+                      "policy_to_invoke" : "irods_policy_testing_policy",
+                      "configuration" : {
+                      }
+                  }
+              ]
+         }
+    }
+}
+INPUT null
+OUTPUT ruleExecOut"""
+
+                rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+                with open(rule_file, 'w') as f:
+                    f.write(rule)
+
+                with self.query_processor_configured():
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'usage')
+                    admin_session.assert_icommand('imeta ls -d ' + filename, 'STDOUT_SINGLELINE', 'irods::verification::last_verified::demoResc')
+                    admin_session.assert_icommand('imeta ls -d ' + filename, 'STDOUT_SINGLELINE', 'irods_policy_testing_policy')
+
+                    # the replica was verified and is unchanged, the row is skipped
+                    admin_session.assert_icommand('imeta rm -d ' + filename + ' irods_policy_testing_policy unspecified')
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'usage')
+                    out, err, ec = admin_session.run_icommand('imeta ls -d ' + filename)
+                    lib.log_command_result('imeta ls -d ' + filename, out, err, ec)
+                    assert(out.find('irods_policy_testing_policy') == -1)
+            finally:
+                admin_session.assert_icommand('irm -f ' + filename)
+                admin_session.assert_icommand('iadmin rum')
+
+
     def test_query_to_query_invocation(self):
         with session.make_session_for_existing_admin() as admin_session:
             try:
@@ -564,7 +1173,7 @@ class TestEventHandlerObjectModified(ResourceBase, unittest.TestCase):
         super(TestEventHandlerObjectModified, self).tearDown()
 
     @contextlib.contextmanager
-    def event_handler_configured(self):
+    def event_handler_configured(self, seek_events=None, required_fields=None, active_policy_clauses=None):
         filename = paths.server_config_path()
 
         irods_config = IrodsConfig()
@@ -591,6 +1200,15 @@ class TestEventHandlerObjectModified(ResourceBase, unittest.TestCase):
                 }
             )
 
+        if seek_events:
+            irods_config.server_config['plugin_configuration']['rule_engines'][0]['plugin_specific_configuration']['seek_events'] = seek_events
+
+        if required_fields:
+            irods_config.server_config['plugin_configuration']['rule_engines'][0]['plugin_specific_configuration']['policies_to_invoke'][0]['required_fields'] = required_fields
+
+        if active_policy_clauses:
+            irods_config.server_config['plugin_configuration']['rule_engines'][0]['plugin_specific_configuration']['policies_to_invoke'][0]['active_policy_clauses'] = active_policy_clauses
+
         irods_config.server_config['plugin_configuration']['rule_engines'].insert(0,
                {
                     "instance_name": "irods_rule_engine_plugin-policy_engine-testing_policy-instance",
@@ -610,6 +1228,115 @@ class TestEventHandlerObjectModified(ResourceBase, unittest.TestCase):
         finally:
             IrodsController().reload_configuration()
 
+    @contextlib.contextmanager
+    def event_handler_accounting_configured(self):
+        filename = paths.server_config_path()
+
+        irods_config = IrodsConfig()
+
+        irods_config.server_config['plugin_configuration']['rule_engines'].insert(0,
+                {
+                    "instance_name": "irods_rule_engine_plugin-event_handler-data_object_modified-instance",
+                    "plugin_name": "irods_rule_engine_plugin-event_handler-data_object_modified",
+                    'plugin_specific_configuration': {
+                        "byte_accounting" : {
+                            "flush_threshold_in_events" : 1
+                        },
+                        "policies_to_invoke" : []
+                    }
+                }
+            )
+
+        try:
+            with lib.file_backed_up(filename):
+                irods_config.commit(irods_config.server_config, irods_config.server_config_path)
+                IrodsController().reload_configuration()
+                yield
+        finally:
+            IrodsController().reload_configuration()
+
+    @contextlib.contextmanager
+    def event_handler_asynchronous_configured(self, events=None, coalesce_window_in_milliseconds=0, batch_capable=False, journal=False, when_shed=None):
+        filename = paths.server_config_path()
+
+        irods_config = IrodsConfig()
+
+        policy = {
+                     "active_policy_clauses" : ["post"],
+                     "events" : events or ["put"],
+                     "dispatch" : "asynchronous",
+                     "policy_to_invoke"    : "irods_policy_testing_policy",
+                     "configuration" : {
+                     }
+                 }
+
+        if coalesce_window_in_milliseconds > 0:
+            policy["coalesce_window_in_milliseconds"] = coalesce_window_in_milliseconds
+
+        # a batch capable policy is invoked synchronously with the whole batch
+        if batch_capable:
+            del policy["dispatch"]
+            policy["batch_capable"] = True
+
+        configuration = {
+            "asynchronous_dispatch" : {
+                "number_of_workers" : 2,
+                "overflow" : "spill"
+            },
+            "policies_to_invoke" : [policy]
+        }
+
+        # a threshold of one millisecond sheds the low priority policy once a catalog bound api call,
+        # such as a rename, is observed
+        if when_shed:
+            policy["priority"] = "low"
+            policy["when_shed"] = when_shed
+            configuration["load_shedding"] = {
+                "api_threshold_in_milliseconds" : 1,
+                "status_interval_in_seconds" : 0
+            }
+
+        # a journaled policy is invoked once the journal is consumed
+        if journal:
+            policy["dispatch"] = "journal"
+            configuration["event_journal"] = {}
+
+            irods_config.server_config['plugin_configuration']['rule_engines'].insert(0,
+                   {
+                        "instance_name": "irods_rule_engine_plugin-policy_engine-event_journal-instance",
+                        "plugin_name": "irods_rule_engine_plugin-policy_engine-event_journal",
+                        "plugin_specific_configuration": {
+                            "log_errors" : "true"
+                        }
+                   }
+                )
+
+        irods_config.server_config['plugin_configuration']['rule_engines'].insert(0,
+                {
+                    "instance_name": "irods_rule_engine_plugin-event_handler-data_object_modified-instance",
+                    "plugin_name": "irods_rule_engine_plugin-event_handler-data_object_modified",
+                    'plugin_specific_configuration': configuration
+                }
+            )
+
+        irods_config.server_config['plugin_configuration']['rule_engines'].insert(0,
+               {
+                    "instance_name": "irods_rule_engine_plugin-policy_engine-testing_policy-instance",
+                    "plugin_name": "irods_rule_engine_plugin-policy_engine-testing_policy",
+                    "plugin_specific_configuration": {
+                        "log_errors" : "true"
+                    }
+               }
+            )
+
+        try:
+            with lib.file_backed_up(filename):
+                irods_config.commit(irods_config.server_config, irods_config.server_config_path)
+                IrodsController().reload_configuration()
+                yield
+        finally:
+            IrodsController().reload_configuration()
+
     @contextlib.contextmanager
     def event_handler_fail_policy_configured(self):
         filename = paths.server_config_path()
@@ -1078,35 +1805,113 @@ class TestEventHandlerObjectModified(ResourceBase, unittest.TestCase):
                     admin_session.assert_icommand('imeta ls -d ' + filename2, 'STDOUT_SINGLELINE', 'COPY')
                 finally:
                     admin_session.assert_icommand('irm -f ' + filename)
-                    admin_session.assert_icommand('irm -f ' + filename2)
+                    admin_session.assert_icommand('irm -f ' + filename2)
+
+
+    def test_event_handler_istream_seek(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            filename = 'test_put_file'
+            contents = 'hello, world!'
+            lib.create_local_testfile(filename)
+            admin_session.assert_icommand(['istream', 'write', filename], input=contents)
+            with self.event_handler_configured():
+                try:
+                    admin_session.assert_icommand(['istream', '--offset', '1', 'write', filename], input=contents)
+                    admin_session.assert_icommand('imeta ls -d ' + filename, 'STDOUT_SINGLELINE', 'SEEK')
+                finally:
+                    admin_session.assert_icommand('irm -f ' + filename)
+
+
+    def test_event_handler_istream_truncate(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            filename = 'test_put_file'
+            contents = 'hello, world!'
+            lib.create_local_testfile(filename)
+            admin_session.assert_icommand(['istream', 'write', filename], input=contents)
+            with self.event_handler_configured():
+                try:
+                    admin_session.assert_icommand(['istream', '--offset', '1', 'write', filename], input=contents)
+                    admin_session.assert_icommand('imeta ls -d ' + filename, 'STDOUT_SINGLELINE', 'TRUNCATE')
+                finally:
+                    admin_session.assert_icommand('irm -f ' + filename)
+
+
+    def test_event_handler_registers_configured_clauses(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            filename = 'test_registered_clauses_file'
+            lib.create_local_testfile(filename)
+
+            # only the finally clause is registered, the post clause is no longer routed to the instance
+            with self.event_handler_configured(active_policy_clauses=['finally']):
+                try:
+                    admin_session.assert_icommand('iput ' + filename)
+                    admin_session.assert_icommand('imeta ls -d ' + filename, 'STDOUT_SINGLELINE', 'PUT')
+                finally:
+                    admin_session.assert_icommand('irm -f ' + filename)
+
+
+    def test_event_handler_put_with_required_fields(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            with self.event_handler_configured(required_fields=['logical_path', 'comm']):
+                try:
+                    filename = 'test_put_file'
+                    lib.create_local_testfile(filename)
+                    admin_session.assert_icommand('iput ' + filename)
+                    admin_session.assert_icommand('imeta ls -d ' + filename, 'STDOUT_SINGLELINE', 'PUT')
+                finally:
+                    admin_session.assert_icommand('irm -f ' + filename)
+
+    def test_event_handler_put_with_required_fields_read_by_conditional(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            # the logical path is read by the conditional of the policy, so need not be declared
+            with self.event_handler_configured(required_fields=['comm']):
+                try:
+                    filename = 'test_put_file'
+                    lib.create_local_testfile(filename)
+                    admin_session.assert_icommand('iput ' + filename)
+                    admin_session.assert_icommand('imeta ls -d ' + filename, 'STDOUT_SINGLELINE', 'PUT')
+                finally:
+                    admin_session.assert_icommand('irm -f ' + filename)
 
 
-    def test_event_handler_istream_seek(self):
+    def test_event_handler_istream_seek_summary(self):
         with session.make_session_for_existing_admin() as admin_session:
             filename = 'test_put_file'
             contents = 'hello, world!'
             lib.create_local_testfile(filename)
             admin_session.assert_icommand(['istream', 'write', filename], input=contents)
-            with self.event_handler_configured():
+            with self.event_handler_configured(seek_events={'mode' : 'summary'}):
                 try:
+                    # seeks are summarized in the event emitted on close rather than emitted individually
                     admin_session.assert_icommand(['istream', '--offset', '1', 'write', filename], input=contents)
-                    admin_session.assert_icommand('imeta ls -d ' + filename, 'STDOUT_SINGLELINE', 'SEEK')
+                    admin_session.assert_icommand('imeta ls -d ' + filename, 'STDOUT_SINGLELINE', 'WRITE')
+                    admin_session.assert_icommand_fail('imeta ls -d ' + filename, 'STDOUT_SINGLELINE', 'SEEK')
                 finally:
                     admin_session.assert_icommand('irm -f ' + filename)
 
 
-    def test_event_handler_istream_truncate(self):
+    def test_event_handler_open_objects_are_released(self):
         with session.make_session_for_existing_admin() as admin_session:
             filename = 'test_put_file'
             contents = 'hello, world!'
             lib.create_local_testfile(filename)
-            admin_session.assert_icommand(['istream', 'write', filename], input=contents)
+
+            # agents which stop with open data objects still tracked report them here
+            report_dir = '/var/lib/irods/policy_composition/open_objects'
+            shutil.rmtree(report_dir, ignore_errors=True)
+
             with self.event_handler_configured():
                 try:
-                    admin_session.assert_icommand(['istream', '--offset', '1', 'write', filename], input=contents)
-                    admin_session.assert_icommand('imeta ls -d ' + filename, 'STDOUT_SINGLELINE', 'TRUNCATE')
+                    for i in range(3):
+                        admin_session.assert_icommand('iput -f ' + filename)
+                        admin_session.assert_icommand('iget -f ' + filename + ' ' + filename + '.get')
+                        admin_session.assert_icommand(['istream', '--offset', '1', 'write', filename], input=contents)
+                        admin_session.assert_icommand(['istream', 'read', filename], 'STDOUT_SINGLELINE', 'hello')
+
+                    assert(not os.path.exists(report_dir) or 0 == len(os.listdir(report_dir)))
                 finally:
                     admin_session.assert_icommand('irm -f ' + filename)
+                    os.remove(filename + '.get')
 
 
     def test_event_handler_register(self):
@@ -1140,6 +1945,164 @@ class TestEventHandlerObjectModified(ResourceBase, unittest.TestCase):
                 finally:
                     admin_session.assert_icommand('imeta rm -C /tempZone/home/rods irods_policy_testing_policy UNREGISTER')
 
+    def test_event_handler_byte_accounting(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            filename = 'test_accounting_file'
+            with open(filename, 'w') as f:
+                f.write('a' * 1024)
+
+            logical_path = '/tempZone/home/rods/' + filename
+            query = "SELECT META_RESC_ATTR_VALUE WHERE RESC_NAME = 'demoResc' AND META_RESC_ATTR_NAME like 'irods::resource::{}::%'"
+
+            # counts are applied by a thread of the agent after the api call returns
+            def assert_accounted(accounted_bytes, accounted_objects):
+                expected = [accounted_bytes + '\n', accounted_objects + '\n']
+                actual = []
+                for i in range(20):
+                    actual = [admin_session.run_icommand(['iquest', '%s', query.format(a)])[0] for a in ['accounted_bytes', 'accounted_objects']]
+                    if actual == expected:
+                        break
+                    time.sleep(0.5)
+
+                assert(actual == expected)
+
+            try:
+                admin_session.run_icommand('imeta rmw -R demoResc irods::resource::accounted_% %')
+
+                with self.event_handler_accounting_configured():
+                    admin_session.assert_icommand('iput -R demoResc ' + filename + ' ' + logical_path)
+                    assert_accounted('1024', '1')
+
+                    # an overwrite changes the bytes of the replica, and a get changes nothing
+                    with open(filename, 'w') as f:
+                        f.write('a' * 2048)
+
+                    admin_session.assert_icommand('iput -f -R demoResc ' + filename + ' ' + logical_path)
+                    admin_session.assert_icommand('iget -f ' + logical_path + ' ' + filename)
+                    assert_accounted('2048', '1')
+
+                    admin_session.assert_icommand('irm -f ' + logical_path)
+                    assert_accounted('0', '0')
+
+            finally:
+                admin_session.run_icommand('irm -f ' + logical_path)
+                admin_session.run_icommand('imeta rmw -R demoResc irods::resource::accounted_% %')
+                os.remove(filename)
+
+    def test_event_handler_put_asynchronous(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            with self.event_handler_asynchronous_configured():
+                try:
+                    filename = 'test_put_file'
+                    lib.create_local_testfile(filename)
+                    admin_session.assert_icommand('iput ' + filename)
+
+                    # the policy is invoked by a background worker after the put returns
+                    out = ''
+                    for i in range(20):
+                        out, err, ec = admin_session.run_icommand('imeta ls -d ' + filename)
+                        if out.find('PUT') != -1:
+                            break
+                        time.sleep(0.5)
+
+                    assert(out.find('PUT') != -1)
+                finally:
+                    admin_session.assert_icommand('irm -f ' + filename)
+
+    def test_event_handler_put_asynchronous_coalesced(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            with self.event_handler_asynchronous_configured(['put'], 60000):
+                try:
+                    filename = 'test_put_file'
+                    lib.create_local_testfile(filename)
+                    admin_session.assert_icommand('iput ' + filename)
+
+                    # events still within their window are invoked as the agent of the client stops
+                    out = ''
+                    for i in range(20):
+                        out, err, ec = admin_session.run_icommand('imeta ls -d ' + filename)
+                        if out.find('PUT') != -1:
+                            break
+                        time.sleep(0.5)
+
+                    assert(out.find('PUT') != -1)
+                finally:
+                    admin_session.assert_icommand('irm -f ' + filename)
+
+    def test_event_handler_put_journaled(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            rule = """
+{
+    "policy_to_invoke" : "irods_policy_execute_rule",
+    "parameters" : {
+        "policy_to_invoke" : "irods_policy_event_journal"
+    }
+}
+INPUT null
+OUTPUT ruleExecOut
+"""
+
+            rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+            with open(rule_file, 'w') as f:
+                f.write(rule)
+
+            with self.event_handler_asynchronous_configured(journal=True):
+                try:
+                    filename = 'test_put_file'
+                    lib.create_local_testfile(filename)
+                    admin_session.assert_icommand('iput ' + filename)
+
+                    # the event remains in the journal until it is consumed
+                    admin_session.assert_icommand_fail('imeta ls -d ' + filename, 'STDOUT_SINGLELINE', 'PUT')
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'delivered')
+                    admin_session.assert_icommand('imeta ls -d ' + filename, 'STDOUT_SINGLELINE', 'PUT')
+                finally:
+                    admin_session.assert_icommand('irm -f ' + filename)
+                    os.remove(rule_file)
+
+    def test_event_handler_put_shed(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            renamed = 'test_shed_renamed_file'
+            lib.create_local_testfile(renamed)
+            admin_session.assert_icommand('iput ' + renamed)
+
+            with self.event_handler_asynchronous_configured(when_shed='skip'):
+                try:
+                    # a put transfers data and is not timed, the rename raises the level
+                    admin_session.assert_icommand('imv ' + renamed + ' ' + renamed + '_moved')
+
+                    filename = 'test_put_file'
+                    lib.create_local_testfile(filename)
+                    admin_session.assert_icommand('iput ' + filename)
+                    admin_session.assert_icommand_fail('imeta ls -d ' + filename, 'STDOUT_SINGLELINE', 'PUT')
+
+                    with open('/var/lib/irods/policy_composition/load_shedding/status.json') as f:
+                        status = json.load(f)
+
+                    self.assertNotEqual(status['level'], 'normal')
+                    self.assertGreater(status['api_samples'], 0)
+                    self.assertGreater(status['skipped'], 0)
+                finally:
+                    admin_session.assert_icommand('irm -f ' + filename)
+                    admin_session.assert_icommand('irm -f ' + renamed + '_moved')
+
+    def test_event_handler_bulk_put_batch_capable(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            with self.event_handler_asynchronous_configured(['create'], batch_capable=True):
+                dirname = 'test_bulk_put_dir'
+                try:
+                    os.mkdir(dirname)
+                    for i in range(3):
+                        lib.create_local_testfile(os.path.join(dirname, 'file' + str(i)))
+
+                    admin_session.assert_icommand('iput -b -r ' + dirname)
+
+                    for i in range(3):
+                        admin_session.assert_icommand('imeta ls -d ' + dirname + '/file' + str(i), 'STDOUT_SINGLELINE', 'CREATE')
+                finally:
+                    admin_session.run_icommand('irm -rf ' + dirname)
+                    shutil.rmtree(dirname, ignore_errors=True)
+
 class TestEventHandlerCollectionModified(ResourceBase, unittest.TestCase):
     def setUp(self):
         super(TestEventHandlerCollectionModified, self).setUp()
@@ -1396,7 +2359,7 @@ class TestPolicyEngineFilesystemUsage(ResourceBase, unittest.TestCase):
         super(TestPolicyEngineFilesystemUsage, self).tearDown()
 
     @contextlib.contextmanager
-    def filesystem_usage_configured(self):
+    def filesystem_usage_configured(self, plugin_specific_configuration=None):
         filename = paths.server_config_path()
 
         irods_config = IrodsConfig()
@@ -1406,7 +2369,7 @@ class TestPolicyEngineFilesystemUsage(ResourceBase, unittest.TestCase):
                {
                     "instance_name": "irods_rule_engine_plugin-policy_engine-filesystem_usage-instance",
                     "plugin_name": "irods_rule_engine_plugin-policy_engine-filesystem_usage",
-                    "plugin_specific_configuration": {
+                    "plugin_specific_configuration": plugin_specific_configuration or {
                         "log_errors" : "true"
                     }
                }
@@ -1475,6 +2438,136 @@ OUTPUT ruleExecOut
 
                 admin_session.assert_icommand('imeta rm -R demoResc irods::resource::filesystem_percent_used '+out)
 
+    def test_filesystem_usage_multiple_resources(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            try:
+                rule = """
+{
+    "policy_to_invoke" : "irods_policy_execute_rule",
+    "parameters" : {
+        "policy_to_invoke"    : "irods_policy_filesystem_usage",
+        "parameters" : {
+            "source_resources" : ["demoResc", "AnotherResc", "TestResc"]
+        }
+    }
+}
+INPUT null
+OUTPUT ruleExecOut
+"""
+
+                rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+                with open(rule_file, 'w') as f:
+                    f.write(rule)
+
+                with self.filesystem_usage_configured():
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'filesystems stated')
+
+                for resc in ['demoResc', 'AnotherResc', 'TestResc']:
+                    admin_session.assert_icommand('imeta ls -R ' + resc, 'STDOUT_SINGLELINE', 'irods::resource::filesystem_percent_used')
+
+            finally:
+                for resc in ['demoResc', 'AnotherResc', 'TestResc']:
+                    admin_session.run_icommand('imeta rmw -R ' + resc + ' irods::resource::filesystem_percent_used %')
+
+    def test_filesystem_usage_suppresses_unchanged_values(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            try:
+                rule = """
+{
+    "policy_to_invoke" : "irods_policy_execute_rule",
+    "parameters" : {
+        "policy_to_invoke"    : "irods_policy_filesystem_usage",
+        "parameters" : {
+            "source_resource" : "demoResc"
+        }
+    }
+}
+INPUT null
+OUTPUT ruleExecOut
+"""
+
+                report_rule = """
+{
+    "policy_to_invoke" : "irods_policy_execute_rule",
+    "parameters" : {
+        "policy_to_invoke"    : "irods_policy_filesystem_usage",
+        "parameters" : {
+            "source_resource" : "demoResc",
+            "report_history" : true
+        }
+    }
+}
+INPUT null
+OUTPUT ruleExecOut
+"""
+
+                rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+                with open(rule_file, 'w') as f:
+                    f.write(rule)
+
+                report_rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+                with open(report_rule_file, 'w') as f:
+                    f.write(report_rule)
+
+                # begin without a previously published value
+                history_file = '/var/lib/irods/policy_composition/filesystem_usage/demoResc.history'
+                if os.path.exists(history_file):
+                    os.remove(history_file)
+
+                config = {"log_errors" : "true", "minimum_change_in_percent" : 100}
+                with self.filesystem_usage_configured(config):
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file])
+                    admin_session.assert_icommand('imeta ls -R demoResc', 'STDOUT_SINGLELINE', 'irods::resource::filesystem_percent_used')
+
+                    # a second measurement is recorded locally, but the catalog is not updated
+                    admin_session.assert_icommand('imeta rmw -R demoResc irods::resource::filesystem_percent_used %')
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file])
+                    admin_session.assert_icommand_fail('imeta ls -R demoResc', 'STDOUT_SINGLELINE', 'irods::resource::filesystem_percent_used')
+
+                    out, err, ec = admin_session.run_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', report_rule_file])
+                    assert(out.count('"percent_used"') >= 2)
+
+            finally:
+                admin_session.run_icommand('imeta rmw -R demoResc irods::resource::filesystem_percent_used %')
+
+    def test_filesystem_usage_publishes_fill_rate(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            try:
+                rule = """
+{
+    "policy_to_invoke" : "irods_policy_execute_rule",
+    "parameters" : {
+        "policy_to_invoke"    : "irods_policy_filesystem_usage",
+        "parameters" : {
+            "source_resource" : "demoResc"
+        }
+    }
+}
+INPUT null
+OUTPUT ruleExecOut
+"""
+
+                rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+                with open(rule_file, 'w') as f:
+                    f.write(rule)
+
+                history_file = '/var/lib/irods/policy_composition/filesystem_usage/demoResc.history'
+                if os.path.exists(history_file):
+                    os.remove(history_file)
+
+                with self.filesystem_usage_configured():
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file])
+                    admin_session.assert_icommand_fail('imeta ls -R demoResc', 'STDOUT_SINGLELINE', 'irods::resource::filesystem_fill_rate')
+
+                    # a projection requires samples which are at least a second apart
+                    time.sleep(2)
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file])
+                    admin_session.assert_icommand('imeta ls -R demoResc', 'STDOUT_SINGLELINE', 'irods::resource::filesystem_fill_rate')
+
+            finally:
+                for attribute in ['filesystem_percent_used', 'filesystem_fill_rate', 'filesystem_hours_to_full']:
+                    admin_session.run_icommand('imeta rmw -R demoResc irods::resource::' + attribute + ' %')
+
 class TestPolicyEngineDataRetention(ResourceBase, unittest.TestCase):
     def setUp(self):
         super(TestPolicyEngineDataRetention, self).setUp()
@@ -1873,6 +2966,87 @@ OUTPUT ruleExecOut"""
             finally:
                 admin_session.assert_icommand('irm -f ' + filename)
 
+    def test_direct_invocation_with_trim_to_low_watermark(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            try:
+                filename = 'test_put_file'
+                lib.create_local_testfile(filename)
+                admin_session.assert_icommand('iput -R rnd ' + filename)
+                admin_session.assert_icommand('irepl -R AnotherResc ' + filename)
+
+                # usage as it would be published by filesystem_usage, with the whole replica needing to be freed
+                admin_session.assert_icommand('imeta set -R rnd irods::resource::filesystem_percent_used 95')
+                admin_session.assert_icommand('imeta set -R rnd irods::resource::filesystem_total_bytes 100')
+
+                rule = """
+{
+"policy_to_invoke" : "irods_policy_execute_rule",
+"parameters" : {
+    "policy_to_invoke" : "irods_policy_data_retention",
+    "parameters" : {
+        "source_resource" : "rnd"
+    },
+    "configuration" : {
+        "mode" : "trim_to_low_watermark",
+        "high_watermark_in_percent" : 90,
+        "low_watermark_in_percent" : 10
+    }
+}
+}
+INPUT null
+OUTPUT ruleExecOut"""
+
+                rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+                with open(rule_file, 'w') as f:
+                    f.write(rule)
+
+                with self.data_retention_trim_single_direct_invocation_configured():
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', 'replicas_trimmed')
+                    out, err, ec = admin_session.run_icommand('ils -l')
+                    lib.log_command_result('ils -l', out, err, ec)
+                    assert(out.find('rnd') == -1)
+                    assert(out.find('AnotherResc') != -1)
+            finally:
+                admin_session.assert_icommand('irm -f ' + filename)
+                admin_session.run_icommand('imeta rmw -R rnd irods::resource::filesystem_% %')
+
+    def test_direct_invocation_with_expiry_index(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            filename = 'test_put_file'
+            logical_path = '/tempZone/home/rods/' + filename
+            lib.create_local_testfile(filename)
+            admin_session.assert_icommand('iput -R rnd ' + filename)
+            admin_session.assert_icommand('imeta set -d ' + logical_path + ' irods::retention::expires_at 1')
+
+            rule = """
+{{
+"policy_to_invoke" : "irods_policy_execute_rule",
+"parameters" : {{
+    "policy_to_invoke" : "irods_policy_data_retention",
+    "parameters" : {{
+        "user_name" : "rods",
+        "logical_path" : "{0}"
+    }},
+    "configuration" : {{
+        "mode" : "{1}"
+    }}
+}}
+}}
+INPUT null
+OUTPUT ruleExecOut"""
+
+            rule_files = {}
+            for mode in ['index_expiry', 'expire_due']:
+                rule_files[mode] = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+                with open(rule_files[mode], 'w') as f:
+                    f.write(rule.format(logical_path, mode))
+
+            with self.data_retention_trim_single_direct_invocation_configured():
+                admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_files['index_expiry']])
+                admin_session.assert_icommand('ils -l ' + filename, 'STDOUT_SINGLELINE', filename)
+                admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_files['expire_due']], 'STDOUT_SINGLELINE', 'expired')
+                admin_session.assert_icommand('ils -l ' + filename, 'STDERR_SINGLELINE', 'does not exist')
+
     def test_direct_invocation_with_remove_all(self):
         with session.make_session_for_existing_admin() as admin_session:
             filename = 'test_put_file'
@@ -3217,6 +4391,44 @@ OUTPUT ruleExecOut"""
 
 
 
+    def test_direct_invocation_resource_scan(self):
+        with session.make_session_for_existing_admin() as admin_session:
+            orphan = '/var/lib/irods/Vault/home/rods/orphaned_file'
+            try:
+                filename = 'test_put_file'
+                lib.create_local_testfile(filename)
+                admin_session.assert_icommand('iput ' + filename)
+
+                with open(orphan, 'w') as f:
+                    f.write('orphaned')
+
+                rule = """
+{
+"policy_to_invoke" : "irods_policy_execute_rule",
+"parameters" : {
+    "policy_to_invoke" : "irods_policy_data_verification",
+    "parameters" : {
+        "source_resource" : "demoResc"
+    },
+    "configuration" : {
+        "mode" : "resource_scan",
+        "number_of_threads" : 2
+    }
+}
+}
+INPUT null
+OUTPUT ruleExecOut"""
+
+                rule_file = tempfile.NamedTemporaryFile(mode='wt', dir='/tmp', delete=False).name + '.r'
+                with open(rule_file, 'w') as f:
+                    f.write(rule)
+
+                with self.data_verification_configured():
+                    admin_session.assert_icommand(['irule', '-r', 'irods_rule_engine_plugin-cpp_default_policy-instance', '-F', rule_file], 'STDOUT_SINGLELINE', orphan)
+            finally:
+                admin_session.assert_icommand('irm -f ' + filename)
+                os.remove(orphan)
+
     def test_direct_invocation_verify_checksum_fail(self):
         with session.make_session_for_existing_admin() as admin_session:
             try:
@@ -39,6 +39,7 @@ target_link_libraries(
     ${IRODS_PLUGIN_POLICY_LINK_LIBRARIES}
     fmt::fmt
     nlohmann_json::nlohmann_json
+    OpenSSL::Crypto
     ${IRODS_EXTERNALS_FULLPATH_BOOST}/lib/libboost_filesystem.so
     irods_common
     irods_dev_policy_composition_framework